@@ -0,0 +1,135 @@
+# benchmarks/bench_broadcast.py
+# Broadcast CPU per tick: packing every client's update on its own vs.
+# sharing one serialization per entity across all clients (EncodeCache).
+#
+#   python -m benchmarks.bench_broadcast [clients ...]
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import config
+from server.network import Network
+from server.player import Player
+from server.snapshot import EncodeCache
+from shared import schema
+from shared.packetizer import split_update
+
+WORLD = 3000
+TICKS = 20
+
+
+class NullSock:
+    def __init__(self):
+        self.datagrams = 0
+        self.bytes = 0
+
+    def sendto(self, data, addr):
+        self.datagrams += 1
+        self.bytes += len(data)
+
+
+def make_world(clients, enemies):
+    players = {}
+    for pid in range(1, clients + 1):
+        p = Player(pid, f"Player{pid}", random.uniform(0, WORLD), random.uniform(0, WORLD))
+        p.current_map = "grasslands_01"
+        p.addr = ("127.0.0.1", 40000 + pid)
+        p.schema = schema.SCHEMA_VERSION
+        players[pid] = p
+
+    foes = {}
+    for eid in range(1, enemies + 1):
+        foes[eid] = SimpleNamespace(
+            id=eid, type="bull", x=random.uniform(0, WORLD), y=random.uniform(0, WORLD),
+            direction="down", moving=True, current_map="grasslands_01",
+            rows=8, columns=6, speed=40, frame_speed=0.08, c_h_padding=20, c_v_padding=20,
+        )
+
+    net = Network(threading.Lock())
+    net.attach(SimpleNamespace(clients=players), SimpleNamespace(enemies=foes))
+    return net
+
+
+def step_world(net):
+    """Move about half of everything and ack the last snapshot, like a live tick."""
+    for p in net.clients.values():
+        if random.random() < 0.5:
+            p.x += random.uniform(-4, 4)
+            p.y += random.uniform(-4, 4)
+        p.last_ack = net.snapshot_seq or None
+    for e in net.enemies.values():
+        if random.random() < 0.5:
+            e.x += random.uniform(-4, 4)
+    net.update_interest()
+
+
+def send(net, sock, updates, cache=None):
+    """The server's send path: queue on the outbox, then drain it into sock."""
+    cache = net.send_updates(net.outbox, updates, cache)
+    net.outbox.flush(sock.sendto)
+    return cache
+
+
+def send_per_client(sock, updates):
+    """The old path: every client's update packed from scratch."""
+    for addr, version, msg in updates:
+        if msg["type"] != "update":
+            sock.sendto(schema.pack(msg, version), addr)
+            continue
+        for datagram in split_update(msg, version, config.MAX_DATAGRAM_SIZE):
+            sock.sendto(datagram, addr)
+
+
+def run(clients):
+    random.seed(clients)
+    net = make_world(clients, clients // 2)
+    net.update_interest()
+
+    # Simulated send clock, so every client's snapshot is due each tick
+    clock = 0.0
+
+    # Warm up baselines so the measured ticks are steady-state deltas
+    for _ in range(3):
+        step_world(net)
+        clock += config.UPDATE_RATE
+        send(net, NullSock(), net.collect_updates(clock))
+
+    collect_s = legacy_s = shared_s = 0.0
+    hits = misses = 0
+    legacy_sock, shared_sock = NullSock(), NullSock()
+    for _ in range(TICKS):
+        step_world(net)
+        clock += config.UPDATE_RATE
+
+        start = time.perf_counter()
+        updates = net.collect_updates(clock)
+        collect_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        send_per_client(legacy_sock, updates)
+        legacy_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        cache = send(net, shared_sock, updates, EncodeCache())
+        shared_s += time.perf_counter() - start
+        hits += cache.hits
+        misses += cache.misses
+
+    assert legacy_sock.bytes == shared_sock.bytes
+
+    per_tick = 1000 / TICKS
+    print(f"{clients} clients, {clients // 2} enemies")
+    print(f"  collect (under lock)   {collect_s * per_tick:>8.2f} ms/tick")
+    print(f"  pack per client        {legacy_s * per_tick:>8.2f} ms/tick")
+    print(f"  pack once, fan out     {shared_s * per_tick:>8.2f} ms/tick   "
+          f"({hits / max(1, hits + misses):.0%} entity cache hits)")
+    print(f"  sent                   {shared_sock.bytes / TICKS / 1024:>8.1f} KiB/tick in "
+          f"{shared_sock.datagrams // TICKS} datagrams")
+
+
+if __name__ == "__main__":
+    counts = [int(n) for n in sys.argv[1:]] or [10, 100, 500]
+    for n in counts:
+        run(n)
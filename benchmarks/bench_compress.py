@@ -0,0 +1,105 @@
+# benchmarks/bench_compress.py
+# Bytes saved vs. CPU spent by preset-dictionary compression of the
+# server's outgoing datagrams, through the real send path.
+#
+#   python -m benchmarks.bench_compress [clients ...]
+#   python -m benchmarks.bench_compress build     # (re)record shared/dictionaries/snapshots_1.zdict
+#
+# The dictionary is built from traffic recorded on a different random
+# world than the one measured, so the numbers are not flattered by it.
+import os
+import random
+import sys
+import time
+import zlib
+
+import config
+from benchmarks.bench_broadcast import NullSock, make_world, send, step_world
+from server.snapshot import EncodeCache
+from shared import compress
+
+TICKS = 20
+
+
+class RecordingSock(NullSock):
+    def __init__(self):
+        super().__init__()
+        self.packets = []
+
+    def sendto(self, data, addr):
+        super().sendto(data, addr)
+        self.packets.append(data)
+
+
+def timed_send(net, sock, updates, dict_id):
+    for p in net.clients.values():
+        p.compression = dict_id
+    start = time.perf_counter()
+    send(net, sock, updates, EncodeCache())
+    return time.perf_counter() - start
+
+
+def record(clients, ticks, seed):
+    """Datagrams the send path produces for a world of `clients`, from its first tick on."""
+    random.seed(seed)
+    net = make_world(clients, clients // 2)
+    net.update_interest()
+    sock = RecordingSock()
+    for tick in range(1, ticks + 1):
+        step_world(net)
+        send(net, sock, net.collect_updates(tick * config.UPDATE_RATE))
+    return sock.packets
+
+
+def build():
+    samples = []
+    for clients in (10, 100, 300):
+        samples += record(clients, 40, 1000 + clients)
+    random.seed(0)
+    samples = random.sample(samples, min(len(samples), 4000))
+    dictionary = compress.build_dictionary(samples)
+    os.makedirs(compress.DICTIONARY_DIR, exist_ok=True)
+    path = os.path.join(compress.DICTIONARY_DIR, compress.DICTIONARIES[1])
+    with open(path, "wb") as f:
+        f.write(dictionary)
+    print(f"wrote {len(dictionary)} B dictionary from {len(samples)} datagrams to {path}")
+
+
+def run(clients):
+    random.seed(clients)
+    net = make_world(clients, clients // 2)
+    net.update_interest()
+
+    # Both ways on the same updates; the first ticks (spawns) are left out
+    plain, packed = RecordingSock(), NullSock()
+    plain_s = packed_s = 0.0
+    for tick in range(1, TICKS + 4):
+        step_world(net)
+        updates = net.collect_updates(tick * config.UPDATE_RATE)
+        if tick <= 3:
+            timed_send(net, NullSock(), updates, 0)
+            continue
+        plain_s += timed_send(net, plain, updates, 0)
+        packed_s += timed_send(net, packed, updates, 1)
+    stats = net.compressors[1].stats()
+
+    # What deflate alone does to the same kind of traffic, without the dictionary
+    no_dict = sum(min(len(d), len(zlib.compress(d, config.COMPRESS_LEVEL)) - 4) for d in plain.packets)
+
+    per_tick = 1000 / TICKS
+    print(f"{clients} clients, {clients // 2} enemies, threshold {config.COMPRESS_THRESHOLD} B")
+    print(f"  uncompressed          {plain.bytes / TICKS / 1024:>8.1f} KiB/tick   send {plain_s * per_tick:>7.2f} ms/tick")
+    print(f"  preset dictionary     {packed.bytes / TICKS / 1024:>8.1f} KiB/tick   send {packed_s * per_tick:>7.2f} ms/tick"
+          f"   ({stats['compressed'] / max(1, stats['packets']):.0%} of datagrams compressed)")
+    print(f"  deflate, no dict      {no_dict / TICKS / 1024:>8.1f} KiB/tick")
+    print(f"  saved                 {(plain.bytes - packed.bytes) / TICKS / 1024:>8.1f} KiB/tick "
+          f"({1 - packed.bytes / max(1, plain.bytes):.0%}) for {(packed_s - plain_s) * per_tick:.2f} ms/tick")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["build"]:
+        build()
+    else:
+        counts = [int(n) for n in sys.argv[1:]] or [10, 100, 500]
+        for n in counts:
+            run(n)
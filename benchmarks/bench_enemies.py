@@ -0,0 +1,105 @@
+# benchmarks/bench_enemies.py
+# Time per simulation step of the enemy update: Enemy.update one enemy at a
+# time (enemy_engine = scalar) against the NumPy arrays in
+# server/enemy_engine.py (enemy_engine = numpy). Both run the same world
+# from the same start, and every step their snapshot states are compared.
+#
+#   python -m benchmarks.bench_enemies [enemies] [players] [steps]
+import contextlib
+import io
+import random
+import sys
+import threading
+import time
+
+import config
+from server.enemy import Enemy
+from server.enemy_engine import EnemyArrays
+from server.map_registry import maps
+from server.network import Network
+
+TYPES = [("green-slime", 1, 11, 10, 7, 2), ("red-slime", 1, 11, 10, 7, 2), ("bull", 8, 6, 40, 20, 20)]
+BUDGET_MS = config.SIM_RATE * 1000
+
+
+class Player:
+    def __init__(self, pid, current_map, x, y):
+        self.id = pid
+        self.current_map = current_map
+        self.x = x
+        self.y = y
+
+
+def world(count, players, seed=1):
+    rng = random.Random(seed)
+    names = maps.names()
+    enemies = {}
+    for eid in range(1, count + 1):
+        name = names[eid % len(names)]
+        game_map = maps.get(name)
+        width, height = game_map.map_width * game_map.tile_size, game_map.map_height * game_map.tile_size
+        enemy_type, rows, columns, speed, v_pad, h_pad = TYPES[eid % len(TYPES)]
+        enemies[eid] = Enemy(eid, rng.uniform(0, width), rng.uniform(0, height), rows, columns,
+                             enemy_type, name, 0.1, speed, v_pad, h_pad)
+    clients = {}
+    for pid in range(1, players + 1):
+        name = names[pid % len(names)]
+        game_map = maps.get(name)
+        clients[pid] = Player(pid, name, rng.uniform(0, game_map.map_width * game_map.tile_size),
+                              rng.uniform(0, game_map.map_height * game_map.tile_size))
+    return enemies, clients
+
+
+def wander(clients, rng):
+    for p in clients.values():
+        p.x += rng.uniform(-3, 3)
+        p.y += rng.uniform(-3, 3)
+
+
+def main(count, players, steps):
+    with contextlib.redirect_stdout(io.StringIO()):
+        maps.preload()
+        scalar, scalar_clients = world(count, players)
+        batched, batch_clients = world(count, players)
+    engine = EnemyArrays(batched)
+    net = Network(threading.Lock())
+    dt = config.SIM_RATE
+
+    scalar_ms, batch_ms = [], []
+    rng_a, rng_b = random.Random(2), random.Random(2)
+    for _ in range(steps):
+        wander(scalar_clients, rng_a)
+        wander(batch_clients, rng_b)
+
+        start = time.perf_counter()
+        for e in scalar.values():
+            e.update(dt, scalar_clients)
+        scalar_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        engine.update(dt, batch_clients)
+        batch_ms.append((time.perf_counter() - start) * 1000)
+
+        for eid, e in scalar.items():
+            a, b = net.enemy_state(e), net.enemy_state(batched[eid])
+            assert a == b, (eid, a, b)
+
+    engine.write_targets()
+    assert all((e.target_x, e.target_y) == (batched[eid].target_x, batched[eid].target_y)
+               for eid, e in scalar.items())
+
+    moving = sum(e.moving for e in batched.values())
+    scalar_ms.sort()
+    batch_ms.sort()
+    print(f"{count} enemies, {players} players over {len(maps.loaded())} maps, {steps} steps "
+          f"({moving} still moving at the end), snapshot states identical every step")
+    for label, times in (("scalar", scalar_ms), ("numpy", batch_ms)):
+        median, worst = times[len(times) // 2], times[-1]
+        verdict = "within" if worst <= BUDGET_MS else "over"
+        print(f"  {label:<7} median {median:8.2f} ms   worst {worst:8.2f} ms   "
+              f"({verdict} the {BUDGET_MS:.0f} ms step)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [10000, 200, 40][len(args):]))
@@ -0,0 +1,67 @@
+# benchmarks/bench_maps.py
+# Startup time and peak memory of building enemies: one shared GameMap per
+# map from server/map_registry.py (lazy, and preloaded in parallel) against
+# the old behaviour of every Enemy parsing its own copy of its map. Each run
+# is a fresh process, so the RSS figures don't see each other. The per-enemy
+# run uses fewer enemies (it is slow) and is scaled up for comparison.
+#
+#   python -m benchmarks.bench_maps [enemies] [per_enemy_enemies]
+import contextlib
+import io
+import multiprocessing
+import resource
+import sys
+import time
+
+TYPES = [("green-slime", 1, 11), ("red-slime", 1, 11), ("bull", 8, 6)]
+
+
+def build(mode, count, results):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # GameMap is chatty
+        from server import enemy
+        from server.game_map import GameMap
+        from server.map_registry import maps
+
+        imported = time.perf_counter()
+        names = maps.names()
+        if mode == "per-enemy":
+            enemy.maps.get = lambda name: GameMap(maps.path(name))
+        elif mode == "preload":
+            maps.preload(names)
+
+        enemies = []
+        for eid in range(count):
+            enemy_type, rows, columns = TYPES[eid % len(TYPES)]
+            enemies.append(enemy.Enemy(eid, 100 + eid % 50, 100 + eid // 50, rows, columns,
+                                       enemy_type, names[eid % len(names)], 0.1, 40, 2, 2))
+    done = time.perf_counter()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+    results.put((done - imported, done - started, rss))
+
+
+def run(mode, count, results, ctx):
+    proc = ctx.Process(target=build, args=(mode, count, results))
+    proc.start()
+    build_s, total_s, rss = results.get()
+    proc.join()
+    return build_s, total_s, rss
+
+
+if __name__ == "__main__":
+    enemies = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    per_enemy = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    base_build, _, base_rss = run("registry", 0, results, ctx)  # imports and pygame only
+
+    print(f"{'mode':<10} {'enemies':>8} {'build':>9} {'startup':>9} {'peak RSS':>10}")
+    for mode, count in (("per-enemy", per_enemy), ("registry", enemies), ("preload", enemies)):
+        build_s, total_s, rss = run(mode, count, results, ctx)
+        print(f"{mode:<10} {count:>8} {build_s:>8.2f}s {total_s:>8.2f}s {rss:>7.0f} MiB")
+        if mode == "per-enemy" and count and count != enemies:
+            scale = enemies / count
+            print(f"{'  scaled':<10} {enemies:>8} {build_s * scale:>8.2f}s {'':>9} "
+                  f"{base_rss + (rss - base_rss) * scale:>7.0f} MiB")
+    print(f"(interpreter + imports alone: {base_rss:.0f} MiB)")
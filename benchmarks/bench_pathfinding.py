@@ -0,0 +1,99 @@
+# benchmarks/bench_pathfinding.py
+# Enemies chasing wandering players on grasslands_01, straight at them
+# (enemy_pathing = direct) against along shared flow fields
+# (enemy_pathing = flow, server/pathfinding.py): time per step, flow fields
+# built, and how many enemies are stuck against a wall or have caught up.
+#
+#   python -m benchmarks.bench_pathfinding [enemies] [players] [steps]
+import contextlib
+import io
+import random
+import sys
+import time
+
+import config
+from server import pathfinding
+from server.enemy import Enemy
+from server.map_registry import maps
+
+MAP = "grasslands_01"
+CAUGHT = 24  # px from the target
+
+
+class Player:
+    def __init__(self, pid, x, y):
+        self.id = pid
+        self.current_map = MAP
+        self.x = x
+        self.y = y
+
+
+def spawn(game_map, count, rng):
+    """Random positions where a 24 px enemy fits."""
+    free = pathfinding.walkable(game_map.grid, 0, 2, 2)
+    cells = [i for i, ok in enumerate(free) if ok]
+    width, size = game_map.grid.width, game_map.tile_size
+    return [(float(c % width * size), float(c // width * size)) for c in rng.sample(cells, count)]
+
+
+def run(mode, count, players, steps):
+    config.ENEMY_PATHING = mode
+    fields = pathfinding.flow_fields
+    fields.fields.clear()
+    built = fields.built
+
+    rng = random.Random(1)
+    game_map = maps.get(MAP)
+    enemies = [Enemy(i, x, y, 8, 6, "bull", MAP, 0.08, 40, 20, 20)
+               for i, (x, y) in enumerate(spawn(game_map, count, rng))]
+    clients = {i: Player(i, x, y) for i, (x, y) in enumerate(spawn(game_map, players, rng))}
+    free = pathfinding.walkable(game_map.grid, 0, 2, 2)
+
+    elapsed = 0.0
+    for _ in range(steps):
+        for p in clients.values():
+            # Players drift about at random, staying where a bull would fit
+            nx, ny = p.x + rng.uniform(-2, 2), p.y + rng.uniform(-2, 2)
+            cell = game_map.grid.cell(nx, ny)
+            if cell is not None and free[cell]:
+                p.x, p.y = nx, ny
+        start = time.perf_counter()
+        for e in enemies:
+            e.update(config.SIM_RATE, clients)
+        elapsed += time.perf_counter() - start
+
+    caught = stuck = 0
+    for e in enemies:
+        if e.distance_to(e.target_x, e.target_y) <= CAUGHT:
+            caught += 1
+        elif not e.moving:
+            stuck += 1
+    built = fields.built - built
+    print(f"{mode:<7} {elapsed / steps * 1000:7.2f} ms/step   caught {caught:>4}   stuck {stuck:>4}   "
+          f"on the way {count - caught - stuck:>4}   fields built {built:>4} ({built / steps:.2f}/step)")
+
+
+def main(count, players, steps):
+    with contextlib.redirect_stdout(io.StringIO()):
+        game_map = maps.get(MAP)
+    grid = game_map.grid
+    print(f"{MAP}: {grid.width}x{grid.height} tiles, {count} bulls chasing {players} players, "
+          f"{steps} steps of {config.SIM_RATE * 1000:.0f} ms")
+
+    fields = pathfinding.FlowFields()
+    start = time.perf_counter()
+    fields.graph(game_map, 0, 2, 2)
+    graph_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for goal in range(0, grid.size, grid.size // 20):
+        fields.field(game_map, 0, 2, 2, goal)
+    print(f"walkable graph {graph_ms:.1f} ms once per map/z/size; "
+          f"one flow field {(time.perf_counter() - start) * 1000 / 20:.2f} ms")
+
+    for mode in ("direct", "flow"):
+        run(mode, count, players, steps)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [500, 4, 1200][len(args):]))
@@ -0,0 +1,81 @@
+# benchmarks/bench_schema.py
+# Size and encode-speed of the compact schema vs. the plain msgpack dicts.
+#
+#   python -m benchmarks.bench_schema [players] [enemies]
+import random
+import sys
+import time
+
+import msgpack
+
+from shared import schema
+
+
+def sample_player(pid):
+    x, y = random.uniform(0, 2000), random.uniform(0, 1000)
+    return {
+        "id": pid, "name": f"Player{pid}",
+        "x": x, "y": y, "prev_x": x - 1.5, "prev_y": y, "target_x": x + 1.5, "target_y": y,
+        "direction": random.choice(schema.DIRECTIONS), "moving": True,
+        "frame_w": 64, "frame_h": 64, "current_map": "grasslands_01", "z_index": 0,
+        "timestamp": time.time(), "attacking": False, "running": True, "jumping": False,
+        "long_attacking": False, "charging_attack": False,
+    }
+
+
+def sample_enemy(eid):
+    return {
+        "id": eid, "type": "bull",
+        "x": random.uniform(0, 2000), "y": random.uniform(0, 1000),
+        "direction": "down", "moving": True, "current_map": "grasslands_01",
+        "rows": 8, "columns": 6, "hp": 10, "speed": 40, "frame_speed": 0.08,
+        "directions": ["down"], "z_index": 0, "c_h_padding": 20, "c_v_padding": 20,
+    }
+
+
+def sample_update(players, enemies):
+    return {
+        "type": "update", "seq": 1234, "base": 1230,
+        "players": [sample_player(i) for i in range(players)],
+        "enemies": [sample_enemy(i) for i in range(enemies)],
+        "removed_players": [], "removed_enemies": [],
+    }
+
+
+def sample_move():
+    return {
+        "type": "move", "x": 512.25, "y": 300.5, "direction": "left", "moving": True,
+        "current_map": "grasslands_01", "z_index": 0, "token": "2f1c7e0a-3b9d-4c1e-9f7a-5d2b8c6e4a10",
+        "attacking": False, "running": False, "jumping": False,
+        "long_attacking": False, "charging_attack": False, "ack": 1234,
+    }
+
+
+def timed(fn, msg, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(msg)
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def report(label, msg, rounds):
+    legacy = schema.pack(msg, 0)
+    compact = schema.pack(msg, schema.SCHEMA_VERSION)
+    legacy_us = timed(lambda m: schema.pack(m, 0), msg, rounds)
+    compact_us = timed(lambda m: schema.pack(m, schema.SCHEMA_VERSION), msg, rounds)
+    decode_legacy_us = timed(lambda d: msgpack.unpackb(d, raw=False), legacy, rounds)
+    decode_compact_us = timed(schema.unpack, compact, rounds)
+
+    print(f"{label}")
+    print(f"  size    dict {len(legacy):>7} B   schema {len(compact):>7} B   ({len(compact) / len(legacy):.0%})")
+    print(f"  encode  dict {legacy_us:>7.1f} us  schema {compact_us:>7.1f} us")
+    print(f"  decode  dict {decode_legacy_us:>7.1f} us  schema {decode_compact_us:>7.1f} us")
+
+
+if __name__ == "__main__":
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    enemies = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    random.seed(1)
+
+    report("move", sample_move(), 20000)
+    report(f"update ({players} players, {enemies} enemies)", sample_update(players, enemies), 500)
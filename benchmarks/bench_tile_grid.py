@@ -0,0 +1,96 @@
+# benchmarks/bench_tile_grid.py
+# Per-lookup cost of the tile grid (shared/tile_grid.py) against scanning
+# the tile lists, as Player.move, Enemy.move_towards_target, the opaque
+# fade and get_portal_at used to, on grasslands_01. Probes are player-sized
+# rects and points spread over the whole map.
+#
+#   python -m benchmarks.bench_tile_grid [lookups]
+import contextlib
+import io
+import random
+import sys
+import time
+
+from server.map_registry import maps
+from server.rect import Rect
+from server.tmx import load_tmx
+from shared.tile_grid import TileGrid
+
+MAP = "grasslands_01"
+HITBOX = (24, 30)
+
+
+def timed(fn, probes):
+    start = time.perf_counter()
+    for probe in probes:
+        fn(probe)
+    return (time.perf_counter() - start) / len(probes) * 1e9
+
+
+def main(lookups):
+    with contextlib.redirect_stdout(io.StringIO()):
+        game_map = maps.get(MAP)
+    grid = game_map.grid
+    size = game_map.tile_size
+
+    # The server never loads the opaque layer; build it here as the client does
+    tmx = load_tmx(maps.path(MAP), ["foreground_opaque"])
+    opaque = []
+    opaque_grid = TileGrid(tmx.width, tmx.height, size)
+    for tx, ty, _ in tmx.tiles("foreground_opaque"):
+        opaque.append({"rect": Rect(tx * size, ty * size, size, size), "z_index": 0})
+        opaque_grid.add_opaque(tx, ty, 0)
+
+    rng = random.Random(1)
+    width, height = game_map.map_width * size, game_map.map_height * size
+    rects = [Rect(rng.uniform(0, width), rng.uniform(0, height), *HITBOX) for _ in range(lookups)]
+    points = [(rng.uniform(0, width), rng.uniform(0, height)) for _ in range(lookups)]
+    portals = game_map.portals
+
+    def scan_collides(r):
+        for collider in game_map.colliders:
+            if collider["z_index"] == 0 and r.colliderect(collider["rect"]):
+                return True
+        return False
+
+    def scan_elevation(p):
+        x, y = p
+        for elev in game_map.elevation_colliders:
+            tx, ty, w, h = elev["rect"]
+            if tx <= x < tx + w and ty <= y < ty + h:
+                return elev["z_index"]
+        return None
+
+    def scan_opaque(r):
+        return any(r.colliderect(t["rect"]) and t["z_index"] == 0 for t in opaque)
+
+    def scan_portal(r):
+        for portal in portals:
+            if portal["rect"].colliderect(r):
+                return portal
+        return None
+
+    cases = [
+        ("collision (rect, z)", len(game_map.colliders), scan_collides, lambda r: grid.collides(r, 0), rects),
+        ("elevation (point)", len(game_map.elevation_colliders), scan_elevation,
+         lambda p: grid.elevation_at(*p), points),
+        ("opaque (rect, z)", len(opaque), scan_opaque, lambda r: opaque_grid.opaque_at(r, 0), rects),
+        ("portal (rect)", len(portals), scan_portal, grid.portal_at, rects),
+    ]
+
+    print(f"{MAP}: {game_map.map_width}x{game_map.map_height} tiles, {lookups} lookups each")
+    print(f"{'lookup':<22} {'tiles':>6} {'scan ns':>9} {'grid ns':>9} {'speedup':>8}")
+    for label, tiles, scan, lookup, probes in cases:
+        for probe in probes[:1000]:
+            assert scan(probe) == lookup(probe), label
+        scan_ns = timed(scan, probes)
+        grid_ns = timed(lookup, probes)
+        print(f"{label:<22} {tiles:>6} {scan_ns:>9.0f} {grid_ns:>9.0f} {scan_ns / grid_ns:>7.1f}x")
+
+    cells = sum(len(c) for c in grid.collision.values()) + grid.elevation.itemsize * grid.size \
+        + grid.portal_index.itemsize * grid.size
+    print(f"grid memory: {cells / 1024:.0f} KiB ({len(grid.collision)} collision layers)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,122 @@
+# benchmarks/bench_workers.py
+# Ingress throughput against the number of SO_REUSEPORT receive workers
+# (Linux): session-framed moves checked, verified and decoded per second.
+# Sender processes flood the port from many client sockets; the server
+# side is the real path, MessageHandler plus WorkerPool as in server/main.py,
+# minus the game. Extra workers only help with cores to run them on.
+#
+#   python -m benchmarks.bench_workers [workers ...]
+import multiprocessing
+import os
+import select
+import socket
+import sys
+import threading
+import time
+
+import config
+from server import workers as ingress_workers
+from server.inbox import InputQueue
+from server.message_handler import MessageHandler
+from server.outbox import Outbox
+from server.player_manager import PlayerManager
+from shared import schema, wire
+from shared import session as frames
+
+CLIENTS = 64
+SENDERS = 2
+DURATION = 3.0
+
+# Measuring the path, not the per-address rate limit
+config.PACKET_RATE = 1e9
+config.PACKET_BURST = 10 ** 9
+
+
+def flood(socks, packets, port, until):
+    addr = ("127.0.0.1", port)
+    while time.time() < until:
+        for sock, data in zip(socks, packets):
+            try:
+                sock.sendto(data, addr)
+            except OSError:
+                pass
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run(workers):
+    port = free_port()
+    manager = PlayerManager()
+    inputs = InputQueue(config.INBOX_LIMIT)
+    handler = MessageHandler(Outbox(), manager, threading.Lock(), inputs=inputs)
+
+    socks, packets = [], []
+    for pid in range(1, CLIENTS + 1):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.setblocking(False)
+        manager.clients[pid] = object()
+        sess = manager.sessions.issue(pid, f"token{pid}", sock.getsockname())
+        move = {"type": "move", "x": 100.0 + pid, "y": 200.0, "direction": "down", "moving": True}
+        socks.append(sock)
+        packets.append(wire.add_header(frames.seal(sess.id, sess.key, schema.pack(move, schema.SCHEMA_VERSION))))
+
+    pool = None
+    if workers:
+        pool = ingress_workers.WorkerPool(workers, "127.0.0.1", port)
+        pool.start(manager.sessions)
+        threading.Thread(target=pool.run, args=(handler.handle_session_message, handler.handle_message),
+                         daemon=True).start()
+    server = ingress_workers.reuseport_socket("127.0.0.1", port)
+    server.setblocking(False)
+
+    ctx = multiprocessing.get_context("fork")
+    until = time.time() + DURATION
+    senders = [ctx.Process(target=flood, args=(socks[i::SENDERS], packets[i::SENDERS], port, until))
+               for i in range(SENDERS)]
+    for proc in senders:
+        proc.start()
+
+    direct = 0
+    while time.time() < until:
+        readable, _, _ = select.select([server], [], [], 0.1)
+        if not readable:
+            continue
+        while True:
+            try:
+                data, addr = server.recvfrom(config.BUFFER_SIZE)
+            except BlockingIOError:
+                break
+            direct += 1
+            handler.handle_datagram(data, addr)
+        inputs.drain()
+    for proc in senders:
+        proc.join()
+
+    by_workers = forwarded = 0
+    if pool is not None:
+        time.sleep(ingress_workers.STATS_INTERVAL * 1.5)  # the last counters come when they go idle
+        for stats in pool.stats().values():
+            by_workers += stats["received"]
+            forwarded += stats["forwarded"]
+        pool.stop()
+    server.close()
+    for sock in socks:
+        sock.close()
+
+    total = direct + by_workers
+    print(f"{workers} workers: {total / DURATION:>9.0f} datagrams/s "
+          f"(simulation process {direct / DURATION:.0f}/s, workers {by_workers / DURATION:.0f}/s "
+          f"forwarded as {forwarded / DURATION:.0f} inputs/s)")
+
+
+if __name__ == "__main__":
+    if not ingress_workers.supported():
+        sys.exit("SO_REUSEPORT is not available on this platform")
+    print(f"{os.cpu_count()} CPUs, {CLIENTS} clients, {SENDERS} sender processes, {DURATION:.0f} s per run")
+    for n in [int(n) for n in sys.argv[1:]] or [0, 1, 2, 4]:
+        run(n)
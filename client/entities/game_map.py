@@ -4,6 +4,7 @@
 import pygame
 from assets.maps.map_loader import TileLayer, load_pygame
 from pytmx import TiledTileLayer
+from shared.tile_grid import TileGrid
 
 class Portal:
     def __init__(self, rect, target_map, spawn_x, spawn_y, player_index):
@@ -21,6 +22,9 @@ class GameMap:
         self.opaque_tiles = []   # store rects of opaque tiles
         # Store light tiles
         self.light_tiles = []
+        # Per-tile lookups for collision, elevation, opaque and portal checks
+        self.grid = TileGrid(self.tmx_data.width, self.tmx_data.height,
+                             self.tmx_data.tilewidth, self.tmx_data.tileheight)
 
         # --- Tile layers for drawing & animation ---
         self.layers = [
@@ -58,6 +62,7 @@ class GameMap:
                     )
                     # Store both rect and z_index
                     self.opaque_tiles.append({"rect": rect, "z_index": layer_z})
+                    self.grid.add_opaque(x, y, layer_z)
 
             if hasattr(layer, "tiles"):
                 for x, y, tile in layer.tiles:
@@ -109,6 +114,7 @@ class GameMap:
                         
                         # Store both rect and z_level
                         self.colliders.append({"rect": rect, "z_index": z_index})
+                        self.grid.add_collider(x, y, z_index)
 
         self.elevation_colliders = []
         for layer in self.tmx_data.layers:
@@ -128,6 +134,7 @@ class GameMap:
 
                         # Store both rect and z_index
                         self.elevation_colliders.append({"rect": rect, "z_index": z_index})
+                        self.grid.add_elevation(x, y, z_index)
                         # print(f"Evelation Colliders")
                         # print(self.elevation_colliders)
 
@@ -150,7 +157,9 @@ class GameMap:
                         )
                         print(f"Tile ({x},{y}) gid={gid}, target_map={target_map}, player_index={player_index}, sx={spawn_x}, sy={spawn_y}")  # debug
                         if target_map:
-                            self.portals.append(Portal(rect, target_map, int(float(spawn_x)), int(float(spawn_y)), player_index))
+                            portal = Portal(rect, target_map, int(float(spawn_x)), int(float(spawn_y)), player_index)
+                            self.portals.append(portal)
+                            self.grid.add_portal(x, y, portal)
 
         print(f"Total portals loaded: {len(self.portals)}")
 
@@ -217,7 +226,4 @@ class GameMap:
         """
         Returns the portal that the player is colliding with, or None.
         """
-        for portal in self.portals:
-            if portal.rect.colliderect(player_rect):
-                return portal
-        return None
+        return self.grid.portal_at(player_rect)
@@ -147,7 +147,7 @@ class Player:
             self.frame_h - (self.pad_top + self.pad_bottom)
         )
 
-    def move(self, dx, dy, dt, colliders, elevations):
+    def move(self, dx, dy, dt, grid):
         moving = dx != 0 or dy != 0
 
         # --- Animation selection ---
@@ -168,20 +168,18 @@ class Player:
         new_y = self.y + move_y
         future_rect = self.get_hitbox(new_x, new_y)
 
-        for collider in colliders:
-            if self.z_index == collider["z_index"] and future_rect.colliderect(collider["rect"]):
-                if dx != 0: move_x = 0
-                if dy != 0: move_y = 0
-                future_rect = self.get_hitbox(self.x + move_x, self.y + move_y)
+        if grid.collides(future_rect, self.z_index):
+            if dx != 0: move_x = 0
+            if dy != 0: move_y = 0
+            future_rect = self.get_hitbox(self.x + move_x, self.y + move_y)
 
         self.x += move_x
         self.y += move_y
         self.rect = future_rect
 
-        for elevation in elevations:
-            if "z_index" in elevation and self.rect.colliderect(elevation["rect"]):
-                self.z_index = elevation["z_index"]
-                break
+        z_index = grid.elevation_in(self.rect)
+        if z_index is not None:
+            self.z_index = z_index
 
         # Update direction
         if dx > 0: self.direction = "right"
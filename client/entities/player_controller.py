@@ -64,7 +64,7 @@ class PlayerController:
 
         # --- Apply movement ---
         if current_map:
-            self.player.move(dx, dy, dt, current_map.colliders, current_map.elevation_colliders)
+            self.player.move(dx, dy, dt, current_map.grid)
 
         # Save moving & running state
         self.player.moving = moving
@@ -145,8 +145,8 @@ class PlayerController:
             player.render_x = getattr(player, "render_x", player.x)
             player.render_y = getattr(player, "render_y", player.y)
 
-            # Interpolation
-            interp_speed = 10.0
+            # Interpolation: close the gap over the client's interpolation delay
+            interp_speed = 1.0 / client.interpolation_delay()
             dx = player.target_x - player.render_x
             dy = player.target_y - player.render_y
             player.render_x += dx * min(dt * interp_speed, 1)
@@ -308,10 +308,7 @@ class PlayerController:
 
         # --- Opaque tile fade ---
         if current_map and hasattr(current_map, "opaque_tiles"):
-            colliding = any(
-                self.player.rect.colliderect(tile["rect"]) and self.player.z_index == tile["z_index"]
-                for tile in current_map.opaque_tiles
-            )
+            colliding = current_map.grid.opaque_at(self.player.rect, self.player.z_index)
 
             target_alpha = 150 if colliding else 255
             fade_speed = 300 * dt
@@ -4,7 +4,7 @@ import pygame
 
 class WorldTime:
     """
-    Handles accelerated in-game time based on server UTC time.
+    Handles accelerated in-game time based on the synced server clock (UTC).
     1 real second = 1 in-game minute.
     Provides formatted time string and lighting alpha values.
     """
@@ -13,15 +13,13 @@ class WorldTime:
         self.current_time = "00:00"
         self.font = font
 
-    def update(self, server_time_str):
+    def update(self, server_time):
         """
-        Convert server-provided UTC time to accelerated game time.
+        Convert server UTC time (seconds since the epoch) to accelerated game time.
         """
         try:
-            h, m, s = map(int, server_time_str.split(":"))
-
             # Total real seconds since midnight
-            total_seconds = h * 3600 + m * 60 + s
+            total_seconds = int(server_time) % 86400
 
             # Accelerated: 1 real second = 1 in-game minute
             total_game_minutes = total_seconds
@@ -1,12 +1,78 @@
  #client/network/client.py
-import socket, threading, msgpack
+import math, socket, threading, secrets
 import pygame
 from ..entities.player import Player
 from ..entities import game_map
+from shared.delta import apply_delta
+from shared import compress, schema
+from shared import session
+from shared import wire
+from shared.clock import ClockSync
+from shared.reliable import MAX_RTO, ReliableChannel
+from shared.packetizer import Reassembler
 import config
 import time
 
 
+class MoveSendPolicy:
+    """
+    Decides which frames' moves are worth sending. Between moves the server
+    carries the player along the last reported velocity (dead reckoning), so
+    a move is only needed when the state changes, when the player drifts from
+    that prediction, or when the keepalive is due; the keepalive is also what
+    carries snapshot acks for an idle player.
+    """
+
+    STATE_FIELDS = ("direction", "moving", "current_map", "z_index", "attacking", "running",
+                    "jumping", "long_attacking", "charging_attack")
+
+    def __init__(self, threshold, keepalive):
+        self.threshold = threshold  # px of prediction error before a move is sent
+        self.keepalive = keepalive  # seconds between moves when nothing changes
+        self.last = None            # (state, x, y, vx, vy, time) of the last move sent
+        self.prev = None            # (x, y, time) of the previous frame, for velocity
+        self.counters = {"frames": 0, "sent": 0, "state": 0, "error": 0, "keepalive": 0}
+
+    def velocity(self, x, y, moving, now):
+        prev = self.prev
+        self.prev = (x, y, now)
+        if not moving or prev is None or now <= prev[2]:
+            return 0.0, 0.0
+        dt = now - prev[2]
+        return (x - prev[0]) / dt, (y - prev[1]) / dt
+
+    def should_send(self, msg, now):
+        self.counters["frames"] += 1
+        reason = self.reason(msg, now)
+        if reason is None:
+            return False
+        self.counters[reason] += 1
+        self.counters["sent"] += 1
+        state = tuple(msg.get(f) for f in self.STATE_FIELDS)
+        self.last = (state, msg["x"], msg["y"], msg["vx"], msg["vy"], now)
+        return True
+
+    def reason(self, msg, now):
+        if self.last is None:
+            return "state"
+        state, x, y, vx, vy, sent_at = self.last
+        if tuple(msg.get(f) for f in self.STATE_FIELDS) != state:
+            return "state"
+        elapsed = now - sent_at
+        if math.hypot(msg["x"] - (x + vx * elapsed), msg["y"] - (y + vy * elapsed)) > self.threshold:
+            return "error"
+        if elapsed >= self.keepalive:
+            return "keepalive"
+        return None
+
+    def reset(self):
+        self.last = None
+        self.prev = None
+
+    def stats(self):
+        return dict(self.counters, saved=self.counters["frames"] - self.counters["sent"])
+
+
 class Client:
     def __init__(self, player_sprite_path, anim_meta, frame_w=64, frame_h=64):
         self.token = None
@@ -23,23 +89,80 @@ class Client:
         self.scene_manager = None
         self.anim_meta = anim_meta
 
+        # Delta snapshots: seq -> {"players": {id: state}, "enemies": {id: state}}
+        self.snapshots = {}
+        self.applied_seq = None   # newest snapshot rebuilt and applied
+        self.snapshot_ack = None  # sent back to the server with each move
+        self.snapshots_received = 0  # complete snapshots, reported so the server can see loss
+        self.snapshot_ack_time = None  # when the acked snapshot arrived; the server subtracts the wait
+        self.reassembler = Reassembler(config.FRAGMENT_TIMEOUT)
+
+        # Wire schema version agreed with the server in assign_id
+        self.schema = 0
+
+        # Session issued at join; later packets carry it instead of the token
+        self.session_id = None
+        self.session_key = None
+        self.server_addr = None
+        # From assign_id: gets this connection back in after a drop without logging in again
+        self.resume_ticket = None
+        self.resuming = False
+        self.last_heard = 0.0  # monotonic time of the last datagram from the server
+
+        # Static entity descriptors from spawn messages, by id
+        self.descriptors = {"players": {}, "enemies": {}}
+
+        # Server clock estimate from join/assign_id and ping/pong
+        self.clock = ClockSync()
+        self.next_ping = 0.0
+        self.snapshot_time = None  # server time of the newest applied snapshot
+        self.snapshot_lag = None   # how old it was when applied
+
+        # Reliable control messages; join is resent on its own until answered
+        self.channel = ReliableChannel()
+        self.channel_lock = threading.Lock()
+        self.conn = None
+        self.join_id = 0
+        self.join_pending = False
+        self.join_sent_at = 0.0
+        self.join_retries = 0
+
+        # Moves go out on change, on drift from the server's prediction, or on keepalive
+        self.move_policy = MoveSendPolicy(config.MOVE_ERROR_THRESHOLD, config.MOVE_KEEPALIVE)
 
     def connect(self, server_ip, server_port, token):
         self.token = token
+        self.snapshots = {}
+        self.applied_seq = None
+        self.snapshot_ack = None
+        self.snapshots_received = 0
+        self.snapshot_ack_time = None
+        self.move_policy.reset()
+        self.reassembler = Reassembler(config.FRAGMENT_TIMEOUT)
+        self.schema = 0
+        self.session_id = None
+        self.session_key = None
+        self.resume_ticket = None
+        self.resuming = False
+        self.last_heard = time.monotonic()
+        self.channel = ReliableChannel()
+        self.descriptors = {"players": {}, "enemies": {}}
+        self.clock = ClockSync()
+        self.next_ping = 0.0
+        self.conn = secrets.randbits(32)
+        self.join_id = 0
 
         # Use passed values or fallback to config
         ip = server_ip if server_ip else config.HOST
         port = server_port if server_port else config.PORT
+        self.server_addr = (ip, port)
 
         if self.client_socket is None:
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.client_socket.settimeout(1.0)
+            self.client_socket.settimeout(0.1)  # short, so retransmits are checked often
 
         try:
-            self.client_socket.sendto(
-                msgpack.packb({"type": "join", "token": token}, use_bin_type=True),
-                (ip, port)
-            )
+            self.send_join()
         except Exception as e:
             print("Failed to send join:", e)
             return
@@ -48,231 +171,510 @@ class Client:
 
             while True:
                 try:
-                    data, _ = self.client_socket.recvfrom(4096)
-                    message = msgpack.unpackb(data, raw=False)
-
-                    if message["type"] == "assign_id":
-                        self.local_player_id = message["player_id"]
-                        self.local_player.id = self.local_player_id
-                        if "player_data" in message:
-                            data = message["player_data"]
-                            print(f"[CLIENT] Assigned Player ID: {self.local_player_id} with data: {data}")
-                            self.local_player.name = data.get("name", self.local_player.name)
-                            self.local_player.x = data.get("x", 100)
-                            self.local_player.y = data.get("y", 100)
-                            self.local_player.direction = data.get("direction", "down")
-                            self.local_player.z_index = data.get("z_index", 0)
-                            self.local_player.class_type = data.get("class_type", "mage")
-                            print(f"[CLIENT] Character Name: {self.local_player.name}, Class Type: {self.local_player.class_type}")
-                            if "current_map" in data:
-                                self.local_player.current_map = data["current_map"]
-                                # Tell GameScene to load it
-                                if hasattr(self.scene_manager.scenes["game"], "load_map"):
-                                    self.scene_manager.scenes["game"].load_map(data["current_map"])
-
-                        if "players" in message:
-                            for p in message["players"]:
-                                if p["id"] != self.local_player_id and p["id"] not in self.players:
-                                    player = Player(
-                                        p["id"],
-                                        p["name"],
-                                        pygame.image.load(self.player_sprite_path).convert_alpha(),
-                                        p["x"],
-                                        p["y"]
-                                    )
-                                    player.class_type = p.get("class_type", "mage")
-                                    player.render_x = p["x"]
-                                    player.render_y = p["y"]
-                                    # There is no Default map (I002)
-                                    player.current_map = p.get("current_map", "DefaultMap")
-                                    self.players[p["id"]] = player
-
-
-                    elif message["type"] == "update":
-                        for p in message["players"]:
-                            #print(f"[DEBUG RECV] Player {p['id']} | pos=({p['x']},{p['y']}) moving={p.get('moving')} running={p.get('running')} direction={p.get('direction')} attacking={p.get('attacking')}")
-
-                            if p["id"] == self.local_player_id:
-                                # Store server authoritative position
-                                self.local_player.server_x = p["x"]
-                                self.local_player.server_y = p["y"]
-                                self.local_player.direction = p["direction"]
-                                self.local_player.moving = p["moving"]
-                                self.local_player.current_map = p.get("current_map", self.local_player.current_map)
-                                self.local_player.z_index = p.get("z_index", getattr(self.local_player, "z_index", 0))
-                                self.scene_manager.scenes["game"].server_time = message["world_time"]
-                                
-                                
-                            else:
-                                if p["id"] not in self.players:
-                                    player = Player(
-                                        p["id"], 
-                                        p["name"],
-                                        pygame.image.load(self.player_sprite_path).convert_alpha(),
-                                        self.anim_meta,
-                                        p["x"], 
-                                        p["y"]
-                                    )
-                                    player.render_x = p["x"]
-                                    player.render_y = p["y"]
-                                    # There is no Default map (I002)
-                                    player.current_map = p.get("current_map", "DefaultMap")
-                                    player.z_index = p.get("z_index", 0) 
-                                    self.players[p["id"]] = player
-                                else:
-                                    player = self.players[p["id"]]
-
-                                    # **If map changed, snap immediately**
-                                    if player.current_map != p.get("current_map", player.current_map):
-                                        player.render_x = p["x"]
-                                        player.render_y = p["y"]
-                                        player.prev_x = p["x"]
-                                        player.prev_y = p["y"]
-                                    else:
-                                        # Normal interpolation
-                                        player.prev_x = player.render_x
-                                        player.prev_y = player.render_y
-
-                                    # Update interpolation targets
-                                    player.prev_x = player.render_x
-                                    player.prev_y = player.render_y
-                                    player.target_x = p["x"]
-                                    player.target_y = p["y"]
-                                    player.last_update_time = time.time()
-                                    player.direction = p["direction"]
-                                    player.attack_direction = p["direction"]
-                                    player.moving = p["moving"]
-                                    player.current_map = p.get("current_map", player.current_map)
-                                    player.z_index = p.get("z_index", getattr(player, "z_index", 0))
-                                    player.attacking = p.get("attacking", False)
-                                    player.running = p.get("running", False)
-                                    player.jumping = p.get("jumping", False)
-                                    player.long_attacking = p.get("long_attacking", False)
-                                    player.charging_attack = p.get("charging_attack", False)
-
-                                    if p.get('running'):
-                                        print(f"[SERVER UPDATE] Player {p['id']}: moving={p.get('moving')} running={p.get('running')}")
-
-                            
-                        # --- Sync enemies (if server sent them) ---
-                        if "enemies" in message and self.scene_manager and self.scene_manager.current_scene:
-                            game_scene = self.scene_manager.scenes.get("game", self.scene_manager.current_scene)
-                            ec = getattr(game_scene, "enemy_controller", None)
-                            if ec is not None:
-                                for e in message["enemies"]:
-                                    eid = e.get("id")
-                                    if eid is None:
-                                        continue
-                                    
-                                    enemy_data = {
-                                        "x": e.get("x", 0),
-                                        "y": e.get("y", 0),
-                                        "rows": e.get("rows", 1),
-                                        "columns": e.get("columns", 11),
-                                        "type": e.get("type", "green-slime"),
-                                        "current_map": e.get("current_map", "Test_01"),
-                                        "hp": e.get("hp", 10),
-                                        "speed": e.get("speed", 100.0),
-                                        "frame_speed": e.get("frame_speed", 0.12),
-                                        "directions": e.get("directions", ["down"]),
-                                        "z_index": e.get("z_index", 0),
-                                        "c_h_padding": e.get("c_h_padding", 0),
-                                        "c_v_padding": e.get("c_v_padding", 0),
-                                        "moving": e.get("moving", True),
-                                    }
-
-                                    if eid not in ec.enemies:
-                                        ec.add_enemy(eid, enemy_data)  # pass a dict now
-
-                                    try:
-                                        ec.enemies[eid].apply_server_update(e)
-                                    except Exception as exc:
-                                        print(f"[CLIENT] Failed to apply server update to enemy {eid}: {exc}")
-
-                    elif message["type"] == "player_disconnect":
-                        pid = message["player_id"]
-                        if pid in self.players:
-                            print(f"[CLIENT] Removing disconnected player {pid}")
-                            del self.players[pid]
-
-                    elif message["type"] == "map_switch":
-                        self.local_player.current_map = message["map"]
-                        self.local_player.x = message["x"]
-                        self.local_player.y = message["y"]
-
-                        # Reset interpolation to avoid sliding
-                        self.local_player.prev_x = self.local_player.x
-                        self.local_player.prev_y = self.local_player.y
-                        self.local_player.target_x = self.local_player.x
-                        self.local_player.target_y = self.local_player.y
-                        self.local_player.last_update_time = time.time()
-
-                        # Freeze the player during fade
-                        print("[CLIENT] Received map_switch:", message)
-                        self.scene_manager.current_scene.player_controller.frozen = True
-                        
-                        print("[CLIENT] Set frozen True on current_scene")
-
-
-                        # Start fade and provide portal info for spawn
-                        self.scene_manager.start_fade("game")
-                        print("[CLIENT] start_fade called")
-
-                        # Once fade completes, load the map
-                        self.scene_manager.on_map_data_received(message["map"])
-                        print("[CLIENT] on_map_data_received called")
-                        #self.scene_manager.scenes["game"].player_controller.frozen = False
-
-
-                        print(f"[INFO] Map switch requested: {message['map']} at ({message['x']}, {message['y']})")
-
-                    elif message["type"] == "save_confirm":
-                        print(f"[SERVER] {message['message']}")
-                        if self.scene_manager and "game" in self.scene_manager.scenes:
-                            game_scene = self.scene_manager.scenes["game"]
-                            
-                            game_scene.toast_manager.add_toast(message["message"])
-
+                    data, _ = self.client_socket.recvfrom(config.BUFFER_SIZE)
+                    self.last_heard = time.monotonic()
+                    if compress.is_compressed(data):
+                        data = compress.decompress(data)  # None if corrupt
+                    if data is not None:
+                        self.receive(schema.unpack(data))
                 except socket.timeout:
-                    continue
+                    pass
                 except Exception as e:
                     print("Connection error:", e)
                     break
+                self.resend_reliable()
+                self.send_ping_if_due()
+                self.check_silence()
 
         threading.Thread(target=listen_server, daemon=True).start()
 
+    def receive(self, message):
+        """Acks and reliable ordering first, then the message handlers."""
+        with self.channel_lock:
+            if "rack" in message:
+                self.channel.on_ack(message["rack"], message.get("rsack"))
+            if "rel" not in message:
+                ready = [message]
+            else:
+                ready = self.channel.receive(message)
+
+        for ready_message in ready:
+            self.handle_message(ready_message)
+
+        if "rel" in message:
+            with self.channel_lock:
+                ack = dict(self.channel.ack_fields(), type="rel_ack")
+            self.send(ack, self.server_addr)
+
+    def handle_message(self, message):
+        if message["type"] == "assign_id":
+            self.local_player_id = message["player_id"]
+            self.schema = message.get("schema", 0)
+            self.set_session(message)
+            self.resume_ticket = message.get("resume")
+            self.join_pending = False
+            self.resuming = False
+            self.on_clock_sample(message)
+            self.local_player.id = self.local_player_id
+            if "player_data" in message:
+                data = message["player_data"]
+                print(f"[CLIENT] Assigned Player ID: {self.local_player_id} with data: {data}")
+                self.local_player.name = data.get("name", self.local_player.name)
+                self.local_player.x = data.get("x", 100)
+                self.local_player.y = data.get("y", 100)
+                self.local_player.direction = data.get("direction", "down")
+                self.local_player.z_index = data.get("z_index", 0)
+                self.local_player.class_type = data.get("class_type", "mage")
+                print(f"[CLIENT] Character Name: {self.local_player.name}, Class Type: {self.local_player.class_type}")
+                if "current_map" in data:
+                    self.local_player.current_map = data["current_map"]
+                    # Tell GameScene to load it
+                    if hasattr(self.scene_manager.scenes["game"], "load_map"):
+                        self.scene_manager.scenes["game"].load_map(data["current_map"])
+
+            if "players" in message:
+                for p in message["players"]:
+                    if p["id"] != self.local_player_id and p["id"] not in self.players:
+                        player = Player(
+                            p["id"],
+                            p["name"],
+                            pygame.image.load(self.player_sprite_path).convert_alpha(),
+                            p["x"],
+                            p["y"]
+                        )
+                        player.class_type = p.get("class_type", "mage")
+                        player.render_x = p["x"]
+                        player.render_y = p["y"]
+                        # There is no Default map (I002)
+                        player.current_map = p.get("current_map", "DefaultMap")
+                        self.players[p["id"]] = player
+
+
+        elif message["type"] == "update":
+            # Fragments are held until their snapshot is complete or times out
+            for update in self.reassembler.add(message):
+                if not update.get("partial"):
+                    self.snapshots_received += 1
+                self.apply_update(update)
+
+        elif message["type"] == "player_disconnect":
+            pid = message["player_id"]
+            if pid in self.players:
+                print(f"[CLIENT] Removing disconnected player {pid}")
+                del self.players[pid]
+
+        elif message["type"] == "map_switch":
+            self.local_player.current_map = message["map"]
+            self.local_player.x = message["x"]
+            self.local_player.y = message["y"]
+
+            # Reset interpolation to avoid sliding
+            self.local_player.prev_x = self.local_player.x
+            self.local_player.prev_y = self.local_player.y
+            self.local_player.target_x = self.local_player.x
+            self.local_player.target_y = self.local_player.y
+            self.local_player.last_update_time = time.time()
+
+            # Freeze the player during fade
+            print("[CLIENT] Received map_switch:", message)
+            self.scene_manager.current_scene.player_controller.frozen = True
+
+            print("[CLIENT] Set frozen True on current_scene")
+
+
+            # Start fade and provide portal info for spawn
+            self.scene_manager.start_fade("game")
+            print("[CLIENT] start_fade called")
+
+            # Once fade completes, load the map
+            self.scene_manager.on_map_data_received(message["map"])
+            print("[CLIENT] on_map_data_received called")
+            #self.scene_manager.scenes["game"].player_controller.frozen = False
+
+
+            print(f"[INFO] Map switch requested: {message['map']} at ({message['x']}, {message['y']})")
+
+        elif message["type"] == "pong":
+            self.on_clock_sample(message)
+
+        elif message["type"] == "spawn":
+            self.on_spawn(message)
+
+        elif message["type"] == "despawn":
+            self.on_despawn(message)
+
+        elif message["type"] == "session":
+            self.set_session(message)
+            self.join_pending = False
+            self.resuming = False
+
+        elif message["type"] == "session_expired":
+            # Address changed or session timed out: resume if we can, show the token otherwise
+            if not self.join_pending:
+                self.session_id = None
+                self.session_key = None
+                self.send_join(resume=self.resume_ticket is not None)
+
+        elif message["type"] == "resume_failed":
+            # Parked too long (or the server restarted): a full login
+            if self.resuming:
+                self.resume_ticket = None
+                self.send_join()
+
+        elif message["type"] == "save_confirm":
+            print(f"[SERVER] {message['message']}")
+            if self.scene_manager and "game" in self.scene_manager.scenes:
+                game_scene = self.scene_manager.scenes["game"]
+
+                game_scene.toast_manager.add_toast(message["message"])
+
+    def apply_update(self, message):
+        """Apply one (reassembled) "update" snapshot to the local and remote entities."""
+        if not self.rebuild_snapshot(message):
+            return
+
+        # Date the snapshot by its tick on the synced clock
+        self.snapshot_time = self.clock.tick_time(message.get("tick"))
+        if self.snapshot_time is not None:
+            self.snapshot_lag = self.clock.now() - self.snapshot_time
+
+        for p in message["players"]:
+            #print(f"[DEBUG RECV] Player {p['id']} | pos=({p['x']},{p['y']}) moving={p.get('moving')} running={p.get('running')} direction={p.get('direction')} attacking={p.get('attacking')}")
+
+            if p["id"] == self.local_player_id:
+                # Store server authoritative position
+                self.local_player.server_x = p["x"]
+                self.local_player.server_y = p["y"]
+                self.local_player.direction = p["direction"]
+                self.local_player.moving = p["moving"]
+                self.local_player.current_map = p.get("current_map", self.local_player.current_map)
+                self.local_player.z_index = p.get("z_index", getattr(self.local_player, "z_index", 0))
+
+
+            else:
+                if p["id"] not in self.players:
+                    # Remote players only appear once their spawn arrived
+                    descriptor = self.descriptors["players"].get(p["id"])
+                    if descriptor is not None:
+                        self.spawn_player(dict(descriptor, **p))
+                else:
+                    player = self.players[p["id"]]
+
+                    # **If map changed, snap immediately**
+                    if player.current_map != p.get("current_map", player.current_map):
+                        player.render_x = p["x"]
+                        player.render_y = p["y"]
+                        player.prev_x = p["x"]
+                        player.prev_y = p["y"]
+                    else:
+                        # Normal interpolation
+                        player.prev_x = player.render_x
+                        player.prev_y = player.render_y
+
+                    # Update interpolation targets
+                    player.prev_x = player.render_x
+                    player.prev_y = player.render_y
+                    player.target_x = p["x"]
+                    player.target_y = p["y"]
+                    player.last_update_time = time.time()
+                    player.direction = p["direction"]
+                    player.attack_direction = p["direction"]
+                    player.moving = p["moving"]
+                    player.current_map = p.get("current_map", player.current_map)
+                    player.z_index = p.get("z_index", getattr(player, "z_index", 0))
+                    player.attacking = p.get("attacking", False)
+                    player.running = p.get("running", False)
+                    player.jumping = p.get("jumping", False)
+                    player.long_attacking = p.get("long_attacking", False)
+                    player.charging_attack = p.get("charging_attack", False)
+
+                    if p.get('running'):
+                        print(f"[SERVER UPDATE] Player {p['id']}: moving={p.get('moving')} running={p.get('running')}")
+
+
+        # --- Sync enemies (if server sent them) ---
+        if "enemies" in message and self.scene_manager and self.scene_manager.current_scene:
+            game_scene = self.scene_manager.scenes.get("game", self.scene_manager.current_scene)
+            ec = getattr(game_scene, "enemy_controller", None)
+            if ec is not None:
+                for e in message["enemies"]:
+                    eid = e.get("id")
+                    if eid is None:
+                        continue
+
+                    if eid not in ec.enemies:
+                        descriptor = self.descriptors["enemies"].get(eid)
+                        if descriptor is None:
+                            continue  # spawn not here yet
+                        self.spawn_enemy(ec, dict(descriptor, **e))
+
+                    try:
+                        ec.enemies[eid].apply_server_update(e)
+                    except Exception as exc:
+                        print(f"[CLIENT] Failed to apply server update to enemy {eid}: {exc}")
+
+    # ---------------- Spawn / Despawn ----------------
+    def enemy_controller(self):
+        if not (self.scene_manager and self.scene_manager.current_scene):
+            return None
+        game_scene = self.scene_manager.scenes.get("game", self.scene_manager.current_scene)
+        return getattr(game_scene, "enemy_controller", None)
+
+    def on_spawn(self, message):
+        """Keep the static descriptors and create the entities (enemies wait for a controller)."""
+        for p in message.get("players", []):
+            self.descriptors["players"][p["id"]] = p
+            if p["id"] != self.local_player_id and p["id"] not in self.players:
+                self.spawn_player(p)
+
+        ec = self.enemy_controller()
+        for e in message.get("enemies", []):
+            self.descriptors["enemies"][e["id"]] = e
+            if ec is not None and e["id"] not in ec.enemies:
+                self.spawn_enemy(ec, e)
+
+    def on_despawn(self, message):
+        for pid in message.get("players", []):
+            self.descriptors["players"].pop(pid, None)
+            self.players.pop(pid, None)
+
+        ec = self.enemy_controller()
+        for eid in message.get("enemies", []):
+            self.descriptors["enemies"].pop(eid, None)
+            if ec is not None:
+                ec.enemies.pop(eid, None)
+
+    def spawn_player(self, p):
+        player = Player(
+            p["id"],
+            p["name"],
+            pygame.image.load(self.player_sprite_path).convert_alpha(),
+            self.anim_meta,
+            p["x"],
+            p["y"]
+        )
+        player.render_x = p["x"]
+        player.render_y = p["y"]
+        # There is no Default map (I002)
+        player.current_map = p.get("current_map", "DefaultMap")
+        player.z_index = p.get("z_index", 0)
+        self.players[p["id"]] = player
+
+    def spawn_enemy(self, ec, e):
+        enemy_data = {
+            "x": e.get("x", 0),
+            "y": e.get("y", 0),
+            "rows": e.get("rows", 1),
+            "columns": e.get("columns", 11),
+            "type": e.get("type", "green-slime"),
+            "current_map": e.get("current_map", "Test_01"),
+            "hp": e.get("hp", 10),
+            "speed": e.get("speed", 100.0),
+            "frame_speed": e.get("frame_speed", 0.12),
+            "directions": e.get("directions", ["down"]),
+            "z_index": e.get("z_index", 0),
+            "c_h_padding": e.get("c_h_padding", 0),
+            "c_v_padding": e.get("c_v_padding", 0),
+            "moving": e.get("moving", True),
+        }
+        ec.add_enemy(e["id"], enemy_data)  # pass a dict now
+
+    def rebuild_snapshot(self, message):
+        """
+        Expand a delta "update" in place into full player/enemy lists, using the
+        baseline snapshot it was diffed against. Returns False if the update is
+        stale or its baseline is gone, in which case it must be skipped.
+        Partial updates (lost fragments) only carry the entities that arrived.
+        """
+        seq = message.get("seq")
+        if seq is None:
+            return True
+        if self.applied_seq is not None and seq <= self.applied_seq:
+            return False
+
+        base_seq = message.get("base")
+        if base_seq is None:
+            base = {"players": {}, "enemies": {}}
+        elif base_seq in self.snapshots:
+            base = self.snapshots[base_seq]
+        else:
+            # Baseline already dropped; a negative ack asks for a full snapshot
+            self.snapshot_ack = -1
+            return False
+
+        if message.get("partial"):
+            # Some fragments were lost: show what arrived, but never keep it as a baseline
+            message["players"] = [dict(base["players"].get(d["id"], ()), **d) for d in message["players"]]
+            message["enemies"] = [dict(base["enemies"].get(d["id"], ()), **d) for d in message["enemies"]]
+            return True
+
+        players = apply_delta(base["players"], message["players"], message.get("removed_players", []))
+        enemies = apply_delta(base["enemies"], message["enemies"], message.get("removed_enemies", []))
+
+        message["players"] = list(players.values())
+        message["enemies"] = list(enemies.values())
+
+        self.snapshots[seq] = {"players": players, "enemies": enemies}
+        for old in [s for s in self.snapshots if s < seq - 64]:
+            del self.snapshots[old]
+
+        self.applied_seq = seq
+        self.snapshot_ack = seq
+        self.snapshot_ack_time = time.monotonic()
+        return True
+
     def send_portal_enter(self, target_map, spawn_x, spawn_y, server_ip, server_port):
         msg = {
             "type": "portal_enter",
             "target_map": target_map,
             "spawn_x": spawn_x,
             "spawn_y": spawn_y,
-            "token": self.token
         }
-        self.client_socket.sendto(msgpack.packb(msg, use_bin_type=True), (server_ip, server_port))
+        with self.channel_lock:
+            msg = self.channel.wrap(msg)
+        self.send(msg, (server_ip, server_port))
 
     def send_move(self, x, y, direction, moving, server_ip, server_port, attacking, running, jumping, long_attacking, charging_attack):
+        """Called every frame; only the moves the send policy wants go out."""
         if not self.token:
             return
+        now = time.monotonic()
+        vx, vy = self.move_policy.velocity(x, y, moving, now)
         msg = {
             "type": "move",
             "x": x,
             "y": y,
+            "vx": vx,
+            "vy": vy,
             "direction": direction,
             "moving": moving,
             "current_map": self.local_player.current_map,
             "z_index": self.local_player.z_index,
-            "token": self.token,
             "attacking": self.local_player.attacking,
             "running": self.local_player.running,
             "jumping": self.local_player.jumping,
             "long_attacking": self.local_player.long_attacking,
-            "charging_attack": self.local_player.charging_attack
+            "charging_attack": self.local_player.charging_attack,
+            "ack": self.snapshot_ack,
+            "rcv": self.snapshots_received,
         }
+        if not self.move_policy.should_send(msg, now):
+            return
+        if self.snapshot_ack_time is not None:
+            msg["ack_delay"] = int((now - self.snapshot_ack_time) * 1000)
+        with self.channel_lock:
+            msg.update(self.channel.ack_fields())
         # if self.local_player.running:
         #     print(f"[DEBUG SEND] x={x:.1f} y={y:.1f} dir={direction} moving={moving} running={self.local_player.running} attacking={self.local_player.attacking}")
 
-        self.client_socket.sendto(msgpack.packb(msg, use_bin_type=True), (server_ip, server_port))
+        self.send(msg, (server_ip, server_port))
+
+    def send_join(self, resume=False):
+        """
+        Join (or re-check the token), or with resume, present the resume ticket
+        instead. Resent until assign_id or session answers it.
+        """
+        self.join_id += 1
+        self.join_pending = True
+        self.resuming = resume
+        self.join_retries = 0
+        self.transmit_join()
+
+    def transmit_join(self):
+        self.join_sent_at = time.monotonic()
+        if self.resuming:
+            self.client_socket.sendto(
+                wire.add_header(schema.pack({
+                    "type": "resume",
+                    "ticket": self.resume_ticket,
+                    "conn": self.conn,
+                    "jid": self.join_id,
+                })),
+                self.server_addr
+            )
+            return
+        self.client_socket.sendto(
+            wire.add_header(schema.pack({
+                "type": "join",
+                "token": self.token,
+                "schema": schema.SCHEMA_VERSION,
+                "compress": compress.available(),
+                "conn": self.conn,
+                "jid": self.join_id,
+                "rseq": self.channel.first_unacked(),
+                "rexpect": self.channel.expected,
+                "t0": time.monotonic(),
+            })),
+            self.server_addr
+        )
+
+    # ---------------- Clock Sync ----------------
+    def on_clock_sample(self, message):
+        if message.get("t0") is None or message.get("t2") is None:
+            return
+        self.clock.add_sample(message["t0"], message["t1"], message["t2"])
+        if message.get("tick") is not None:
+            self.clock.set_anchor(message["tick"], message["tick_time"], message["step"])
+
+    def send_ping_if_due(self):
+        """Ping quickly until the clock estimate settles, then every PING_INTERVAL."""
+        if self.session_id is None or self.join_pending:
+            return
+        now = time.monotonic()
+        if now < self.next_ping:
+            return
+        settling = len(self.clock.samples) < self.clock.samples.maxlen
+        self.next_ping = now + (0.25 if settling else config.PING_INTERVAL)
+        self.send({"type": "ping", "t0": now}, self.server_addr)
+
+    def check_silence(self):
+        """
+        The server does not answer frames from sessions it has forgotten, so
+        hearing nothing (not even a pong) for SERVER_SILENCE means ours is
+        gone: resume if we can, log in again otherwise.
+        """
+        if self.session_id is None or self.join_pending:
+            return
+        if time.monotonic() - self.last_heard < config.SERVER_SILENCE:
+            return
+        self.session_id = None
+        self.session_key = None
+        self.last_heard = time.monotonic()
+        self.send_join(resume=self.resume_ticket is not None)
+
+    def server_time(self):
+        """Synced server clock (UTC seconds)."""
+        return self.clock.now()
+
+    def interpolation_delay(self):
+        return self.clock.interpolation_delay(config.UPDATE_RATE)
+
+    def resend_reliable(self):
+        now = time.monotonic()
+        if self.join_pending:
+            # Nothing else can get through until the server knows us again
+            if now - self.join_sent_at >= min(MAX_RTO, self.channel.rto * 2 ** self.join_retries):
+                self.join_retries += 1
+                self.transmit_join()
+            return
+        with self.channel_lock:
+            resend = self.channel.due(now)
+        for msg in resend:
+            self.send(msg, self.server_addr)
+
+    def set_session(self, message):
+        if message.get("session_id") is not None:
+            self.session_id = message["session_id"]
+            self.session_key = message["session_key"]
+
+    def send(self, msg, addr):
+        """Send in a session frame once we have a session, with the token before that."""
+        if self.session_id is None:
+            msg = dict(msg, token=self.token)
+            self.client_socket.sendto(wire.add_header(schema.pack(msg, self.schema)), addr)
+            return
+        payload = schema.pack(msg, self.schema)
+        self.client_socket.sendto(wire.add_header(session.seal(self.session_id, self.session_key, payload)), addr)
 
     def set_scene_manager(self, scene_manager):
         self.scene_manager = scene_manager
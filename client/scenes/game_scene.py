@@ -66,7 +66,6 @@ class GameScene:
         
 
         self.camera = Camera(config.WIDTH, config.HEIGHT, zoom=1.0)
-        self.server_time = "00:00:00"
         self.world_time = WorldTime(self.font)
         self.rain = Rain(config.WIDTH, config.HEIGHT, density=450, fall_speed=15, wind=1, drop_length=8, thickness=1, overlay_color=(50, 50, 60), overlay_alpha=120)
         self.snow = Snow(config.WIDTH, config.HEIGHT, density=150, start_time=5000)
@@ -186,7 +185,7 @@ class GameScene:
         
 
         self.toast_manager.update()
-        self.world_time.update(self.server_time)
+        self.world_time.update(self.client.server_time())
         self.scene_manager.game_cursor.update(self.local_player.charging_attack, dt)
         
 
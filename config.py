@@ -2,7 +2,6 @@
 
 import configparser
 import os
-import pygame
 
 # Create parser and read INI
 config = configparser.ConfigParser()
@@ -17,6 +16,37 @@ PRR = config.getfloat("network", "PRR")
 BUFFER_SIZE = config.getint("network", "BUFFER_SIZE")
 UPDATE_RATE = config.getfloat("network", "UPDATE_RATE")
 TIMEOUT = config.getfloat("network", "TIMEOUT")
+AOI_RADIUS = config.getfloat("network", "AOI_RADIUS")
+AOI_CELL_SIZE = config.getint("network", "AOI_CELL_SIZE")
+MAX_DATAGRAM_SIZE = config.getint("network", "MAX_DATAGRAM_SIZE")
+FRAGMENT_TIMEOUT = config.getfloat("network", "FRAGMENT_TIMEOUT")
+SESSION_TTL = config.getfloat("network", "SESSION_TTL")
+PING_INTERVAL = config.getfloat("network", "PING_INTERVAL")
+SERVER_SILENCE = config.getfloat("network", "SERVER_SILENCE")
+MAX_UPDATE_INTERVAL = config.getfloat("network", "MAX_UPDATE_INTERVAL")
+CLIENT_BUDGET = config.getint("network", "CLIENT_BUDGET")
+MIN_CLIENT_BUDGET = config.getint("network", "MIN_CLIENT_BUDGET")
+MOVE_KEEPALIVE = config.getfloat("network", "MOVE_KEEPALIVE")
+MOVE_ERROR_THRESHOLD = config.getfloat("network", "MOVE_ERROR_THRESHOLD")
+COMPRESSION = config.getboolean("network", "COMPRESSION")
+COMPRESS_THRESHOLD = config.getint("network", "COMPRESS_THRESHOLD")
+COMPRESS_LEVEL = config.getint("network", "COMPRESS_LEVEL")
+
+# Server
+SERVER_CORE = config.get("server", "CORE")
+SIM_RATE = config.getfloat("server", "SIM_RATE")
+MAX_CATCH_UP = config.getint("server", "MAX_CATCH_UP")
+INBOX_LIMIT = config.getint("server", "INBOX_LIMIT")
+MAX_PACKET_SIZE = config.getint("server", "MAX_PACKET_SIZE")
+PACKET_RATE = config.getfloat("server", "PACKET_RATE")
+PACKET_BURST = config.getint("server", "PACKET_BURST")
+SEND_QUEUE_DEPTH = config.getint("server", "SEND_QUEUE_DEPTH")
+INGRESS_WORKERS = config.getint("server", "INGRESS_WORKERS")
+RESUME_GRACE = config.getfloat("server", "RESUME_GRACE")
+PRELOAD_MAPS = config.getboolean("server", "PRELOAD_MAPS")
+ENEMY_ENGINE = config.get("server", "ENEMY_ENGINE")
+ENEMY_PATHING = config.get("server", "ENEMY_PATHING")
+FLOW_FIELD_CACHE = config.getint("server", "FLOW_FIELD_CACHE")
 
 # Display
 WIDTH = config.getint("display", "WIDTH")
@@ -125,6 +155,7 @@ def get_network_address():
 
 def init_fonts():
     global font_small, font_medium, font_large
+    import pygame  # client only; the server runs without it
     font_small = pygame.font.SysFont("arial", 16)
     font_medium = pygame.font.SysFont("arial", 24)
     font_large = pygame.font.SysFont("arial", 30)
@@ -0,0 +1,178 @@
+# server/async_core.py
+# asyncio alternative to the threaded core in server/main.py.
+#
+# Message handling, the broadcast tick and the cleanup job all run on one
+# event loop thread. SQLite work (joins, autosave writes, token refresh)
+# runs on a single executor thread, so the shared lock is only contended
+# while a DB job touches player state, never by the tick itself.
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from server.message_handler import MessageHandler
+from server.utility import Utility
+from server import workers as ingress_workers
+from shared import session as frames
+
+
+class GameServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server.on_datagram(data, addr)
+
+    def error_received(self, exc):
+        # ICMP port unreachable from clients that went away, or a send the kernel refused
+        self.server.network.outbox.send_error(exc)
+
+
+class AsyncGameServer:
+    def __init__(self, network, player_manager, enemy_manager, lock, pool=None):
+        self.network = network
+        self.player_manager = player_manager
+        self.enemy_manager = enemy_manager
+        self.lock = lock
+        self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.handler = None
+        self.utils = None
+        self.flush_pending = False
+        self.pool = pool  # WorkerPool sharing the port, if any
+
+    # ---------------- Receive ----------------
+    def on_datagram(self, data, addr):
+        payload = self.handler.ingress.accept(data, addr)
+        if payload is None:
+            return
+        if frames.is_frame(payload):
+            # Session frames are checked in memory
+            self.handler.handle_session_frame(payload, addr)
+            return
+        msg = self.handler.ingress.unpack(payload)
+        if msg is None:
+            return
+
+        self.on_token_message(msg, addr)
+
+    def on_token_message(self, msg, addr):
+        token = msg.get("token")
+        if token in self.player_manager.tokens or msg.get("type") == "resume":
+            # Known token, or a resume ticket: all in memory (saves go to the executor via run_db)
+            self.handler.handle_message(msg, addr)
+        else:
+            # Unknown token: token check and player load hit SQLite
+            self.loop.run_in_executor(self.executor, self.handler.handle_message, msg, addr)
+
+    def on_worker_batch(self, conn):
+        """Inputs an ingress worker has already checked and decoded."""
+        if not self.pool.receive(conn, self.handler.handle_session_message, self.on_token_message):
+            self.loop.remove_reader(conn.fileno())
+
+    def run_db(self, fn, *args):
+        """DB writes a handler asks for (saves): on the executor, never on the loop."""
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self.report_db_error)
+
+    @staticmethod
+    def report_db_error(future):
+        if future.exception() is not None:
+            print(f"[ERROR] DB job failed: {future.exception()!r}")
+
+    # ---------------- Send ----------------
+    # The outbox is drained on the loop, right after whatever queued to it
+    # yields. Executor threads only wake the loop.
+    def wake(self):
+        if threading.get_ident() == self.loop_thread:
+            self.schedule_flush()
+        else:
+            self.loop.call_soon_threadsafe(self.schedule_flush)
+
+    def schedule_flush(self):
+        if not self.flush_pending:
+            self.flush_pending = True
+            self.loop.call_soon(self.flush)
+
+    def flush(self):
+        self.flush_pending = False
+        if not self.network.outbox.flush(self.send):
+            # The transport is buffering for a full socket; try again once it has drained
+            self.flush_pending = True
+            self.loop.call_later(0.005, self.flush)
+
+    def send(self, data, addr):
+        # The transport would queue without limit; treat its buffer as the kernel's being full
+        if self.transport.get_write_buffer_size():
+            raise BlockingIOError
+        self.transport.sendto(data, addr)
+
+    # ---------------- Periodic Jobs ----------------
+    async def tick_loop(self):
+        while self.running:
+            await asyncio.sleep(self.network.run_due())
+
+    async def cleanup_loop(self):
+        while self.running:
+            await asyncio.sleep(config.PRR)
+            self.utils.cleanup_once()
+
+    async def autosave_loop(self):
+        while self.running:
+            await asyncio.sleep(config.SAVE_INTERVAL)
+            rows = self.utils.collect_autosave()
+            if rows:
+                await self.loop.run_in_executor(self.executor, self.utils.write_autosave, rows)
+
+    async def refresh_tokens_loop(self):
+        while self.running:
+            await asyncio.sleep(config.DB_REFRESH_INTERVAL)
+            await self.loop.run_in_executor(self.executor, self.player_manager.refresh_active_tokens)
+
+    # ---------------- Run ----------------
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: GameServerProtocol(self),
+            local_addr=(config.HOST, config.PORT),
+            reuse_port=self.pool is not None,
+        )
+        self.transport = transport
+        self.loop_thread = threading.get_ident()
+        outbox = self.network.outbox
+        outbox.on_wake = self.wake
+
+        self.network.attach(self.player_manager, self.enemy_manager)
+        self.handler = MessageHandler(outbox, self.player_manager, self.lock,
+                                      self.network.interest, self.network.inputs, self.network.tick_anchor,
+                                      offload=self.run_db)
+        self.utils = Utility(self.lock, outbox, self.player_manager, self.enemy_manager,
+                             self.network.interest, self.network.inputs)
+        self.network.input_handler = self.handler.apply_inputs
+        if self.pool is not None:
+            for conn in self.pool.inputs:
+                self.loop.add_reader(conn.fileno(), self.on_worker_batch, conn)
+
+        print(f"[SERVER] asyncio server started on {config.HOST}:{config.PORT}")
+        try:
+            await asyncio.gather(
+                self.tick_loop(),
+                self.cleanup_loop(),
+                self.autosave_loop(),
+                self.refresh_tokens_loop(),
+            )
+        finally:
+            transport.close()
+            self.executor.shutdown(wait=False)
+
+
+def start_async_server(network, player_manager, enemy_manager, lock, workers=0):
+    pool = None
+    if workers and not ingress_workers.supported():
+        print("[WARN] SO_REUSEPORT is not available here; running without ingress workers")
+    elif workers:
+        # Forked before the event loop exists
+        pool = ingress_workers.WorkerPool(workers, config.HOST, config.PORT)
+        pool.start(player_manager.sessions)
+    server = AsyncGameServer(network, player_manager, enemy_manager, lock, pool)
+    asyncio.run(server.run())
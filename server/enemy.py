@@ -1,8 +1,29 @@
 # server/enemy.py
+import math
 import time
-import pygame
 import os
-from server.game_map import GameMap
+from functools import lru_cache
+import config
+from server.map_registry import maps
+from server.pathfinding import UNREACHED, clearance, flow_fields
+from server.rect import Rect
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+@lru_cache(maxsize=None)
+def sprite_sheet_size(enemy_type):
+    """Width and height of an enemy type's sprite sheet, read once per type from the PNG header."""
+    sprite_path = f"assets/enemies/{enemy_type}.png"
+    if not os.path.exists(sprite_path):
+        raise FileNotFoundError(f"Enemy sprite not found: {sprite_path}")
+    with open(sprite_path, "rb") as f:
+        header = f.read(24)
+    # Signature, then the IHDR chunk: length, b"IHDR", width, height
+    if header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        raise ValueError(f"Enemy sprite is not a PNG: {sprite_path}")
+    return int.from_bytes(header[16:20], "big"), int.from_bytes(header[20:24], "big")
+
 
 class Enemy:
     def __init__(self, eid, x, y, rows, columns, enemy_type="slime",
@@ -26,19 +47,10 @@ class Enemy:
         
         self.z_index = 0  # start at ground level
 
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        map_path = os.path.join(BASE_DIR, f"../assets/maps/{current_map}.tmx")
-
-        self.game_map = GameMap(os.path.normpath(map_path))
+        # Shared with every other entity on this map
+        self.game_map = maps.get(current_map)
 
-
-        # Load sprite sheet
-        sprite_path = f"assets/enemies/{self.type}.png"
-        if not os.path.exists(sprite_path):
-            raise FileNotFoundError(f"Enemy sprite not found: {sprite_path}")
-
-        sheet = pygame.image.load(sprite_path).convert_alpha()
-        sheet_width, sheet_height = sheet.get_size()
+        sheet_width, sheet_height = sprite_sheet_size(self.type)
         frame_width = sheet_width // self.columns
         frame_height = sheet_height // self.rows
 
@@ -46,12 +58,17 @@ class Enemy:
         self.c_h_padding = c_h_pad
         self.c_v_padding = c_v_pad
 
-        self.rect = pygame.Rect(x  , y , frame_width - 2 * self.c_h_padding, frame_height - 2 * self.c_v_padding)
+        self.rect = Rect(x  , y , frame_width - 2 * self.c_h_padding, frame_height - 2 * self.c_v_padding)
+
+        # Flow-field chasing (server/pathfinding.py): size in tiles, and the tile position heading to
+        self.clearance = clearance(self.game_map, self.rect.width, self.rect.height)
+        self.waypoint = None
 
     def distance_to(self, x, y):
         dx = x - self.x
         dy = y - self.y
-        return (dx**2 + dy**2)**0.5
+        # Exactly rounded (unlike ** on some libms), so server/enemy_engine.py gets the same result
+        return math.sqrt(dx * dx + dy * dy)
 
     def find_closest_player(self, players):
         """Return the closest player on the same map, or None if none exist."""
@@ -61,14 +78,46 @@ class Enemy:
         closest_player = min(same_map_players, key=lambda p: self.distance_to(p.x, p.y))
         return closest_player
 
+    def destination(self, game_map):
+        """Where to head this step: the next tile on the flow field toward the target, or the target itself."""
+        if config.ENEMY_PATHING != "flow":
+            return self.target_x, self.target_y
+        if self.waypoint is not None:
+            if (self.x, self.y) != self.waypoint:
+                return self.waypoint
+            self.waypoint = None
+
+        grid = game_map.grid
+        goal = grid.cell(self.target_x, self.target_y)
+        here = grid.cell(self.x, self.y)
+        if goal is None or here is None or here == goal:
+            return self.target_x, self.target_y
+
+        ty, tx = divmod(here, grid.width)
+        aligned = (float(tx * grid.tile_w), float(ty * grid.tile_h))
+        if (self.x, self.y) != aligned:
+            # Line up with the tile first; the rect already overlaps all of it
+            self.waypoint = aligned
+            return aligned
+
+        kx, ky = self.clearance
+        step = flow_fields.field(game_map, self.z_index, kx, ky, goal)[here]
+        if step == UNREACHED or step == goal:
+            # Walled off, or next to the target: go straight for it
+            return self.target_x, self.target_y
+        ty, tx = divmod(step, grid.width)
+        self.waypoint = (float(tx * grid.tile_w), float(ty * grid.tile_h))
+        return self.waypoint
+
     def move_towards_target(self, dt, game_map):
         if not self.moving:
             return
 
-        # Direction to target
-        dx = self.target_x - self.x
-        dy = self.target_y - self.y
-        distance = (dx**2 + dy**2)**0.5
+        # Direction to target (or the next tile on the way there)
+        dest_x, dest_y = self.destination(game_map)
+        dx = dest_x - self.x
+        dy = dest_y - self.y
+        distance = math.sqrt(dx * dx + dy * dy)
 
         if distance == 0:
             self.moving = False
@@ -82,7 +131,7 @@ class Enemy:
         move_y = dy * step_ratio
 
         # Predict movement
-        future_rect = pygame.Rect(
+        future_rect = Rect(
             self.x + move_x,
             self.y + move_y,
             self.rect.width,
@@ -90,25 +139,21 @@ class Enemy:
         )
 
         # --- Collider Blocking (same as PLAYER) ---
-        for collider in game_map.colliders:
-            if collider["z_index"] == self.z_index:
-                if future_rect.colliderect(collider["rect"]):
-                    # Block axis independently (matches player logic)
-                    if abs(move_x) > 0:
-                        move_x = 0
-                    if abs(move_y) > 0:
-                        move_y = 0
-                    # Rebuild the rect after axis-block
-                    future_rect = pygame.Rect(
-                        self.x + move_x,
-                        self.y + move_y,
-                        self.rect.width,
-                        self.rect.height
-                    )
+        if game_map.collides(future_rect, self.z_index):
+            # Block axis independently (matches player logic)
+            if abs(move_x) > 0:
+                move_x = 0
+            if abs(move_y) > 0:
+                move_y = 0
+            self.waypoint = None  # re-plan from here next step
 
         # --- Apply movement ---
-        self.x += move_x
-        self.y += move_y
+        if self.waypoint is not None and step_ratio == 1:
+            # Land exactly on the tile, so the next step starts aligned
+            self.x, self.y = self.waypoint
+        else:
+            self.x += move_x
+            self.y += move_y
         self.rect.topleft = (self.x, self.y)
 
         # If you can't move on either axis, stop moving completely
@@ -0,0 +1,304 @@
+# server/enemy_engine.py
+# Struct-of-arrays enemy simulation on NumPy: the batched alternative to
+# calling Enemy.update once per enemy (enemy_engine = numpy in config.ini).
+#
+# Positions, targets, speeds, map ids and z-levels live in arrays, and each
+# step does nearest-player targeting, movement, collision and elevation for
+# all enemies at once. It follows Enemy.update operation for operation, so
+# the results are the same floats. Enemies don't affect each other, which is
+# what lets them all move in one go.
+#
+# The arrays are the source of truth; the Enemy objects are kept in step
+# after every update, since snapshots and the interest grid read them.
+import numpy as np
+
+import config
+from server.pathfinding import flow_fields
+from shared.tile_grid import NO_ELEVATION
+
+
+class MapTables:
+    """
+    Collision and elevation cells of every map the enemies are on, flattened
+    into shared arrays so one gather serves enemies on different maps.
+
+    Each collision layer (map, z_index) is stored as a summed-area table, so
+    "any collider under this rect" is four reads whatever the rect's size.
+    """
+
+    def __init__(self, game_maps):
+        self.ids = {}  # map name -> map id
+        self.maps = list(game_maps.values())
+        count = len(game_maps)
+        self.width = np.zeros(count, np.int64)
+        self.height = np.zeros(count, np.int64)
+        self.tile_w = np.zeros(count, np.int64)
+        self.tile_h = np.zeros(count, np.int64)
+        self.elevation_base = np.zeros(count, np.int64)
+
+        elevation, tables, layers = [], [], {}
+        offset = layer_offset = 0
+        for map_id, (name, game_map) in enumerate(game_maps.items()):
+            grid = game_map.grid
+            self.ids[name] = map_id
+            self.width[map_id], self.height[map_id] = grid.width, grid.height
+            self.tile_w[map_id], self.tile_h[map_id] = grid.tile_w, grid.tile_h
+            self.elevation_base[map_id] = offset
+            elevation.append(np.array(grid.elevation, np.int32))
+            offset += grid.size
+
+            for z, cells in grid.collision.items():
+                table = np.zeros((grid.height + 1, grid.width + 1), np.int32)
+                cells = np.frombuffer(cells, np.uint8).reshape(grid.height, grid.width)
+                table[1:, 1:] = cells.cumsum(0).cumsum(1)
+                layers[(map_id, z)] = layer_offset
+                tables.append(table.ravel())
+                layer_offset += table.size
+
+        self.elevation = np.concatenate(elevation) if elevation else np.zeros(0, np.int32)
+        self.collision = np.concatenate(tables) if tables else np.zeros(1, np.int32)
+
+        # (map id, z_index) -> offset of that summed-area table, -1 for no colliders
+        zs = [z for _, z in layers] or [0]
+        self.z_min = min(zs)
+        self.layer = np.full((max(count, 1), max(zs) - self.z_min + 1), -1, np.int64)
+        for (map_id, z), base in layers.items():
+            self.layer[map_id, z - self.z_min] = base
+
+    def layer_of(self, map_id, z):
+        """Summed-area table offset for each enemy's map and z_index, -1 if it has none."""
+        col = z - self.z_min
+        inside = (col >= 0) & (col < self.layer.shape[1])
+        return np.where(inside, self.layer[map_id, np.clip(col, 0, self.layer.shape[1] - 1)], -1)
+
+    def collides(self, map_id, z, x, y, w, h):
+        """Like TileGrid.collides for each (rect, z): any collider under the int rect."""
+        base = self.layer_of(map_id, z)
+        width, height = self.width[map_id], self.height[map_id]
+        tile_w, tile_h = self.tile_w[map_id], self.tile_h[map_id]
+        tx0 = np.maximum(x // tile_w, 0)
+        tx1 = np.minimum((x + w - 1) // tile_w, width - 1)
+        ty0 = np.maximum(y // tile_h, 0)
+        ty1 = np.minimum((y + h - 1) // tile_h, height - 1)
+        valid = (base >= 0) & (w > 0) & (h > 0) & (tx0 <= tx1) & (ty0 <= ty1)
+
+        stride = width + 1
+        base = np.where(valid, base, 0)
+        x0, x1 = np.where(valid, tx0, 0), np.where(valid, tx1 + 1, 0)
+        y0, y1 = np.where(valid, ty0, 0), np.where(valid, ty1 + 1, 0)
+        table = self.collision
+        total = (table[base + y1 * stride + x1] - table[base + y0 * stride + x1]
+                 - table[base + y1 * stride + x0] + table[base + y0 * stride + x0])
+        return valid & (total > 0)
+
+    def cell(self, map_id, x, y):
+        """Like TileGrid.cell for each point: the tile's index on its map, -1 off the map."""
+        tx = np.floor_divide(x, self.tile_w[map_id]).astype(np.int64)
+        ty = np.floor_divide(y, self.tile_h[map_id]).astype(np.int64)
+        width = self.width[map_id]
+        inside = (tx >= 0) & (tx < width) & (ty >= 0) & (ty < self.height[map_id])
+        return np.where(inside, ty * width + tx, -1)
+
+    def elevation_at(self, map_id, x, y):
+        """Like TileGrid.elevation_at for each point; NO_ELEVATION where there is none."""
+        cell = self.cell(map_id, x, y)
+        index = np.where(cell >= 0, self.elevation_base[map_id] + cell, 0)
+        return np.where(cell >= 0, self.elevation[index], NO_ELEVATION)
+
+    def tile_position(self, map_id, cell):
+        """Top-left corner of each tile, as Enemy.destination computes it."""
+        width = self.width[map_id]
+        return ((cell % width) * self.tile_w[map_id]).astype(np.float64), \
+            ((cell // width) * self.tile_h[map_id]).astype(np.float64)
+
+
+class EnemyArrays:
+    def __init__(self, enemies):
+        self.enemies = enemies
+        self.objs = []
+        self.count = 0
+        self.load()
+
+    def load(self):
+        """(Re)build the arrays from the Enemy objects."""
+        if self.count:
+            self.write_targets()
+        objs = list(self.enemies.values())
+        self.objs = objs
+        self.count = len(objs)
+        self.tables = MapTables({e.current_map: e.game_map for e in objs})
+        ids = self.tables.ids
+
+        self.map_id = np.array([ids[e.current_map] for e in objs], np.int64)
+        self.x = np.array([e.x for e in objs], np.float64)
+        self.y = np.array([e.y for e in objs], np.float64)
+        self.target_x = np.array([e.target_x for e in objs], np.float64)
+        self.target_y = np.array([e.target_y for e in objs], np.float64)
+        self.speed = np.array([e.speed for e in objs], np.float64)
+        self.width = np.array([e.rect.width for e in objs], np.int64)
+        self.height = np.array([e.rect.height for e in objs], np.int64)
+        self.z = np.array([e.z_index for e in objs], np.int64)
+        self.moving = np.array([bool(e.moving) for e in objs], bool)
+        self.clear_x = np.array([e.clearance[0] for e in objs], np.int64)
+        self.clear_y = np.array([e.clearance[1] for e in objs], np.int64)
+        self.has_waypoint = np.array([e.waypoint is not None for e in objs], bool)
+        self.waypoint_x = np.array([e.waypoint[0] if e.waypoint else 0.0 for e in objs], np.float64)
+        self.waypoint_y = np.array([e.waypoint[1] if e.waypoint else 0.0 for e in objs], np.float64)
+
+    # ---------------- Step ----------------
+    def update(self, dt, players):
+        """Enemy.update for every enemy."""
+        if len(self.enemies) != self.count:
+            self.load()
+        if not self.count:
+            return
+
+        was_moving = self.moving.copy()
+        self.target_players(players)
+        moved = self.move(dt)
+        lifted = self.sample_elevation()
+        self.write_back(moved, np.flatnonzero(was_moving != self.moving), lifted)
+
+    def target_players(self, players):
+        """Point every enemy sharing a map with a player at the closest one."""
+        ids = self.tables.ids
+        on_map = {}
+        for p in players.values():
+            map_id = ids.get(p.current_map)
+            if map_id is not None:
+                on_map.setdefault(map_id, []).append((p.x, p.y))
+
+        targeted = []
+        for map_id, positions in on_map.items():
+            enemies = np.flatnonzero(self.map_id == map_id)
+            if not enemies.size:
+                continue
+            px, py = np.array(positions, np.float64).T
+            dx = px[None, :] - self.x[enemies, None]
+            dy = py[None, :] - self.y[enemies, None]
+            # First of equally close players, as min() picks
+            closest = np.argmin(np.sqrt(dx * dx + dy * dy), axis=1)
+            self.target_x[enemies] = px[closest]
+            self.target_y[enemies] = py[closest]
+            targeted.append(enemies)
+
+        if targeted:
+            self.moving[np.concatenate(targeted)] = True
+
+    def move(self, dt):
+        """Enemy.move_towards_target for the moving enemies. Returns the indices that moved."""
+        active = np.flatnonzero(self.moving)
+        dest_x, dest_y, heading = self.destinations(active)
+        dx = dest_x - self.x[active]
+        dy = dest_y - self.y[active]
+        distance = np.sqrt(dx * dx + dy * dy)
+
+        arrived = distance == 0
+        self.moving[active[arrived]] = False
+        going = ~arrived
+        active, dx, dy, distance = active[going], dx[going], dy[going], distance[going]
+        dest_x, dest_y, heading = dest_x[going], dest_y[going], heading[going]
+
+        ratio = np.minimum(self.speed[active] * dt / distance, 1)
+        move_x = dx * ratio
+        move_y = dy * ratio
+
+        x, y = self.x[active], self.y[active]
+        blocked = self.tables.collides(self.map_id[active], self.z[active],
+                                       np.trunc(x + move_x).astype(np.int64),
+                                       np.trunc(y + move_y).astype(np.int64),
+                                       self.width[active], self.height[active])
+        move_x = np.where(blocked & (move_x != 0), 0.0, move_x)
+        move_y = np.where(blocked & (move_y != 0), 0.0, move_y)
+        self.has_waypoint[active[blocked]] = False
+        # Land exactly on a waypoint tile once within a step of it
+        land = heading & ~blocked & (ratio == 1)
+        self.x[active] = np.where(land, dest_x, x + move_x)
+        self.y[active] = np.where(land, dest_y, y + move_y)
+
+        stuck = (move_x == 0) & (move_y == 0)
+        self.moving[active[stuck]] = False
+        return active[~stuck]
+
+    def destinations(self, active):
+        """
+        Enemy.destination for each active enemy: (x, y, heading), where heading
+        marks those going to a waypoint tile rather than straight at the target.
+        """
+        dest_x, dest_y = self.target_x[active], self.target_y[active]
+        heading = np.zeros(active.size, bool)
+        if config.ENEMY_PATHING != "flow" or not active.size:
+            return dest_x, dest_y, heading
+
+        x, y = self.x[active], self.y[active]
+        waypoint_x, waypoint_y = self.waypoint_x[active], self.waypoint_y[active]
+        had = self.has_waypoint[active]
+        keep = had & ((x != waypoint_x) | (y != waypoint_y))
+        self.has_waypoint[active[had & ~keep]] = False
+
+        map_id = self.map_id[active]
+        tables = self.tables
+        goal = tables.cell(map_id, dest_x, dest_y)
+        here = tables.cell(map_id, x, y)
+        plan = ~keep & (goal >= 0) & (here >= 0) & (here != goal)
+        aligned_x, aligned_y = tables.tile_position(map_id, np.maximum(here, 0))
+        settle = plan & ((x != aligned_x) | (y != aligned_y))
+        waypoint_x = np.where(settle, aligned_x, waypoint_x)
+        waypoint_y = np.where(settle, aligned_y, waypoint_y)
+
+        # Aligned on a tile: step along the flow field, one lookup per shared field
+        lookup = np.flatnonzero(plan & ~settle)
+        step = np.full(active.size, -1, np.int64)
+        if lookup.size:
+            keys = np.stack([map_id[lookup], self.z[active[lookup]], self.clear_x[active[lookup]],
+                             self.clear_y[active[lookup]], goal[lookup]], axis=1)
+            unique, group = np.unique(keys, axis=0, return_inverse=True)
+            group = group.ravel()
+            for g, (m, z, kx, ky, target) in enumerate(unique.tolist()):
+                members = lookup[group == g]
+                steps = np.frombuffer(flow_fields.field(tables.maps[m], z, kx, ky, target), np.int32)
+                step[members] = steps[here[members]]
+        stepping = (step >= 0) & (step != goal)
+        step_x, step_y = tables.tile_position(map_id, np.maximum(step, 0))
+        waypoint_x = np.where(stepping, step_x, waypoint_x)
+        waypoint_y = np.where(stepping, step_y, waypoint_y)
+
+        new = settle | stepping
+        self.has_waypoint[active[new]] = True
+        self.waypoint_x[active[new]] = waypoint_x[new]
+        self.waypoint_y[active[new]] = waypoint_y[new]
+
+        heading = keep | new
+        return np.where(heading, waypoint_x, dest_x), np.where(heading, waypoint_y, dest_y), heading
+
+    def sample_elevation(self):
+        """Take the z_index of the elevation tile under each enemy's feet. Returns the changed indices."""
+        z = self.tables.elevation_at(self.map_id, self.x + self.width // 2, self.y + self.height)
+        changed = np.flatnonzero((z != NO_ELEVATION) & (z != self.z))
+        self.z[changed] = z[changed]
+        return changed
+
+    # ---------------- Enemy Objects ----------------
+    # Only what snapshots read is copied every step, and only where it changed
+    def write_back(self, moved, toggled, lifted):
+        objs = self.objs
+        for i, x, y in zip(moved.tolist(), self.x[moved].tolist(), self.y[moved].tolist()):
+            e = objs[i]
+            e.x = x
+            e.y = y
+            rect = e.rect
+            rect.x = int(x)
+            rect.y = int(y)
+        for i, moving in zip(toggled.tolist(), self.moving[toggled].tolist()):
+            objs[i].moving = moving
+        for i, z in zip(lifted.tolist(), self.z[lifted].tolist()):
+            objs[i].z_index = z
+
+    def write_targets(self):
+        """Targets and waypoints are only read back by load() and the scalar update, so they are copied on demand."""
+        for e, tx, ty, has, wx, wy in zip(self.objs, self.target_x.tolist(), self.target_y.tolist(),
+                                          self.has_waypoint.tolist(), self.waypoint_x.tolist(),
+                                          self.waypoint_y.tolist()):
+            e.target_x = tx
+            e.target_y = ty
+            e.waypoint = (wx, wy) if has else None
@@ -1,22 +1,17 @@
-# # server/game_map.py
+# server/game_map.py
+# Collision, elevation and portal data for one map, read with server/tmx.py
+# so the server never needs pygame or the tileset images.
+from server.rect import Rect
+from server.tmx import load_tmx
+from shared.tile_grid import TileGrid
 
+# The only layers the server uses; the rest are never decoded
+LAYERS = ("collision", "elevation", "portal")
 
 
-
-
-
-import os
-os.environ["SDL_VIDEODRIVER"] = "dummy"  # headless mode
-
-import pygame
-from pytmx import load_pygame
-
-pygame.init()
-pygame.display.set_mode((1, 1))
-
 class GameMap:
     def __init__(self, tmx_file):
-        self.tmx_data = load_pygame(tmx_file)
+        self.tmx_data = load_tmx(tmx_file, LAYERS)
         self.tile_size = self.tmx_data.tilewidth
         self.map_width = self.tmx_data.width
         self.map_height = self.tmx_data.height
@@ -24,65 +19,34 @@ class GameMap:
         self.colliders = []
         self.elevation_colliders = []
         self.teleport_tiles = []
+        self.portals = []
+        self.grid = TileGrid(self.map_width, self.map_height, self.tile_size, self.tmx_data.tileheight)
 
         print(f"Loading map: {tmx_file}")
-        print("Layers:", [layer.name for layer in self.tmx_data.layers if hasattr(layer, "name")])
+        print("Layers:", self.tmx_data.layer_names)
 
         # --- COLLISION LAYER ---
-        for layer in self.tmx_data.layers:
-            if hasattr(layer, "name") and layer.name.lower() == "collision":
-                for tx, ty, surf in layer.tiles():
-
-                    # Calculate the rect for this tile
-                    rect = pygame.Rect(
-                        tx * self.tile_size,
-                        ty * self.tile_size,
-                        self.tile_size,
-                        self.tile_size
-                    )
-
-                    # Get the GID from the TMX layer (tiles() does NOT include gid)
-                    gid = layer.data[ty][tx]
-
-                    # Read tile properties
-                    props = self.tmx_data.get_tile_properties_by_gid(gid) or {}
-                    z_index = int(props.get("z_index", 0))
-
-                    # Store rect + z_index
-                    self.colliders.append({
-                        "rect": rect,
-                        "z_index": z_index
-                    })
+        for tx, ty, gid in self.tmx_data.tiles("collision"):
+            props = self.tmx_data.get_tile_properties(gid)
+            z_index = int(props.get("z_index", 0))
+            self.colliders.append({
+                "rect": self.tile_rect(tx, ty),
+                "z_index": z_index
+            })
+            self.grid.add_collider(tx, ty, z_index)
 
         # --- ELEVATION LAYER ---
-        for layer_index, layer in enumerate(self.tmx_data.layers):
-            if hasattr(layer, "name") and layer.name.lower() == "elevation":
-                for tx, ty, surf in layer.tiles():
-                    gid = self.tmx_data.get_tile_gid(tx, ty, layer_index)
-                    props = self.tmx_data.get_tile_properties_by_gid(gid)
-                    z_index = props.get("z_index") if props else None
-
-                    rect = (
-                        tx * self.tile_size,
-                        ty * self.tile_size,
-                        self.tile_size,
-                        self.tile_size
-                    )
-                    self.elevation_colliders.append({
-                        "rect": rect,
-                        "z_index": z_index
-                    })
-                    
-        print(f"Elevation colliders: {len(self.elevation_colliders)}")
-        for c in self.elevation_colliders[:20]:
-            print(c)
-
-        print(f"Elevation tiles: {len(self.elevation_colliders)}")
+        for tx, ty, gid in self.tmx_data.tiles("elevation"):
+            props = self.tmx_data.get_tile_properties(gid)
+            z_index = props.get("z_index")
+            self.elevation_colliders.append({
+                "rect": tuple(self.tile_rect(tx, ty)),
+                "z_index": z_index
+            })
+            self.grid.add_elevation(tx, ty, None if z_index is None else int(z_index))
 
         # --- TILESET PROPERTIES (teleports, spawns, etc.) ---
         for gid, props in self.tmx_data.tile_properties.items():
-            if not props:
-                continue
             if "target_map" in props:
                 self.teleport_tiles.append({
                     "gid": gid,
@@ -92,29 +56,39 @@ class GameMap:
                     "player_index": props.get("player_index")
                 })
 
+        # --- PORTAL LAYER (where the teleport tiles are placed) ---
+        for tx, ty, gid in self.tmx_data.tiles("portal"):
+            props = self.tmx_data.get_tile_properties(gid)
+            if "target_map" in props:
+                portal = dict(props, rect=self.tile_rect(tx, ty), gid=gid)
+                self.portals.append(portal)
+                self.grid.add_portal(tx, ty, portal)
+
         print(f"Collision tiles: {len(self.colliders)}")
         print(f"Elevation tiles: {len(self.elevation_colliders)}")
-        print(f"Teleport tiles: {len(self.teleport_tiles)}")
+        print(f"Teleport tiles: {len(self.teleport_tiles)} ({len(self.portals)} placed)")
 
-    def get_tile_properties(self, gid):
-        return self.tmx_data.tile_properties.get(gid, {})
+        # Shared by every entity on this map (server/map_registry.py), so frozen once built
+        self.colliders = tuple(self.colliders)
+        self.elevation_colliders = tuple(self.elevation_colliders)
+        self.teleport_tiles = tuple(self.teleport_tiles)
+        self.portals = tuple(self.portals)
 
-    def is_collision_tile(self, x, y):
-        for col in self.colliders:
+    def tile_rect(self, tx, ty):
+        return Rect(tx * self.tile_size, ty * self.tile_size, self.tile_size, self.tile_size)
 
-            if isinstance(col, dict):
-                rect = col["rect"]
-                tx, ty, w, h = rect.x, rect.y, rect.width, rect.height
-            else:
-                tx, ty, w, h = col
+    def get_tile_properties(self, gid):
+        return self.tmx_data.get_tile_properties(gid)
 
-            if x >= tx and x < tx + w and y >= ty and y < ty + h:
-                return True
+    def is_collision_tile(self, x, y):
+        return self.grid.collision_at(x, y)
 
     def is_elevation_tile(self, x, y):
-        for elev in self.elevation_colliders:
-            tx, ty, w, h = elev["rect"]
-            if tx <= x < tx + w and ty <= y < ty + h:
-                return elev["z_index"]
-        return None
+        return self.grid.elevation_at(x, y)
+
+    def collides(self, rect, z_index):
+        """True if rect overlaps a collider on the given z_index."""
+        return self.grid.collides(rect, z_index)
 
+    def get_portal_at(self, rect):
+        return self.grid.portal_at(rect)
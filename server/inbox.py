@@ -0,0 +1,120 @@
+# server/inbox.py
+import threading
+
+# Inputs that are events rather than state; kept in order, never merged away
+QUEUED_TYPES = ("move", "portal_enter")
+
+# Rising edges of these must survive coalescing even if released within the tick
+EDGE_FLAGS = ("attacking", "jumping", "long_attacking")
+
+NUMBER = (int, float)
+OPTIONAL = (type(None),)
+FLAG = (bool, int) + OPTIONAL  # only ever tested for truth
+
+# type -> {field: accepted types}, and the fields that must be there.
+# The simulation applies these under the lock, so a bad one must not get that far.
+INPUT_FIELDS = {
+    "move": {
+        "x": NUMBER, "y": NUMBER,
+        "vx": NUMBER + OPTIONAL, "vy": NUMBER + OPTIONAL,
+        "direction": (str,), "current_map": (str,) + OPTIONAL, "z_index": (int,) + OPTIONAL,
+        "moving": FLAG, "attacking": FLAG, "running": FLAG, "jumping": FLAG,
+        "long_attacking": FLAG, "charging_attack": FLAG,
+        "ack": (int,) + OPTIONAL, "ack_delay": (int,) + OPTIONAL, "rcv": (int,) + OPTIONAL,
+    },
+    "portal_enter": {"target_map": (str,), "spawn_x": NUMBER, "spawn_y": NUMBER},
+}
+INPUT_REQUIRED = {"move": ("x", "y"), "portal_enter": ("target_map",)}
+
+
+def has_fields(msg, fields, required=()):
+    """True if msg has every required field and each listed field it has is of an accepted type."""
+    for name in required:
+        if name not in msg:
+            return False
+    for name, types in fields.items():
+        if name in msg and type(msg[name]) not in types:  # exact, so a bool is not taken for a number
+            return False
+    return True
+
+
+def valid_input(msg):
+    kind = msg.get("type")
+    return kind in INPUT_FIELDS and has_fields(msg, INPUT_FIELDS[kind], INPUT_REQUIRED[kind])
+
+
+def coalesce(prev, msg):
+    """One move standing for prev followed by msg: msg's state, with prev's edge flags kept."""
+    merged = dict(msg)
+    for flag in EDGE_FLAGS:
+        if prev.get(flag):
+            merged[flag] = True
+    return merged
+
+
+class InputQueue:
+    """
+    Per-player inboxes between the receive path and the simulation.
+
+    Consecutive moves are merged as they arrive (latest position and state
+    win, edge-triggered actions stay set), so an inbox holds at most a few
+    entries per tick no matter how fast the client sends. The simulation
+    drains every inbox once per step.
+    """
+
+    def __init__(self, limit=32):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.inboxes = {}   # pid -> [(msg, addr), ...]
+        self.metrics = {}   # pid -> {"received", "coalesced", "dropped", "invalid", "max_depth"}
+
+    def push(self, pid, msg, addr):
+        """Queue one input. Returns False if it was malformed or the inbox was full, and it was dropped."""
+        with self.lock:
+            stats = self.stats_for(pid)
+            stats["received"] += 1
+            if not valid_input(msg):
+                stats["invalid"] += 1
+                return False
+            inbox = self.inboxes.setdefault(pid, [])
+
+            if msg["type"] == "move" and inbox and inbox[-1][0]["type"] == "move":
+                inbox[-1] = (coalesce(inbox[-1][0], msg), addr)
+                stats["coalesced"] += 1
+                return True
+
+            if len(inbox) >= self.limit:
+                stats["dropped"] += 1
+                return False
+
+            inbox.append((msg, addr))
+            stats["max_depth"] = max(stats["max_depth"], len(inbox))
+            return True
+
+    def stats_for(self, pid):
+        return self.metrics.setdefault(
+            pid, {"received": 0, "coalesced": 0, "dropped": 0, "invalid": 0, "max_depth": 0})
+
+    def reject(self, pid):
+        """Count an input that failed when it was applied."""
+        with self.lock:
+            self.stats_for(pid)["invalid"] += 1
+
+    def drain(self):
+        """Take everything queued: a list of (pid, [(msg, addr), ...])."""
+        with self.lock:
+            inboxes = self.inboxes
+            self.inboxes = {}
+        return list(inboxes.items())
+
+    def remove(self, pid):
+        with self.lock:
+            self.inboxes.pop(pid, None)
+            self.metrics.pop(pid, None)
+
+    def stats(self):
+        with self.lock:
+            return {
+                pid: dict(stats, depth=len(self.inboxes.get(pid, ())))
+                for pid, stats in self.metrics.items()
+            }
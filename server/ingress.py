@@ -0,0 +1,124 @@
+# server/ingress.py
+import time
+from collections import Counter
+
+import msgpack
+
+from server.inbox import INPUT_FIELDS, INPUT_REQUIRED, NUMBER, OPTIONAL, has_fields
+from shared import schema, wire
+
+INT = (int,) + OPTIONAL
+
+# Fields any message may carry: the reliable channel's and the join's
+COMMON_FIELDS = {
+    "type": (str,), "token": (str,), "rel": (int,), "rack": (int,), "rsack": INT,
+    "conn": INT, "jid": INT,
+}
+
+# type -> {field: accepted types}, and the fields that must be there. Anything
+# not listed would only reach the handlers to fail there, so it stops here.
+MESSAGE_FIELDS = {
+    "join": {"schema": INT, "compress": (list,) + OPTIONAL, "rseq": (int,), "rexpect": (int,),
+             "t0": NUMBER + OPTIONAL},
+    "resume": {"ticket": (bytes,) + OPTIONAL},
+    "ping": {"t0": NUMBER + OPTIONAL},
+    "rel_ack": {},
+    "save": {"x": NUMBER, "y": NUMBER, "direction": (str,), "current_map": (str,), "z_index": INT},
+    **INPUT_FIELDS,
+}
+MESSAGE_REQUIRED = {
+    "join": ("token",),
+    "save": ("x", "y", "direction", "current_map"),
+    **INPUT_REQUIRED,
+}
+
+
+def valid_message(msg):
+    """True if msg is of a type the server handles, with the fields that type needs."""
+    fields = MESSAGE_FIELDS.get(msg.get("type"))
+    return (fields is not None and has_fields(msg, COMMON_FIELDS)
+            and has_fields(msg, fields, MESSAGE_REQUIRED.get(msg["type"], ())))
+
+
+class TokenBuckets:
+    """Per-address token buckets: `rate` packets/s sustained, bursts up to `burst`."""
+
+    def __init__(self, rate, burst, max_addrs=65536):
+        self.rate = rate
+        self.burst = burst
+        self.max_addrs = max_addrs
+        self.buckets = {}  # addr -> [tokens, last refill]
+
+    def allow(self, addr, now):
+        bucket = self.buckets.get(addr)
+        if bucket is None:
+            if len(self.buckets) >= self.max_addrs:
+                self.prune(now)
+            self.buckets[addr] = [self.burst - 1, now]
+            return True
+
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def prune(self, now):
+        """Forget addresses idle long enough to be full again; all of them if that is not enough."""
+        idle = self.burst / self.rate
+        for addr in [a for a, (_, last) in self.buckets.items() if now - last > idle]:
+            del self.buckets[addr]
+        if len(self.buckets) >= self.max_addrs:
+            self.buckets.clear()
+
+
+class IngressFilter:
+    """
+    Cheap checks on every datagram before anything is decoded: size, wire
+    header and a per-address rate limit, then a msgpack decode with strict
+    length limits and a check of the message's fields. Rejected packets are
+    only counted, never answered or logged.
+    """
+
+    def __init__(self, max_size, rate, burst):
+        self.max_size = max_size
+        self.buckets = TokenBuckets(rate, burst)
+        self.dropped = Counter()  # reason -> packets
+
+    def accept(self, data, addr, now=None):
+        """The datagram's payload (session frame or msgpack), or None to drop it."""
+        if len(data) > self.max_size:
+            self.dropped["size"] += 1
+            return None
+        if not wire.has_header(data):
+            self.dropped["header"] += 1
+            return None
+        now = time.monotonic() if now is None else now
+        if not self.buckets.allow(addr, now):
+            self.dropped["rate"] += 1
+            return None
+        return data[wire.HEADER_SIZE:]
+
+    def unpack(self, payload):
+        """One message dict from msgpack bytes, or None if malformed, oversized, or not a message we handle."""
+        if not payload or payload[0] not in wire.MESSAGE_LEAD_BYTES:
+            self.dropped["decode"] += 1
+            return None
+        try:
+            # unpackb runs a msgpack Unpacker with these limits and rejects trailing bytes
+            msg = schema.decode(msgpack.unpackb(payload, raw=False, **wire.UNPACK_LIMITS))
+        except Exception:
+            self.dropped["decode"] += 1
+            return None
+        if not isinstance(msg, dict):
+            self.dropped["decode"] += 1
+            return None
+        if not valid_message(msg):
+            self.dropped["invalid"] += 1
+            return None
+        return msg
+
+    def stats(self):
+        return {"dropped": dict(self.dropped), "addresses": len(self.buckets.buckets)}
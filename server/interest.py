@@ -0,0 +1,85 @@
+# server/interest.py
+
+
+class InterestGrid:
+    """
+    Uniform grid of players and enemies, one per map, used to find which
+    entities a client can see without scanning the whole world.
+    Entities are only re-bucketed when they cross a cell or change maps.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}       # map -> {(cx, cy): set of keys}
+        self.locations = {}   # key -> (map, cx, cy)
+
+    def _cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    # ---------------- Updates ----------------
+    def update(self, key, current_map, x, y):
+        """Place or move an entity. Keys are ("player", pid) / ("enemy", eid)."""
+        cx, cy = self._cell(x, y)
+        location = (current_map, cx, cy)
+        old = self.locations.get(key)
+        if old == location:
+            return
+
+        if old is not None:
+            self._discard(key, old)
+
+        self.cells.setdefault(current_map, {}).setdefault((cx, cy), set()).add(key)
+        self.locations[key] = location
+
+    def remove(self, key):
+        old = self.locations.pop(key, None)
+        if old is not None:
+            self._discard(key, old)
+
+    def _discard(self, key, location):
+        current_map, cx, cy = location
+        map_cells = self.cells.get(current_map)
+        if not map_cells:
+            return
+        bucket = map_cells.get((cx, cy))
+        if bucket is None:
+            return
+        bucket.discard(key)
+        if not bucket:
+            del map_cells[(cx, cy)]
+            if not map_cells:
+                del self.cells[current_map]
+
+    # ---------------- Queries ----------------
+    def query(self, current_map, x, y, radius):
+        """
+        Return the keys in every cell overlapping the square around (x, y).
+        Callers still do an exact distance check; a radius <= 0 returns
+        everything on the map.
+        """
+        map_cells = self.cells.get(current_map)
+        if not map_cells:
+            return []
+
+        if radius <= 0:
+            return [key for bucket in map_cells.values() for key in bucket]
+
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+
+        # Sparse maps: walking the occupied cells is cheaper than the window
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(map_cells):
+            return [
+                key
+                for (cx, cy), bucket in map_cells.items()
+                if min_cx <= cx <= max_cx and min_cy <= cy <= max_cy
+                for key in bucket
+            ]
+
+        found = []
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = map_cells.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
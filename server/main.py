@@ -1,14 +1,17 @@
+import argparse
+import select
 import socket
 import threading
 import time
-import msgpack
 import config
 from server import auth_db
 from server.network import Network
 from server.player_manager import PlayerManager
 from server.enemy_manager import EnemyManager
+from server.map_registry import maps
 from server.message_handler import MessageHandler
 from server.utility import Utility
+from server import workers as ingress_workers
 import os
 
 running = True
@@ -23,6 +26,8 @@ AUTH_PORT = config.AUTH_PORT
 
 neti = Network(lock)
 player_manager = PlayerManager()
+if config.PRELOAD_MAPS:
+    maps.preload()
 enemy_manager = EnemyManager()
 
 
@@ -32,30 +37,50 @@ utils = None
 
 # ---------------- Main Server Loop ----------------
 
-def start_server():
+def start_server(workers=0):
     global sock, running, utils
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind((config.HOST, config.PORT))
-    sock.settimeout(1.0)
+    pool = None
+    if workers and not ingress_workers.supported():
+        print("[WARN] SO_REUSEPORT is not available here; running without ingress workers")
+    elif workers:
+        # Workers first: they are forked, and must not inherit threads or this socket
+        pool = ingress_workers.WorkerPool(workers, config.HOST, config.PORT)
+        pool.start(player_manager.sessions)
+
+    if pool is not None:
+        sock = ingress_workers.reuseport_socket(config.HOST, config.PORT)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((config.HOST, config.PORT))
+    # Non-blocking: only the sender thread writes to it, and it never waits on the kernel buffer
+    sock.setblocking(False)
     
     print(f"[SERVER] Server started on {config.HOST}:{config.PORT}")
-    handler = MessageHandler(sock, player_manager, lock)
-    utils = Utility(lock, sock, player_manager, enemy_manager)
+    outbox = neti.outbox
+    handler = MessageHandler(outbox, player_manager, lock, neti.interest, neti.inputs, neti.tick_anchor)
+    utils = Utility(lock, outbox, player_manager, enemy_manager, neti.interest, neti.inputs)
+    neti.input_handler = handler.apply_inputs
 
     # Background threads
+    if pool is not None:
+        threading.Thread(target=pool.run, args=(handler.handle_session_message, handler.handle_message),
+                         daemon=True).start()
+    threading.Thread(target=outbox.drain_forever, args=(sock, lambda: running), daemon=True).start()
     threading.Thread(target=utils.cleanup_inactive, daemon=True).start()
-    threading.Thread(target=neti.broadcast, args=(player_manager, enemy_manager, sock), daemon=True).start()
+    threading.Thread(target=neti.broadcast, args=(player_manager, enemy_manager), daemon=True).start()
     threading.Thread(target=utils.refresh_active_tokens_loop, daemon=True).start()
     threading.Thread(target=utils.autosave_loop, daemon=True).start()
 
 
     while running:
         try:
+            readable, _, _ = select.select([sock], [], [], 1.0)
+            if not readable:
+                continue
             data, addr = sock.recvfrom(config.BUFFER_SIZE)
-            msg = msgpack.unpackb(data, raw=False)
-            handler.handle_message( msg, addr)
+            handler.handle_datagram(data, addr)
 
-        except socket.timeout:
+        except BlockingIOError:
             continue
         except OSError as e:
             if e.errno == 10054:  # Connection reset
@@ -66,4 +91,15 @@ def start_server():
 # ---------------- Run ----------------
 
 if __name__ == "__main__":
-    start_server()
+    parser = argparse.ArgumentParser(description="Aden game server")
+    parser.add_argument("--core", choices=["threaded", "asyncio"], default=config.SERVER_CORE,
+                        help="server core: blocking recv loop + threads, or a single asyncio event loop")
+    parser.add_argument("--workers", type=int, default=config.INGRESS_WORKERS,
+                        help="extra processes receiving on the game port with SO_REUSEPORT (Linux)")
+    args = parser.parse_args()
+
+    if args.core == "asyncio":
+        from server.async_core import start_async_server
+        start_async_server(neti, player_manager, enemy_manager, lock, args.workers)
+    else:
+        start_server(args.workers)
@@ -0,0 +1,61 @@
+# server/map_registry.py
+# One GameMap per TMX file for the whole process.
+#
+# Colliders and elevation tiles never change once a map is loaded, so every
+# enemy on a map shares the same GameMap instead of parsing its own copy.
+# Maps load on first use; preload() parses them all up front on a thread pool.
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from server.game_map import GameMap
+
+MAP_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../assets/maps"))
+
+
+class MapRegistry:
+    def __init__(self, map_dir=MAP_DIR):
+        self.map_dir = map_dir
+        self.maps = {}
+        self.lock = threading.Lock()
+        self.loading = {}  # name -> lock held while that map is parsed
+
+    def path(self, name):
+        return os.path.join(self.map_dir, f"{name}.tmx")
+
+    def names(self):
+        """Every map in the map directory."""
+        return sorted(f[:-4] for f in os.listdir(self.map_dir) if f.endswith(".tmx"))
+
+    def get(self, name):
+        """The shared GameMap for a map name, parsed on first use."""
+        game_map = self.maps.get(name)
+        if game_map is not None:
+            return game_map
+
+        with self.lock:
+            load_lock = self.loading.setdefault(name, threading.Lock())
+        # Per map, so two different maps can load at once but the same one only once
+        with load_lock:
+            game_map = self.maps.get(name)
+            if game_map is None:
+                game_map = GameMap(self.path(name))
+                self.maps[name] = game_map
+        return game_map
+
+    def preload(self, names=None, workers=None):
+        """Parse the given maps (default: all of them) in parallel and wait for them."""
+        names = list(names) if names is not None else self.names()
+        if not names:
+            return
+        with ThreadPoolExecutor(max_workers=workers or min(len(names), os.cpu_count() or 1),
+                                thread_name_prefix="maps") as pool:
+            list(pool.map(self.get, names))
+        print(f"[INFO] Preloaded {len(names)} maps")
+
+    def loaded(self):
+        return sorted(self.maps)
+
+
+# Process-wide registry
+maps = MapRegistry()
@@ -1,43 +1,206 @@
 # server/message_handler.py
-import msgpack, time
+import time
+import config
 from server import auth_db
+from shared import compress, schema
+from shared import session as frames
+from server.inbox import QUEUED_TYPES
+from server.ingress import IngressFilter
+from server.snapshot import SnapshotHistory
+from shared.reliable import ReliableChannel
 
 
 class MessageHandler:
-    def __init__(self, sock, player_manager, lock):
+    def __init__(self, sock, player_manager, lock, interest=None, inputs=None, tick_anchor=None, offload=None):
         self.sock = sock
         self.player_manager = player_manager
         self.lock = lock
+        self.interest = interest
+        self.inputs = inputs  # InputQueue; moves/portals wait for the next tick when set
+        self.tick_anchor = tick_anchor  # () -> (sim tick, server time), for clock sync
+        # offload(fn, *args) runs DB writes; the asyncio core hands them to its executor
+        self.offload = offload or (lambda fn, *args: fn(*args))
+        # Size, header and rate checks plus bounded decoding, before anything else
+        self.ingress = IngressFilter(config.MAX_PACKET_SIZE, config.PACKET_RATE, config.PACKET_BURST)
+
+    def handle_datagram(self, data, addr):
+        payload = self.ingress.accept(data, addr)
+        if payload is None:
+            return
+        if frames.is_frame(payload):
+            self.handle_session_frame(payload, addr)
+            return
+        msg = self.ingress.unpack(payload)
+        if msg is not None:
+            self.handle_message(msg, addr)
 
     def handle_message(self, msg, addr):
+        if msg.get("type") == "resume":
+            self.handle_resume(msg, addr)
+            return
         token = msg.get("token")
         if not token:
             return
 
-        # Verify token
+        # Verify token; bad ones are counted, not logged (that would be a flood of its own)
         if not self.player_manager.verify_token(token):
-            print(f"[WARN] Invalid token from {addr}, ignoring")
+            self.ingress.dropped["token"] += 1
             return
 
         with self.lock:
+            if msg.get("type") != "join" and token not in self.player_manager.tokens:
+                # Only a join starts a connection. A move that overtook the join (or
+                # outlived the player) would otherwise build one without the
+                # client's channel state, and the join would then tear it down again
+                self.sock.sendto(schema.pack({"type": "session_expired"}), addr)
+                return
+
             pid, player, saved_data = self.player_manager.create_or_get_player(token, addr)
 
             if saved_data:  # new player
-                self._send_assign_id(pid, saved_data, addr)
+                self._start_connection(pid, player, msg, addr, saved_data)
             else:
-                handler = getattr(self, f"on_{msg['type']}", None)
-                if handler:
-                    handler(pid, player, msg, addr)
-                else:
-                    print(f"[WARN] Unknown message type: {msg['type']}")
+                self._receive(pid, player, msg, addr)
+
+    def handle_resume(self, msg, addr):
+        """Back after a drop or an address change: the ticket from assign_id stands in for the token."""
+        ticket = msg.get("ticket")
+        with self.lock:
+            pid, player = self.player_manager.ticket_holder(ticket) if isinstance(ticket, bytes) else (None, None)
+            if player is None or msg.get("conn") != player.channel.conn:
+                # Unknown, expired, or from an earlier client connection: log in again.
+                # Checked before resume(), so a refused ticket leaves the player as it was
+                self.sock.sendto(schema.pack({"type": "resume_failed"}), addr)
+                return
+            self.player_manager.resume(ticket, addr)
+            if msg.get("jid") is not None and msg.get("jid") == player.join_id:
+                return  # retransmitted, already answered
+            player.join_id = msg.get("jid")
+            player.reset_rate()  # new path, maybe a different link
+            sess = self.player_manager.sessions.issue(pid, self.player_manager.get_token(pid), addr)
+            player.send_reliable(self.sock, {
+                "type": "session",
+                "session_id": sess.id,
+                "session_key": sess.key,
+            })
+
+    def handle_session_frame(self, data, addr):
+        """Packets after join: session id + MAC checked in memory, no token lookup.
+        data has been through the ingress filter already."""
+        sid, mac, payload = frames.parse(data)
+        sess = self.player_manager.sessions.get(sid)
+        if sess is None:
+            # Unproven sender, maybe a spoofed address: no answer. A client we
+            # forgot finds out from the silence (see Client.check_silence)
+            self.ingress.dropped["session"] += 1
+            return
+        if not frames.verify(sid, sess.key, mac, payload):
+            return  # forged or corrupt, not worth an answer
+        if not self.player_manager.sessions.is_valid(sess, addr):
+            # Address changed or session too old: the client re-joins with its token
+            self.sock.sendto(schema.pack({"type": "session_expired"}), addr)
+            return
+
+        msg = self.ingress.unpack(payload)
+        if msg is None or msg.get("type") == "join":
+            return
+        self.handle_session_message(sess.pid, msg, addr)
+
+    def handle_session_message(self, pid, msg, addr):
+        """A message from a verified session: from handle_session_frame or an ingress worker."""
+        if pid in self.player_manager.parked:
+            # Timed out but still within its grace period: its session is proof enough
+            with self.lock:
+                self.player_manager.unpark(pid, addr)
+
+        # Clock sync answers right away; queueing would only add to the measured RTT
+        if msg.get("type") == "ping":
+            player = self.player_manager.clients.get(pid)
+            if player is not None:
+                self.on_ping(pid, player, msg, addr)
+            return
+
+        # Inputs only need the per-player inbox, not the global lock
+        # (reliable ones are put in order under the lock first)
+        if self.inputs is not None and msg.get("type") in QUEUED_TYPES and "rel" not in msg:
+            if pid in self.player_manager.clients:
+                self.player_manager.last_seen[pid] = time.time()
+                self.inputs.push(pid, msg, addr)
+            return
+
+        with self.lock:
+            player = self.player_manager.clients.get(pid)
+            if player is None:
+                return
+            self.player_manager.last_seen[pid] = time.time()
+            self._receive(pid, player, msg, addr)
+
+    def apply_inputs(self):
+        """Apply every queued input in one batch. Called by the simulation with the lock held."""
+        for pid, entries in self.inputs.drain():
+            player = self.player_manager.clients.get(pid)
+            if player is None:
+                continue
+            for msg, addr in entries:
+                try:
+                    self._dispatch(pid, player, msg, addr, queued=True)
+                except (KeyError, TypeError, ValueError):
+                    # One bad input must not stop the simulation for everyone
+                    self.inputs.reject(pid)
+
+    def _receive(self, pid, player, msg, addr):
+        """Reliable messages go through the player's channel and come out once, in order."""
+        if "rel" not in msg:
+            self._dispatch(pid, player, msg, addr)
+            return
+        for ready in player.channel.receive(msg):
+            self._dispatch(pid, player, ready, addr)
+
+    def _dispatch(self, pid, player, msg, addr, queued=False):
+        if not queued and self.inputs is not None and msg["type"] in QUEUED_TYPES:
+            self.inputs.push(pid, msg, addr)
+            return
+        if "rack" in msg:
+            player.channel.on_ack(msg["rack"], msg.get("rsack"))
+        handler = getattr(self, f"on_{msg['type']}", None)
+        if handler:
+            handler(pid, player, msg, addr)
+        else:
+            print(f"[WARN] Unknown message type: {msg['type']}")
 
     # ---------------- Handlers ----------------
+    def on_join(self, pid, player, msg, addr):
+        """Join for a player already in game: a new client connection, or a token re-check."""
+        conn = msg.get("conn")
+        if conn != player.channel.conn:
+            # Client restarted (or reconnected) while its player was still here
+            self._start_connection(pid, player, msg, addr, self._player_data(player))
+            return
+        if msg.get("jid") is not None and msg.get("jid") == player.join_id:
+            return  # retransmitted join, already answered
+
+        player.join_id = msg.get("jid")
+        sess = self.player_manager.sessions.issue(pid, msg["token"], addr)
+        player.send_reliable(self.sock, {
+            "type": "session",
+            "session_id": sess.id,
+            "session_key": sess.key,
+        })
+
+    def on_ping(self, pid, player, msg, addr):
+        t1 = time.time()
+        self.sock.sendto(schema.pack(dict(self._clock_fields(msg.get("t0"), t1), type="pong"), player.schema), addr)
+
+    def on_rel_ack(self, pid, player, msg, addr):
+        """Standalone ack; the rack/rsack fields were handled in _dispatch."""
+
     def on_move(self, pid, player, msg, addr):
         player.update_move(msg)  # use Player method
 
     def on_save(self, pid, player, msg, addr):
-        username = self.player_manager.get_username_from_pid(pid)
-        auth_db.save_player_state(
+        username = getattr(player, "username", None) or self.player_manager.get_username_from_pid(pid)
+        self.offload(
+            auth_db.save_player_state,
             pid,
             username,
             msg["x"],
@@ -49,23 +212,56 @@ class MessageHandler:
 
     def on_portal_enter(self, pid, player, msg, addr):
         resp = player.enter_portal(msg)  # use Player method
-        self.sock.sendto(msgpack.packb(resp, use_bin_type=True), addr)
+        if self.interest is not None:
+            self.interest.update(("player", pid), player.current_map, player.x, player.y)
+        player.send_reliable(self.sock, resp)
 
     # ---------------- Utilities ----------------
-    def _send_assign_id(self, pid, saved_data, addr):
-        
+    def _start_connection(self, pid, player, msg, addr, saved_data):
+        """Fresh channel and session for a client connection, announced by assign_id."""
+        if msg.get("type") in ("join", "resume") and "schema" in msg:
+            # Only an offer can set the version; anything else keeps what was agreed
+            player.schema = schema.negotiate(msg["schema"])
+        player.compression = compress.negotiate(msg.get("compress")) if config.COMPRESSION else 0
+        # Pick up both sequences where the client's side of the channel stands
+        player.channel = ReliableChannel(msg.get("conn"), msg.get("rseq", 0), msg.get("rexpect", 0))
+        player.join_id = msg.get("jid")
+        player.snapshots = SnapshotHistory()
+        player.last_ack = None
+        player.reset_rate()
+        player.spawned = {"players": set(), "enemies": set()}
+        self.player_manager.issue_ticket(pid, player)
+        sess = self.player_manager.sessions.issue(pid, msg["token"], addr)
+        self._send_assign_id(pid, saved_data, addr, sess, msg.get("t0"))
 
-        # Get the player object and username
-        player_obj = self.player_manager.clients.get(pid)
-        username = getattr(player_obj, "username", None)
+    def _clock_fields(self, t0, t1):
+        """Timestamps for the client's clock estimate, plus a tick anchor to date snapshots by."""
+        tick, tick_time = self.tick_anchor() if self.tick_anchor else (None, None)
+        return {
+            "t0": t0,
+            "t1": t1,
+            "t2": time.time(),
+            "tick": tick,
+            "tick_time": tick_time,
+            "step": config.SIM_RATE,
+        }
+
+    def _player_data(self, player):
+        return {
+            "x": player.x,
+            "y": player.y,
+            "direction": player.direction,
+            "current_map": player.current_map,
+            "z_index": player.z_index,
+        }
 
-        # Fetch char_name from the database
-        char_name = auth_db.get_char_name(username) if username else f"Player{pid}"
-        class_type = auth_db.get_class_type(username) if username else "mage"
+    def _send_assign_id(self, pid, saved_data, addr, sess, t0=None):
+        t1 = time.time()
 
-        # Assign it to the player instance (so it propagates in broadcasts)
-        player_obj.name = char_name
-        player_obj.class_type = class_type
+        # Name and class were read from the DB when the player was created
+        player_obj = self.player_manager.clients.get(pid)
+        char_name = player_obj.name or f"Player{pid}"
+        class_type = player_obj.class_type or "mage"
 
         # Include name in the sent data
         player_data = dict(saved_data)
@@ -73,11 +269,14 @@ class MessageHandler:
         player_data["class_type"] = class_type
 
         # Send to client
-        self.sock.sendto(
-            msgpack.packb({
-                "type": "assign_id",
-                "player_id": pid,
-                "player_data": player_data
-            }, use_bin_type=True),
-            addr
-        )
+        player_obj.send_reliable(self.sock, {
+            "type": "assign_id",
+            "player_id": pid,
+            "player_data": player_data,
+            "schema": player_obj.schema,
+            "compress": player_obj.compression,
+            "session_id": sess.id,
+            "session_key": sess.key,
+            "resume": player_obj.resume_ticket,
+            **self._clock_fields(t0, t1),
+        })
@@ -1,113 +1,371 @@
-import time, config, msgpack
+import math, time, config
 import server.player as player
+from server.inbox import InputQueue
+from server.interest import InterestGrid
+from server.outbox import Outbox
+from server.rate import entity_weight
+from server.snapshot import EncodeCache
+from server.tick import TickScheduler
+from shared import schema
+from shared.compress import Compressor
+from shared.packetizer import chunk_entities, split_update
+
+# Upper bound on one packed entity state: the legacy schema carries field names,
+# the compact one only values (an unknown map name is the largest of them)
+ENTRY_BOUND = {0: 160}
+COMPACT_ENTRY_BOUND = 48
 
 
 class Network:
-    
+
     def __init__(self, lock):
         self.running = True
-        self.last_broadcast = time.time()
         self.lock = lock
+        # Fixed simulation step; snapshots go out on their own schedule
+        self.sim = TickScheduler(config.SIM_RATE, config.MAX_CATCH_UP)
+        self.send = TickScheduler(config.UPDATE_RATE, 1)
+        self.anchor = (0, time.time())  # (sim tick, server time it ran at), for client clock sync
+        self.interest = InterestGrid(config.AOI_CELL_SIZE)
+        self.aoi_radius = config.AOI_RADIUS
+        self.snapshot_seq = 0
+        # Inputs queued by the receive path, applied at the start of each step
+        self.inputs = InputQueue(config.INBOX_LIMIT)
+        self.input_handler = None
+        # Where each visible entity was at the last snapshot, for its speed
+        self.positions = {}
+        # Packed entity bytes for the snapshot being built; sizes are measured with it
+        self.encode_cache = EncodeCache()
+        self.peers = {}        # addr -> player there, for per-client send settings and errors
+        self.send_errors = 0
+        # Everything sent goes through here; the I/O layer drains it to the socket
+        self.outbox = Outbox(config.SEND_QUEUE_DEPTH, on_congestion=self.send_failed)
+        self.compressors = {}  # dictionary id -> Compressor, shared by the clients using it
+
+    # ---------------- Entity State ----------------
+    # Snapshots carry only what changes tick to tick; the static part of an
+    # entity goes out once, in the spawn sent when it enters a client's view.
+    def player_state(self, p):
+        return {
+            "id": p.id,
+            "x": p.x,
+            "y": p.y,
+            "direction": getattr(p, "direction", "down"),
+            "moving": getattr(p, "moving", False),
+            "current_map": getattr(p, "current_map", "Test_01"),
+            "z_index": getattr(p, "z_index", 0),
+            "attacking": getattr(p, "attacking", False),
+            "running": getattr(p, "running", False),
+            "jumping": getattr(p, "jumping", False),
+            "long_attacking": getattr(p, "long_attacking", False),
+            "charging_attack": getattr(p, "charging_attack", False),
+        }
+
+    def player_descriptor(self, p):
+        return {
+            "name": p.name,
+            "frame_w": getattr(p, "frame_w", 64),
+            "frame_h": getattr(p, "frame_h", 64),
+        }
+
+    def enemy_state(self, e):
+        # Ensure z_index is always valid
+        z = getattr(e, "z_index", 0)
+        if z is None:
+            z = 0
+            e.z_index = 0  # fallback
+
+        return {
+            "id": e.id,
+            "x": e.x,
+            "y": e.y,
+            "direction": e.direction,
+            "moving": e.moving,
+            "current_map": e.current_map,
+            "hp": getattr(e, "hp", 10),
+            "z_index": z,
+        }
 
-    def broadcast(self, player_manager, enemy_manager, sock):
+    def enemy_descriptor(self, e):
+        return {
+            "type": e.type,
+            "rows": getattr(e, "rows", 1),
+            "columns": getattr(e, "columns", 11),
+            "speed": getattr(e, "speed", 100.0),
+            "frame_speed": getattr(e, "frame_speed", 0.12),
+            "directions": getattr(e, "directions", ["down"]),
+            "c_h_padding": getattr(e, "c_h_padding", 0),
+            "c_v_padding": getattr(e, "c_v_padding", 0),
+        }
+
+    # ---------------- Area of Interest ----------------
+    def update_interest(self):
+        """Re-bucket entities that moved this tick (no-op unless they changed cell or map)."""
+        for pid, p in self.clients.items():
+            self.interest.update(("player", pid), p.current_map, p.x, p.y)
+        for eid, e in self.enemies.items():
+            self.interest.update(("enemy", eid), e.current_map, e.x, e.y)
+
+    def visible_to(self, p):
+        """Return the (kind, id) keys within the AOI radius of player p, on p's map."""
+        radius = self.aoi_radius
+        candidates = self.interest.query(p.current_map, p.x, p.y, radius)
+        if radius <= 0:
+            return candidates
+
+        r2 = radius * radius
+        visible = []
+        for key in candidates:
+            kind, eid = key
+            other = self.clients.get(eid) if kind == "player" else self.enemies.get(eid)
+            if other is None:
+                continue
+            dx = other.x - p.x
+            dy = other.y - p.y
+            if dx * dx + dy * dy <= r2:
+                visible.append(key)
+        return visible
+
+    def attach(self, player_manager, enemy_manager):
         self.player_manager = player_manager
         self.enemy_manager = enemy_manager
         self.clients = player_manager.clients
         self.enemies = enemy_manager.enemies
-        
+
+    def broadcast(self, player_manager, enemy_manager):
+        self.attach(player_manager, enemy_manager)
+
         while self.running:
-            now = time.time()
-            dt = now - self.last_broadcast
-            self.last_broadcast = now
-
-            world_time = time.strftime("%H:%M:%S", time.gmtime())
-            state = []
-            enemy_state = []
-
-            
-            
-
-            with self.lock:
-                # current_player_scenes = []
-                
-                # Interpolate positions first using real dt
-                for p in self.clients.values():
-                    player.interpolate_player(p, dt)
-
-                # Build state packet
-                for p in self.clients.values():
-                    state.append({
-                        "id": p.id,
-                        "name": p.name,
-                        "x": p.x,
-                        "y": p.y,
-                        "prev_x": p.prev_x,
-                        "prev_y": p.prev_y,
-                        "target_x": p.target_x,
-                        "target_y": p.target_y,
-                        "direction": getattr(p, "direction", "down"),
-                        "moving": getattr(p, "moving", False),
-                        "frame_w": getattr(p, "frame_w", 64),
-                        "frame_h": getattr(p, "frame_h", 64),
-                        "current_map": getattr(p, "current_map", "Test_01"),
-                        "z_index": getattr(p, "z_index", 0),
-                        "timestamp": p.last_update_time,
-                        "attacking": getattr(p, "attacking", False),
-                        "running": getattr(p, "running", False),
-                        "jumping": getattr(p, "jumping", False),
-                        "long_attacking": getattr(p, "long_attacking", False),
-                        "charging_attack": getattr(p, "charging_attack", False),
-                    })
-
-
-                enemy_manager.update_all(dt, self.clients)  # Update enemies with dt and player info
-
-                enemy_state = []
-                for e in self.enemies.values():
-                    # Only send enemies on the same map as a player
-                    if not any(p.current_map == e.current_map for p in self.clients.values()):
-                        continue
-                    #print(current_player_scenes)
-                    #if e.current_map in current_player_scenes:
-                    # Ensure z_index is always valid
-                    z = getattr(e, "z_index", 0)
-                    if z is None:
-                        z = 0
-                        e.z_index = 0  # fallback
-
-                    enemy_state.append({
-                        "id": e.id,
-                        "type": e.type,
-                        "x": e.x,
-                        "y": e.y,
-                        "direction": e.direction,
-                        "moving": e.moving,
-                        "current_map": e.current_map,
-                        "rows": getattr(e, "rows", 1),
-                        "columns": getattr(e, "columns", 11),
-                        "hp": getattr(e, "hp", 10),
-                        "speed": getattr(e, "speed", 100.0),
-                        "frame_speed": getattr(e, "frame_speed", 0.12),
-                        "directions": getattr(e, "directions", ["down"]),
-                        "z_index": z,
-                        "c_h_padding": getattr(e, "c_h_padding", 0),
-                        "c_v_padding": getattr(e, "c_v_padding", 0),
-                    })
-
-                # Broadcast to all clients
-                for p in self.clients.values():
-                    try:
-                        sock.sendto(
-                            msgpack.packb({
-                                "type": "update",
-                                "players": state,
-                                "enemies": enemy_state,
-                                "world_time": world_time,
-                                }, use_bin_type=True),
-                            (p.addr[0], p.addr[1])
-                        )
-                    except Exception:
-                        continue
-
-            # Sleep until next update
-            time.sleep(config.UPDATE_RATE)
\ No newline at end of file
+            # Sleep until the next simulation step or snapshot is due
+            time.sleep(self.run_due())
+
+    def run_due(self, now=None):
+        """
+        Run every simulation step and snapshot that is due, on their own fixed rates.
+        Returns the seconds until the next one is due.
+        """
+        now = time.monotonic() if now is None else now
+
+        steps = self.sim.due(now)
+        for _ in range(steps):
+            self.simulate(self.sim.step)
+        if steps:
+            self.anchor = (self.sim.tick, time.time())
+
+        if self.send.due(now):
+            self.send_snapshots(self.outbox)
+            self.resend_reliable(self.outbox)
+
+        return min(self.sim.time_until_next(), self.send.time_until_next())
+
+    def simulate(self, dt):
+        """Advance the world by one fixed step."""
+        with self.lock:
+            if self.input_handler is not None:
+                self.input_handler()
+
+            for p in self.clients.values():
+                player.interpolate_player(p, dt)
+
+            self.enemy_manager.update_all(dt, self.clients)  # Update enemies with dt and player info
+
+            self.update_interest()
+
+    def send_snapshots(self, outbox):
+        """Build every client's update under the lock, then serialize and queue it without it."""
+        self.send_updates(outbox, self.collect_updates())
+
+    def collect_updates(self, now=None):
+        """
+        Return (addr, schema version, message) for every client whose next snapshot
+        is due: its spawn/despawn messages, if anything entered or left its view,
+        then its update stamped with the current tick.
+        """
+        updates = []
+        now = time.monotonic() if now is None else now
+
+        with self.lock:
+            self.snapshot_seq += 1
+            self.encode_cache = EncodeCache()
+            self.peers = {}
+
+            # Entity states are built lazily, once per snapshot, for whoever can see them;
+            # deltas against a baseline several clients share are computed once too
+            states = {}
+            diffs = {}
+            spawns = {}
+            speeds = {}
+            positions = {}
+
+            # Send each client only what is near it on its own map, at its own rate
+            for p in self.clients.values():
+                addr = (p.addr[0], p.addr[1])
+                self.peers[addr] = p
+                if not p.rate.due(now):
+                    continue
+
+                players = {}
+                enemies = {}
+                for key in self.visible_to(p):
+                    kind, eid = key
+                    if key not in states:
+                        if kind == "player":
+                            states[key] = self.player_state(self.clients[eid])
+                        else:
+                            states[key] = self.enemy_state(self.enemies[eid])
+                        speeds[key] = self.entity_speed(key, states[key], now, positions)
+                    if kind == "player":
+                        players[eid] = states[key]
+                    else:
+                        enemies[eid] = states[key]
+
+                for msg in self.spawn_changes(p, players, enemies, states, spawns):
+                    msg = p.channel.wrap(msg)
+                    updates.append((addr, p.schema, dict(msg, **p.channel.ack_fields())))
+
+                # Only send what changed since the last snapshot this client acked,
+                # as much of it as fits in the client's budget
+                rtt = p.snapshots.ack(p.last_ack, p.ack_time)
+                if rtt is not None:
+                    p.rate.on_rtt(rtt)
+                if p.last_ack is not None and p.last_ack < 0:
+                    p.last_ack = None  # a negative ack resets the baseline once, not every tick
+                p.rate.adjust(now)
+
+                def select(changed_players, changed_enemies, p=p):
+                    return self.prioritize(p, changed_players, changed_enemies, speeds, now)
+
+                update = p.snapshots.delta(self.snapshot_seq, players, enemies, diffs, select, now)
+                update["type"] = "update"
+                update["tick"] = self.sim.tick
+                update.update(p.channel.ack_fields())
+                updates.append((addr, p.schema, update))
+                p.rate.on_sent(now, self.snapshot_seq)
+
+            self.positions.update(positions)
+            for key in [k for k in self.positions if k not in positions and k not in self.interest.locations]:
+                del self.positions[key]
+
+        return updates
+
+    def entity_speed(self, key, state, now, positions):
+        """px/s since the entity was last put in a snapshot."""
+        positions[key] = (state["x"], state["y"], now)
+        last = self.positions.get(key)
+        if last is None or now <= last[2]:
+            return 0.0
+        return math.hypot(state["x"] - last[0], state["y"] - last[1]) / (now - last[2])
+
+    def prioritize(self, p, changed_players, changed_enemies, speeds, now):
+        """Keys of the changed entities that fit in p's byte budget this time (None: all)."""
+        bound = ENTRY_BOUND.get(p.schema, COMPACT_ENTRY_BOUND)
+        if (len(changed_players) + len(changed_enemies)) * bound <= p.rate.budget:
+            p.priority.clear()
+            return None  # fits for sure; no need to pack anything under the lock
+
+        cache = self.encode_cache
+        candidates = []
+        # Sized as split_update packs them: same field tables, same cache entries
+        for kind, field, changed in (("player", "players", changed_players),
+                                     ("enemy", "enemies", changed_enemies)):
+            for entry in changed:
+                key = (kind, entry["id"])
+                other = self.clients.get(entry["id"]) if kind == "player" else self.enemies.get(entry["id"])
+                if other is None:
+                    weight = 1.0
+                else:
+                    weight = entity_weight(other.x - p.x, other.y - p.y, speeds.get(key, 0.0), self.aoi_radius)
+                candidates.append((key, weight, len(cache(field, entry, p.schema))))
+
+        last = p.rate.last_send
+        elapsed = now - last if last is not None else p.rate.interval
+        return p.priority.select(candidates, p.rate.budget, elapsed)
+
+    def spawn_changes(self, p, players, enemies, states, spawns):
+        """Spawn/despawn messages bringing what client p knows about in line with what it sees."""
+        messages = []
+        gone = {}
+        new = {"players": [], "enemies": []}
+        for kind, key_kind, visible in (("players", "player", players), ("enemies", "enemy", enemies)):
+            known = p.spawned[kind]
+            gone[kind] = [eid for eid in known if eid not in visible]
+            for eid in visible:
+                if eid in known:
+                    continue
+                key = (key_kind, eid)
+                if key not in spawns:
+                    if key_kind == "player":
+                        descriptor = self.player_descriptor(self.clients[eid])
+                    else:
+                        descriptor = self.enemy_descriptor(self.enemies[eid])
+                    spawns[key] = dict(states[key], **descriptor)
+                new[kind].append(spawns[key])
+                known.add(eid)
+            known.difference_update(gone[kind])
+
+        if gone["players"] or gone["enemies"]:
+            messages.append({"type": "despawn", "players": gone["players"], "enemies": gone["enemies"]})
+        for chunk in chunk_entities(new["players"], new["enemies"], p.schema, config.MAX_DATAGRAM_SIZE - 64):
+            messages.append(dict(chunk, type="spawn"))
+        return messages
+
+    def send_updates(self, outbox, updates, cache=None):
+        """Queue every client's update on the outbox; a newer snapshot replaces one still waiting."""
+        # Each entity is serialized once per tick and its bytes reused for every client
+        cache = self.encode_cache if cache is None else cache
+        for addr, version, msg in updates:
+            try:
+                if msg["type"] == "update":
+                    # Large snapshots go out as several MTU-sized datagrams
+                    for datagram in split_update(msg, version, config.MAX_DATAGRAM_SIZE, cache):
+                        outbox.push(addr, self.compress(addr, datagram), msg["seq"])
+                else:
+                    outbox.sendto(self.compress(addr, schema.pack(msg, version)), addr)
+            except Exception as e:
+                print(f"[ERROR] Could not pack {msg['type']} for {addr}: {e!r}")
+        return cache
+
+    def compress(self, addr, data):
+        """data as the client at addr gets it: deflated if it negotiated a dictionary."""
+        peer = self.peers.get(addr)
+        if peer is None or not peer.compression:
+            return data
+        compressor = self.compressors.get(peer.compression)
+        if compressor is None:
+            compressor = self.compressors[peer.compression] = Compressor(
+                peer.compression, config.COMPRESS_THRESHOLD, config.COMPRESS_LEVEL)
+        return compressor(data)
+
+    def send_failed(self, addr):
+        """A client's snapshots piling up unsent is the clearest congestion signal there is."""
+        self.send_errors += 1
+        peer = self.peers.get(addr)
+        if peer is not None:
+            peer.rate.on_send_error()
+
+    def resend_reliable(self, outbox):
+        """Retransmit control messages whose ack is overdue."""
+        now = time.monotonic()
+        resend = []
+        with self.lock:
+            for p in self.clients.values():
+                for msg in p.channel.due(now):
+                    addr = (p.addr[0], p.addr[1])
+                    data = schema.pack(dict(msg, **p.channel.ack_fields()), p.schema)
+                    resend.append((addr, self.compress(addr, data)))
+
+        for addr, data in resend:
+            outbox.sendto(data, addr)
+
+    def tick_anchor(self):
+        return self.anchor
+
+    def stats(self):
+        return {
+            "sim": self.sim.stats(),
+            "send": self.send.stats(),
+            "inputs": self.inputs.stats(),
+            "send_errors": self.send_errors,
+            "outbox": self.outbox.stats(),
+            "compression": {dict_id: c.stats() for dict_id, c in self.compressors.items()},
+            "clients": {pid: p.rate.stats() for pid, p in self.clients.items()},
+        }
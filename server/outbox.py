@@ -0,0 +1,137 @@
+# server/outbox.py
+import errno
+import select
+import threading
+from collections import deque
+
+
+class Outbox:
+    """
+    Per-client outbound queues between the game and the socket.
+
+    Everything that used to call sock.sendto() pushes here instead, which
+    never blocks; the I/O layer drains the queues with a non-blocking send,
+    one datagram per client in turn. A client's queue is bounded: a newer
+    snapshot supersedes the fragments of older ones still waiting, and past
+    the limit the oldest entry goes. When the kernel buffer is full
+    (EAGAIN/ENOBUFS) the datagram stays queued for the next flush.
+    """
+
+    def __init__(self, depth=64, on_congestion=None):
+        self.depth = depth
+        self.on_congestion = on_congestion  # (addr) -> None, when a client's queue backs up
+        self.on_wake = None                 # () -> None, called when something is queued
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        self.queues = {}       # addr -> deque of (data, snapshot seq or None)
+        self.order = deque()   # addrs with something queued, in turn order
+        self.metrics = {
+            "sent": 0, "superseded": 0, "overflow": 0,
+            "eagain": 0, "enobufs": 0, "errors": 0, "max_depth": 0,
+        }
+
+    # ---------------- Queueing ----------------
+    def sendto(self, data, addr):
+        """Queue a control datagram; same call shape as socket.sendto."""
+        self.push(addr, data)
+
+    def push(self, addr, data, seq=None):
+        """Queue a datagram for addr; seq marks a snapshot fragment that newer snapshots replace."""
+        congested = False
+        with self.lock:
+            queue = self.queues.get(addr)
+            if queue is None:
+                queue = self.queues[addr] = deque()
+            idle = not queue
+            if idle:
+                self.order.append(addr)
+
+            if seq is not None and queue:
+                stale = sum(1 for _, s in queue if s is not None and s < seq)
+                if stale:
+                    self.queues[addr] = queue = deque(e for e in queue if e[1] is None or e[1] >= seq)
+                    self.metrics["superseded"] += stale
+                    congested = True
+
+            if len(queue) >= self.depth:
+                # Oldest snapshot fragment first; control messages are retransmitted anyway
+                victim = next((e for e in queue if e[1] is not None), queue[0])
+                queue.remove(victim)
+                self.metrics["overflow"] += 1
+                congested = True
+
+            queue.append((data, seq))
+            if len(queue) > self.metrics["max_depth"]:
+                self.metrics["max_depth"] = len(queue)
+            if idle:
+                self.ready.notify()
+
+        if congested and self.on_congestion is not None:
+            self.on_congestion(addr)
+        if self.on_wake is not None:
+            self.on_wake()
+
+    # ---------------- Draining ----------------
+    def flush(self, send):
+        """
+        Send queued datagrams with send(data, addr), one per client in turn.
+        Returns False if the socket would block and datagrams are left.
+        """
+        with self.lock:
+            head = self._head()
+        while head is not None:
+            addr, data = head
+            sent = True
+            try:
+                send(data, addr)
+            except OSError as e:
+                if self.send_error(e):
+                    return False  # kernel buffer full: keep it for the next flush
+                sent = False
+
+            with self.lock:
+                queue = self.queues.get(addr)
+                if queue and queue[0][0] is data:
+                    queue.popleft()
+                self.metrics["sent"] += sent
+                self.order.popleft()
+                if queue:
+                    self.order.append(addr)
+                else:
+                    self.queues.pop(addr, None)
+                head = self._head()
+        return True
+
+    def _head(self):
+        """(addr, datagram) whose turn it is, or None when everything is sent. Needs the lock."""
+        while self.order:
+            queue = self.queues.get(self.order[0])
+            if queue:
+                return self.order[0], queue[0][0]
+            self.order.popleft()
+        return None
+
+    def send_error(self, e):
+        """Count a failed send; True if it was the socket buffer being full."""
+        if isinstance(e, BlockingIOError):
+            self.metrics["eagain"] += 1
+            return True
+        if e.errno == errno.ENOBUFS:
+            self.metrics["enobufs"] += 1
+            return True
+        self.metrics["errors"] += 1  # e.g. an ICMP error from a client that left
+        return False
+
+    def drain_forever(self, sock, running=lambda: True):
+        """Threaded core: the sending thread. sock must be non-blocking."""
+        while running():
+            with self.lock:
+                if not self.order:
+                    self.ready.wait(0.5)
+            if not self.flush(sock.sendto):
+                # Kernel buffer full: wait until the socket can take more
+                select.select([], [sock], [], 0.05)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.metrics, queued=sum(len(q) for q in self.queues.values()))
@@ -0,0 +1,117 @@
+# server/pathfinding.py
+# Flow fields for enemies chasing a player around walls.
+#
+# A field is built toward one goal tile on one map and z-level: a BFS out
+# from the goal over the walkable tiles records, for every tile it reaches,
+# the neighbouring tile one step closer to the goal. Any number of enemies
+# chasing toward that tile then find their next step with one lookup, so
+# the work is one BFS per goal tile, not a search per enemy. Fields are
+# cached by goal, so a new one is only built when a player changes tile.
+#
+# Enemies move between tile-aligned positions: "at tile (tx, ty)" means the
+# top-left of their rect is at (tx, ty) * tile size. Walkable depends on
+# the enemy's size in tiles, since the whole rect has to fit.
+from array import array
+from collections import OrderedDict
+
+import config
+
+UNREACHED = -1
+
+# Orthogonal first, so they win ties and paths only go diagonal when it saves a step
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def clearance(game_map, width, height):
+    """Tiles a width x height rect needs in each direction when tile-aligned."""
+    grid = game_map.grid
+    return max(1, -(-width // grid.tile_w)), max(1, -(-height // grid.tile_h))
+
+
+def walkable(grid, z, kx, ky):
+    """1 for each tile where a kx x ky tile enemy fits without touching a collider on layer z."""
+    width, height = grid.width, grid.height
+    cells = grid.collision.get(z)
+    free = bytearray(grid.size)
+    for ty in range(height - ky + 1):
+        for tx in range(width - kx + 1):
+            if cells is None or not any(
+                    any(cells[row * width + tx:row * width + tx + kx]) for row in range(ty, ty + ky)):
+                free[ty * width + tx] = 1
+    return free
+
+
+class FlowFields:
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.fields = OrderedDict()  # (map, z, kx, ky, goal) -> next-step array, least recently used first
+        self.graphs = {}             # (map, z, kx, ky) -> neighbours an enemy that size can step to, per tile
+        self.built = 0
+        self.hits = 0
+
+    def graph(self, game_map, z, kx, ky):
+        """For each tile, the tiles a kx x ky tile enemy on layer z can step to from it."""
+        key = (game_map, z, kx, ky)
+        neighbours = self.graphs.get(key)
+        if neighbours is None:
+            grid = game_map.grid
+            neighbours = self.graphs[key] = self.link(walkable(grid, z, kx, ky), grid.width)
+        return neighbours
+
+    @staticmethod
+    def link(free, width):
+        height = len(free) // width
+        neighbours = []
+        for cell in range(len(free)):
+            cy, cx = divmod(cell, width)
+            reachable = []
+            for dx, dy in DIRECTIONS:
+                nx, ny = cx + dx, cy + dy
+                if not (0 <= nx < width and 0 <= ny < height) or not free[ny * width + nx]:
+                    continue
+                # No cutting corners: the rect sweeps both orthogonal neighbours
+                if dx and dy and not (free[cy * width + nx] and free[ny * width + cx]):
+                    continue
+                reachable.append(ny * width + nx)
+            neighbours.append(tuple(reachable))
+        return neighbours
+
+    def field(self, game_map, z, kx, ky, goal):
+        """Next-step array toward the goal tile: the tile to move to from each tile, UNREACHED if none."""
+        key = (game_map, z, kx, ky, goal)
+        steps = self.fields.get(key)
+        if steps is not None:
+            self.fields.move_to_end(key)
+            self.hits += 1
+            return steps
+
+        steps = self.build(self.graph(game_map, z, kx, ky), goal)
+        self.built += 1
+        self.fields[key] = steps
+        if len(self.fields) > self.capacity:
+            self.fields.popitem(last=False)
+        return steps
+
+    @staticmethod
+    def build(neighbours, goal):
+        """BFS out from the goal; each tile reached records the tile it was reached from."""
+        steps = array("i", [UNREACHED]) * len(neighbours)
+        steps[goal] = goal
+        frontier = [goal]
+        while frontier:
+            following = []
+            reach = following.append
+            for cell in frontier:
+                for n in neighbours[cell]:
+                    if steps[n] < 0:  # UNREACHED
+                        steps[n] = cell
+                        reach(n)
+            frontier = following
+        return steps
+
+    def stats(self):
+        return {"fields": len(self.fields), "built": self.built, "hits": self.hits}
+
+
+# Process-wide, so every enemy chasing the same tile shares one field
+flow_fields = FlowFields(config.FLOW_FIELD_CACHE)
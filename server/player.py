@@ -1,4 +1,12 @@
 import time
+import config
+from server.rate import PriorityAccumulator, SendRate
+from server.snapshot import SnapshotHistory
+from shared import schema
+from shared.reliable import ReliableChannel
+
+# Stop extrapolating a player whose moves stopped coming (two missed keepalives)
+DEAD_RECKONING_LIMIT = 2 * config.MOVE_KEEPALIVE
 
 class Player:
     def __init__(self, player_id, name, x=100, y=100):
@@ -17,15 +25,49 @@ class Player:
         self.charging_attack = False
         self.running = False
         self.jumping = False
+        self.schema = 0  # wire schema version negotiated at join
+        self.compression = 0  # preset dictionary id negotiated at join, 0 for none
 
         # Interpolation state
         self.prev_x = x
         self.prev_y = y
         self.target_x = x
         self.target_y = y
+        self.vx = 0.0  # velocity reported with the last move, for dead reckoning
+        self.vy = 0.0
         self.last_update_time = 0.0
         self.prev_map = self.current_map
 
+        # Delta snapshots
+        self.snapshots = SnapshotHistory()
+        self.last_ack = None  # newest snapshot seq the client confirmed
+        self.ack_time = None  # when it arrived, for RTT samples
+
+        # Per-client snapshot rate, byte budget and entity priorities
+        self.reset_rate()
+
+        # Reliable control messages, reset whenever a new client connection joins
+        self.channel = ReliableChannel()
+        self.join_id = None
+        self.resume_ticket = None  # lets this client connection back in after a drop, see PlayerManager.resume
+        self.spawned = {"players": set(), "enemies": set()}  # entities this client was told to spawn
+
+    def send_reliable(self, sock, msg):
+        """Send a control message on the reliable channel, with our acks piggybacked."""
+        msg = self.channel.wrap(msg)
+        sock.sendto(schema.pack(dict(msg, **self.channel.ack_fields()), self.schema),
+                    (self.addr[0], self.addr[1]))
+
+    def reset_rate(self):
+        self.rate = SendRate(config.UPDATE_RATE, config.MAX_UPDATE_INTERVAL,
+                             config.CLIENT_BUDGET, config.MIN_CLIENT_BUDGET)
+        self.priority = PriorityAccumulator()
+
+    def note_ack(self, seq, delay_ms=None):
+        """delay_ms: how long the client held the ack before sending it."""
+        if seq is not None and seq != self.last_ack:
+            self.last_ack = seq
+            self.ack_time = time.monotonic() - (delay_ms or 0) / 1000
 
     # ---------------- Player Updates ----------------
     def update_move(self, msg: dict):
@@ -34,6 +76,8 @@ class Player:
         self.last_update_time = time.time()
         self.target_x = msg["x"]
         self.target_y = msg["y"]
+        self.vx = msg.get("vx") or 0.0
+        self.vy = msg.get("vy") or 0.0
         self.direction = msg.get("direction", self.direction)
         self.attack_direction = self.direction
         self.moving = msg.get("moving", False)
@@ -44,6 +88,8 @@ class Player:
         self.jumping = msg.get("jumping", False)
         self.long_attacking = msg.get("long_attacking", False)
         self.charging_attack = msg.get("charging_attack", False)
+        self.note_ack(msg.get("ack"), msg.get("ack_delay"))
+        self.rate.on_report(msg.get("rcv"), msg.get("ack"))
 
         if "current_map" in msg:
             self.current_map = msg["current_map"]
@@ -88,6 +134,12 @@ def interpolate_player(player, dt):
         player.prev_map = player.current_map
         return
 
+    # Dead reckoning: clients only send moves when they drift from this prediction,
+    # so carry the target along the last reported velocity (for a while) in between
+    if getattr(player, "moving", False) and time.time() - player.last_update_time < DEAD_RECKONING_LIMIT:
+        player.target_x += getattr(player, "vx", 0.0) * dt
+        player.target_y += getattr(player, "vy", 0.0) * dt
+
     # Default speed (units per second)
     speed = getattr(player, "speed", 200.0)
 
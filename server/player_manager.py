@@ -1,14 +1,19 @@
 # server/player_manager.py
+import secrets
 import time
 from server import auth_db
 import config
 from server import player
+from server.session import SessionTable
 
 class PlayerManager:
     def __init__(self):
         self.clients = {}          # pid -> Player object
         self.last_seen = {}        # pid -> last active timestamp
         self.tokens = {}           # token -> pid
+        self.sessions = SessionTable(config.SESSION_TTL)
+        self.tickets = {}          # resume ticket -> pid
+        self.parked = {}           # pid -> (Player, time parked); timed out, kept for RESUME_GRACE
         self.player_counter = 1
         self.available_ids = []
         self.token_cache = config.token_cache
@@ -31,14 +36,80 @@ class PlayerManager:
             return pid
 
     def cleanup_player(self, pid):
-        if pid in self.clients: del self.clients[pid]
+        player_obj = self.clients.pop(pid, None)
+        if pid in self.parked:
+            player_obj = self.parked.pop(pid)[0]
+        if player_obj is not None:
+            self.tickets.pop(player_obj.resume_ticket, None)
         if pid in self.last_seen: del self.last_seen[pid]
         for tok, id in list(self.tokens.items()):
             if id == pid:
                 del self.tokens[tok]
+        self.sessions.drop(pid)
         self.available_ids.append(pid)
         print(f"[TIMEOUT] Removed player {pid}, ID available again")
 
+    # ---------------- Parking / Resume ----------------
+    # A player that times out is parked rather than removed: out of the game,
+    # but with its pid, state, session and reliable channel kept for
+    # RESUME_GRACE seconds. Its client gets back in with its resume ticket
+    # (or simply by being heard from again) without touching the DB.
+    def issue_ticket(self, pid, player_obj):
+        self.tickets.pop(player_obj.resume_ticket, None)
+        player_obj.resume_ticket = secrets.token_bytes(16)
+        self.tickets[player_obj.resume_ticket] = pid
+        return player_obj.resume_ticket
+
+    def park(self, pid, now=None):
+        player_obj = self.clients.pop(pid, None)
+        if player_obj is None:
+            return None
+        self.last_seen.pop(pid, None)
+        self.parked[pid] = (player_obj, time.time() if now is None else now)
+        return player_obj
+
+    def unpark(self, pid, addr):
+        """Put a parked player back in the game at addr; the player, or None if it was not parked."""
+        entry = self.parked.pop(pid, None)
+        if entry is None:
+            return None
+        player_obj = entry[0]
+        player_obj.addr = addr
+        self.clients[pid] = player_obj
+        self.last_seen[pid] = time.time()
+        print(f"[INFO] Player {pid} resumed after {time.time() - entry[1]:.1f}s")
+        return player_obj
+
+    def ticket_holder(self, ticket):
+        """(pid, Player) a resume ticket was issued to, parked or not, without touching either."""
+        pid = self.tickets.get(ticket)
+        if pid is None:
+            return None, None
+        entry = self.parked.get(pid)
+        return pid, entry[0] if entry is not None else self.clients.get(pid)
+
+    def resume(self, ticket, addr):
+        """(pid, Player) for a resume ticket, parked or not, now at addr; (None, None) if unknown."""
+        pid = self.tickets.get(ticket)
+        if pid is None:
+            return None, None
+        player_obj = self.unpark(pid, addr) or self.clients.get(pid)
+        if player_obj is None:
+            return None, None
+        player_obj.addr = addr
+        self.last_seen[pid] = time.time()
+        return pid, player_obj
+
+    def expired_parked(self, grace, now=None):
+        now = time.time() if now is None else now
+        return [pid for pid, (_, parked_at) in self.parked.items() if now - parked_at > grace]
+
+    def get_token(self, pid):
+        for token, id in self.tokens.items():
+            if id == pid:
+                return token
+        return None
+
     # ---------------- Token Handling ----------------
     def verify_token(self, token):
         now = time.time()
@@ -88,6 +159,8 @@ class PlayerManager:
             new_player.current_map = saved_data.get("current_map", "DefaultMap")
             new_player.z_index = saved_data.get("z_index", 0)
             new_player.username = username
+            # Fetched once here; new connections for this player reuse it without the DB
+            new_player.class_type = auth_db.get_class_type(username) or "mage"
 
             self.clients[pid] = new_player
             self.last_seen[pid] = time.time()
@@ -96,7 +169,8 @@ class PlayerManager:
             return pid, new_player, saved_data
         else:
             pid = self.tokens[token]
-            existing_player = self.clients[pid]
+            # A token join during the grace period takes the parked player back too
+            existing_player = self.unpark(pid, addr) or self.clients[pid]
             self.last_seen[pid] = time.time()
             existing_player.addr = addr
             return pid, existing_player, None
@@ -0,0 +1,159 @@
+# server/rate.py
+import math
+
+LOSS_THRESHOLD = 0.05    # reported snapshot loss that counts as congestion
+QUEUE_DELAY = 0.1        # RTT this far above twice the best seen counts as congestion
+                         # (acks wait up to a client frame plus a sim step on their own)
+BUDGET_STEP = 400        # bytes added per clean adjustment
+SPEED_REF = 100.0        # px/s that doubles an entity's priority
+
+
+class SendRate:
+    """
+    Snapshot interval and byte budget for one client.
+
+    AIMD once per `adjust_every` seconds: back off multiplicatively when
+    the client reports lost snapshots, its RTT climbs well above the best
+    seen, or sendto fails; recover additively while the link looks clean.
+    """
+
+    def __init__(self, base_interval, max_interval, budget, min_budget, adjust_every=1.0):
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.interval = base_interval
+        self.max_budget = budget
+        self.min_budget = min_budget
+        self.budget = budget
+        self.adjust_every = adjust_every
+
+        self.next_send = 0.0
+        self.last_send = None
+        self.next_adjust = None
+
+        self.sent = 0           # snapshots sent in full
+        self.ordinals = {}      # snapshot seq -> self.sent once it went out
+        self.report = None      # (sent up to the seq the client acked, received by then)
+        self.marks = None       # self.report at the last adjustment
+        self.loss = 0.0
+        self.rtt = None
+        self.min_rtt = None
+        self.send_errors = 0
+        self.errors_mark = 0
+
+    # ---------------- Signals ----------------
+    def due(self, now):
+        return now >= self.next_send
+
+    def on_sent(self, now, seq):
+        self.sent += 1
+        self.ordinals[seq] = self.sent
+        if len(self.ordinals) > 256:
+            del self.ordinals[min(self.ordinals)]
+        self.last_send = now
+        # Half a base tick of slack so a send never slips to the tick after
+        self.next_send = now + self.interval - self.base_interval / 2
+
+    def on_rtt(self, sample):
+        self.rtt = sample if self.rtt is None else 0.875 * self.rtt + 0.125 * sample
+        self.min_rtt = sample if self.min_rtt is None else min(self.min_rtt, sample)
+
+    def on_report(self, received, acked_seq):
+        """The client got `received` snapshots by the time it acked `acked_seq`."""
+        sent = self.ordinals.get(acked_seq)
+        if received is not None and sent is not None:
+            self.report = (sent, received)
+
+    def on_send_error(self):
+        self.send_errors += 1
+
+    # ---------------- Control ----------------
+    def adjust(self, now):
+        if self.next_adjust is None:
+            self.next_adjust = now + self.adjust_every
+            return
+        if now < self.next_adjust:
+            return
+        self.next_adjust = now + self.adjust_every
+
+        congested = self.send_errors > self.errors_mark
+        self.errors_mark = self.send_errors
+
+        # Loss over snapshots the client has had its chance to see, whatever
+        # its ack rate: everything sent up to the seq it acked
+        if self.report is not None:
+            if self.marks is not None:
+                sent_delta = self.report[0] - self.marks[0]
+                received_delta = self.report[1] - self.marks[1]
+                if sent_delta > 0:
+                    sample = min(1.0, max(0.0, 1.0 - received_delta / sent_delta))
+                    self.loss = 0.5 * self.loss + 0.5 * sample
+            self.marks = self.report
+        congested = congested or self.loss > LOSS_THRESHOLD
+
+        if self.rtt is not None and self.rtt > 2 * self.min_rtt + QUEUE_DELAY:
+            congested = True
+
+        if congested:
+            self.interval = min(self.max_interval, self.interval * 1.5)
+            self.budget = max(self.min_budget, int(self.budget * 0.7))
+        else:
+            self.interval = max(self.base_interval, self.interval - self.base_interval / 2)
+            self.budget = min(self.max_budget, self.budget + BUDGET_STEP)
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "budget": self.budget,
+            "loss": self.loss,
+            "rtt": self.rtt,
+            "send_errors": self.send_errors,
+        }
+
+
+class PriorityAccumulator:
+    """
+    Decides which changed entities fit in a client's byte budget. Every
+    candidate gains weight * elapsed each time it is considered; the highest
+    totals are sent and reset to zero, so entities left out keep climbing
+    until they make it in.
+    """
+
+    def __init__(self):
+        self.priority = {}
+
+    def clear(self):
+        """Everything was sent; nothing is owed."""
+        self.priority = {}
+
+    def select(self, candidates, budget, elapsed):
+        """
+        candidates: (key, weight, size). Returns the set of keys to send,
+        or None when everything fits.
+        """
+        if sum(size for _, _, size in candidates) <= budget:
+            self.clear()
+            return None
+
+        considered = {}
+        for key, weight, size in candidates:
+            considered[key] = self.priority.get(key, 0.0) + weight * elapsed
+        # Nothing pending for the rest: they start from zero next time
+        self.priority = considered
+
+        chosen = set()
+        used = 0
+        sizes = {key: size for key, _, size in candidates}
+        for key in sorted(considered, key=considered.get, reverse=True):
+            if used + sizes[key] > budget:
+                continue
+            chosen.add(key)
+            used += sizes[key]
+            considered[key] = 0.0
+        return chosen
+
+
+def entity_weight(dx, dy, speed, radius):
+    """Nearby and fast-moving entities matter most."""
+    distance = math.hypot(dx, dy)
+    nearness = 1.0 - min(distance, radius) / radius if radius > 0 else 1.0
+    return 1.0 + 2.0 * nearness + min(speed / SPEED_REF, 2.0)
@@ -0,0 +1,55 @@
+# server/rect.py
+# The bit of pygame.Rect the server uses, so it can run without pygame.
+# Same rules: coordinates are truncated to ints, and rects that only touch
+# edges (or have no area) do not collide.
+
+
+class Rect:
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x, y, width, height):
+        self.x = int(x)
+        self.y = int(y)
+        self.width = int(width)
+        self.height = int(height)
+
+    @property
+    def topleft(self):
+        return self.x, self.y
+
+    @topleft.setter
+    def topleft(self, pos):
+        self.x = int(pos[0])
+        self.y = int(pos[1])
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    def colliderect(self, other):
+        if isinstance(other, Rect):
+            ox, oy, ow, oh = other.x, other.y, other.width, other.height
+        else:
+            ox, oy, ow, oh = other
+        return (self.width > 0 and self.height > 0 and ow > 0 and oh > 0
+                and self.x < ox + ow and ox < self.x + self.width
+                and self.y < oy + oh and oy < self.y + self.height)
+
+    def collidepoint(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.width, self.height))
+
+    def __eq__(self, other):
+        try:
+            return tuple(self) == tuple(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f"<rect({self.x}, {self.y}, {self.width}, {self.height})>"
@@ -0,0 +1,56 @@
+# server/session.py
+import time
+
+from shared import session as frames
+
+
+class Session:
+    def __init__(self, session_id, key, pid, token, addr, expires_at):
+        self.id = session_id
+        self.key = key
+        self.pid = pid
+        self.token = token
+        self.addr = addr
+        self.expires_at = expires_at
+
+
+class SessionTable:
+    """
+    Sessions issued at join. A session is bound to the address it was issued
+    to and lives for `ttl` seconds; after that, or when the client's address
+    changes, the client has to present its token again.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.sessions = {}   # session id -> Session
+        self.by_pid = {}     # pid -> session id
+        self.listeners = []  # (event, session) -> None, for "issue" and "drop"
+
+    def issue(self, pid, token, addr):
+        """Start a new session for pid, replacing any previous one."""
+        self.drop(pid)
+        sid = frames.new_session_id()
+        while sid in self.sessions:
+            sid = frames.new_session_id()
+        sess = Session(sid, frames.new_session_key(), pid, token, addr, time.time() + self.ttl)
+        self.sessions[sid] = sess
+        self.by_pid[pid] = sid
+        for listener in self.listeners:
+            listener("issue", sess)
+        return sess
+
+    def get(self, session_id):
+        return self.sessions.get(session_id)
+
+    def is_valid(self, sess, addr, now=None):
+        now = time.time() if now is None else now
+        return now < sess.expires_at and tuple(addr) == tuple(sess.addr)
+
+    def drop(self, pid):
+        sid = self.by_pid.pop(pid, None)
+        if sid is not None:
+            sess = self.sessions.pop(sid, None)
+            if sess is not None:
+                for listener in self.listeners:
+                    listener("drop", sess)
@@ -0,0 +1,123 @@
+# server/snapshot.py
+from shared import schema
+from shared.delta import diff_entities
+
+
+class SnapshotHistory:
+    """
+    Snapshots sent to one client, kept until it acknowledges a newer one.
+    The latest acked snapshot is the baseline the next update is diffed against.
+    """
+
+    def __init__(self, size=64):
+        self.size = size
+        self.sent = {}      # seq -> {"players": {id: state}, "enemies": {id: state}}
+        self.sent_at = {}   # seq -> monotonic send time
+        self.acked = None   # seq of the newest snapshot the client confirmed
+
+    def ack(self, seq, now=None):
+        """
+        Record a client ack. A negative seq asks for a full snapshot.
+        Returns the round trip of the newly acked snapshot, if `now` is given.
+        """
+        if seq is None:
+            return None
+        if seq < 0:
+            self.acked = None
+            return None
+        if seq in self.sent and (self.acked is None or seq > self.acked):
+            self.acked = seq
+            sent_at = self.sent_at.get(seq)
+            for old in [s for s in self.sent if s < seq]:
+                del self.sent[old]
+                self.sent_at.pop(old, None)
+            if now is not None and sent_at is not None:
+                return max(0.0, now - sent_at)
+        return None
+
+    def baseline(self):
+        if self.acked is None:
+            return None, None
+        return self.acked, self.sent.get(self.acked)
+
+    def record(self, seq, snapshot, now=None):
+        self.sent[seq] = snapshot
+        if now is not None:
+            self.sent_at[seq] = now
+        if len(self.sent) > self.size:
+            oldest = min(self.sent)
+            del self.sent[oldest]
+            self.sent_at.pop(oldest, None)
+            if oldest == self.acked:
+                self.acked = None
+
+    def delta(self, seq, players, enemies, memo=None, select=None, now=None):
+        """
+        Record this tick's visible entities and return the update fields for the client.
+        memo is a per-tick dict shared by all clients (see diff_entities).
+
+        select(changed_players, changed_enemies) may return the ("player"/"enemy", id)
+        keys that fit in this update; the others are recorded with their baseline
+        state, so they show up as changed again next time.
+        """
+        base_seq, base = self.baseline()
+        if base is None:
+            base_seq, base = None, {"players": {}, "enemies": {}}
+
+        changed_players, removed_players = diff_entities(base["players"], players, memo)
+        changed_enemies, removed_enemies = diff_entities(base["enemies"], enemies, memo)
+
+        keep = select(changed_players, changed_enemies) if select is not None else None
+        if keep is not None:
+            changed_players = self._hold_back("player", changed_players, players, base["players"], keep)
+            changed_enemies = self._hold_back("enemy", changed_enemies, enemies, base["enemies"], keep)
+        self.record(seq, {"players": players, "enemies": enemies}, now)
+
+        return {
+            "seq": seq,
+            "base": base_seq,
+            "players": changed_players,
+            "enemies": changed_enemies,
+            "removed_players": removed_players,
+            "removed_enemies": removed_enemies,
+        }
+
+
+    @staticmethod
+    def _hold_back(kind, changed, current, base, keep):
+        """Drop unselected changes and roll `current` back to what the client has."""
+        sent = []
+        for entry in changed:
+            eid = entry["id"]
+            if (kind, eid) in keep:
+                sent.append(entry)
+            elif eid in base:
+                current[eid] = base[eid]
+            else:
+                del current[eid]
+        return sent
+
+
+class EncodeCache:
+    """
+    Per-tick cache of packed entity bytes, shared by every client's update.
+
+    All entity dicts sent in one tick carry values from that tick's states,
+    so (kind, id, field names) identifies the bytes. A new cache is used
+    for every tick.
+    """
+
+    def __init__(self):
+        self.packed = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, kind, entity, version):
+        key = (version, kind, entity.get("id"), tuple(entity))
+        data = self.packed.get(key)
+        if data is None:
+            data = self.packed[key] = schema.pack_entity(kind, entity, version)
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
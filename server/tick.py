@@ -0,0 +1,47 @@
+# server/tick.py
+import time
+
+
+class TickScheduler:
+    """
+    Fixed-step scheduler on the monotonic clock.
+
+    due() says how many steps to run now. Deadlines advance by exactly one
+    step each, so processing time does not stretch the period. A server
+    that falls behind catches up by at most max_catch_up steps per call;
+    time beyond that is dropped instead of snowballing.
+    """
+
+    def __init__(self, step, max_catch_up=5):
+        self.step = step
+        self.max_catch_up = max_catch_up
+        self.tick = 0          # steps run so far
+        self.overruns = 0      # calls that found more than one step due
+        self.dropped = 0       # steps skipped because catch-up was capped
+        self.next_time = None
+
+    def due(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self.next_time is None:
+            self.next_time = now
+        if now < self.next_time:
+            return 0
+
+        behind = int((now - self.next_time) // self.step) + 1
+        if behind > 1:
+            self.overruns += 1
+
+        steps = min(behind, self.max_catch_up)
+        self.dropped += behind - steps
+        self.next_time += behind * self.step
+        self.tick += steps
+        return steps
+
+    def time_until_next(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self.next_time is None:
+            return 0.0
+        return max(0.0, self.next_time - now)
+
+    def stats(self):
+        return {"tick": self.tick, "overruns": self.overruns, "dropped": self.dropped}
@@ -0,0 +1,125 @@
+# server/tmx.py
+# Minimal Tiled (.tmx) reader for the server.
+#
+# The server needs tile layers' GIDs and tile properties, never images, so
+# this reads the XML with the standard library instead of pytmx/pygame.
+# Only the layers asked for are decoded. GIDs are Tiled's own (firstgid +
+# tile id), with the flip/rotation bits removed.
+import base64
+import gzip
+import os
+import xml.etree.ElementTree as ET
+import zlib
+
+GID_MASK = 0x0FFFFFFF  # the top four bits are flip/rotation flags
+
+PROPERTY_TYPES = {
+    "int": int,
+    "float": float,
+    "bool": lambda v: v.lower() == "true",
+}
+
+
+class TmxMap:
+    def __init__(self, path, width, height, tilewidth, tileheight):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.tilewidth = tilewidth
+        self.tileheight = tileheight
+        self.layer_names = []      # every tile layer, in file order
+        self.layers = {}           # lowercased name -> rows of GIDs, for the layers loaded
+        self.tile_properties = {}  # gid -> {name: value}
+
+    def layer(self, name):
+        """Rows of GIDs for a layer (case-insensitive), or None if it wasn't loaded."""
+        return self.layers.get(name.lower())
+
+    def tiles(self, name):
+        """(tx, ty, gid) for every non-empty tile of a layer."""
+        for ty, row in enumerate(self.layers.get(name.lower(), ())):
+            for tx, gid in enumerate(row):
+                if gid:
+                    yield tx, ty, gid
+
+    def get_tile_properties(self, gid):
+        return self.tile_properties.get(gid, {})
+
+
+def parse_properties(node):
+    props = {}
+    block = node.find("properties")
+    if block is None:
+        return props
+    for prop in block.findall("property"):
+        value = prop.get("value")
+        if value is None:
+            value = prop.text or ""  # multi-line strings
+        convert = PROPERTY_TYPES.get(prop.get("type"))
+        props[prop.get("name")] = convert(value) if convert else value
+    return props
+
+
+def read_tileset(node, base_dir, tile_properties):
+    firstgid = int(node.get("firstgid", 1))
+    source = node.get("source")
+    if source:
+        # External .tsx: same <tile> elements, under its own root
+        node = ET.parse(os.path.join(base_dir, source)).getroot()
+    for tile in node.findall("tile"):
+        props = parse_properties(tile)
+        if props:
+            tile_properties[firstgid + int(tile.get("id"))] = props
+
+
+def decode_data(data, width, height):
+    encoding = data.get("encoding")
+    if encoding == "csv":
+        gids = [int(v) for v in data.text.replace("\n", "").split(",") if v.strip()]
+    elif encoding == "base64":
+        raw = base64.b64decode(data.text.strip())
+        compression = data.get("compression")
+        if compression == "zlib":
+            raw = zlib.decompress(raw)
+        elif compression == "gzip":
+            raw = gzip.decompress(raw)
+        elif compression:
+            raise ValueError(f"Unsupported TMX compression: {compression}")
+        gids = [int.from_bytes(raw[i:i + 4], "little") for i in range(0, len(raw), 4)]
+    elif encoding is None:
+        gids = [int(tile.get("gid", 0)) for tile in data.findall("tile")]
+    else:
+        raise ValueError(f"Unsupported TMX encoding: {encoding}")
+
+    if len(gids) != width * height:
+        raise ValueError(f"Layer has {len(gids)} tiles, expected {width * height}")
+    gids = [gid & GID_MASK for gid in gids]
+    return [gids[row * width:(row + 1) * width] for row in range(height)]
+
+
+def load_tmx(path, layers=None):
+    """
+    Read a map's size, tile properties and tile layers.
+    layers: names (case-insensitive) to decode; None decodes all of them.
+    """
+    root = ET.parse(path).getroot()
+    if root.get("infinite") == "1":
+        raise ValueError(f"Infinite maps are not supported: {path}")
+
+    tmx = TmxMap(path, int(root.get("width")), int(root.get("height")),
+                 int(root.get("tilewidth")), int(root.get("tileheight")))
+    wanted = {name.lower() for name in layers} if layers is not None else None
+    base_dir = os.path.dirname(path)
+
+    for tileset in root.findall("tileset"):
+        read_tileset(tileset, base_dir, tmx.tile_properties)
+
+    # iter() also finds layers nested in <group>s
+    for layer in root.iter("layer"):
+        name = layer.get("name", "")
+        tmx.layer_names.append(name)
+        if wanted is not None and name.lower() not in wanted:
+            continue
+        tmx.layers[name.lower()] = decode_data(layer.find("data"), int(layer.get("width")),
+                                               int(layer.get("height")))
+    return tmx
@@ -1,66 +1,30 @@
 import time
-import msgpack
 import config
 from server import auth_db
 
 
 class Utility:
-    def __init__(self, lock, sock, player_manager, enemy_manager):
+    def __init__(self, lock, sock, player_manager, enemy_manager, interest=None, inputs=None):
         self.lock = lock
         self.sock = sock
         self.player_manager = player_manager
         self.enemy_manager = enemy_manager
+        self.interest = interest
+        self.inputs = inputs
         self.running = True
 
+    # ---------------- Background Loops ----------------
     def cleanup_inactive(self):
         """Remove players that have timed out and notify others."""
         while self.running:
             time.sleep(config.PRR)
-            now = time.time()
-            with self.lock:
-                inactive = [pid for pid, t in self.player_manager.last_seen.items()
-                            if now - t > config.TIMEOUT]
-                for pid in inactive:
-                    print(f"[TIMEOUT] Removing player {pid}")
-                    try:
-                        msg = {"type": "player_disconnect", "player_id": pid}
-                        packed = msgpack.packb(msg, use_bin_type=True)
-                        for p in self.player_manager.clients.values():
-                            self.sock.sendto(packed, (p.addr[0], p.addr[1]))
-                    except Exception as e:
-                        print(f"[ERROR] Failed to broadcast disconnect: {e}")
-                    self.player_manager.cleanup_player(pid)
+            self.cleanup_once()
 
     def autosave_loop(self):
         """Periodically save player data to the DB."""
         while self.running:
             time.sleep(config.SAVE_INTERVAL)
-            with self.lock:
-                for pid, player in self.player_manager.clients.items():
-                    if not getattr(player, "needs_save", False):
-                        continue
-
-                    username = self.player_manager.get_username_from_pid(pid)
-                    x = getattr(player, "x", None)
-                    y = getattr(player, "y", None)
-                    direction = getattr(player, "direction", None)
-                    current_map = getattr(player, "current_map", None)
-                    z_index = getattr(player, "z_index", 0) 
-
-                    if None in (x, y, direction, current_map):
-                        print(f"[AUTOSAVE] Skipping player {pid} (incomplete data)")
-                        continue
-
-                    auth_db.save_player_state(pid, username, x, y, direction, current_map, z_index)
-                    player.needs_save = False
-
-                    try:
-                        msg = {"type": "save_confirm", "message": "Your game has been saved."}
-                        self.sock.sendto(msgpack.packb(msg, use_bin_type=True),
-                                         (player.addr[0], player.addr[1]))
-                        print(f"[AUTOSAVE] Saved player {pid}")
-                    except Exception as e:
-                        print(f"[ERROR] Failed to notify player {pid}: {e}")
+            self.write_autosave(self.collect_autosave())
 
     def refresh_active_tokens_loop(self):
         """Keep token cache fresh."""
@@ -68,3 +32,72 @@ class Utility:
             time.sleep(config.DB_REFRESH_INTERVAL)
             with self.lock:
                 self.player_manager.refresh_active_tokens()
+
+    # ---------------- Single Passes ----------------
+    def cleanup_once(self):
+        now = time.time()
+        with self.lock:
+            inactive = [pid for pid, t in self.player_manager.last_seen.items()
+                        if now - t > config.TIMEOUT]
+            for pid in inactive:
+                if config.RESUME_GRACE > 0:
+                    # Kept for a while: a client back from a short drop resumes without a DB login
+                    print(f"[TIMEOUT] Parking player {pid} for {config.RESUME_GRACE:g}s")
+                    self.player_manager.park(pid, now)
+                else:
+                    print(f"[TIMEOUT] Removing player {pid}")
+                    self.player_manager.cleanup_player(pid)
+                self.remove_from_world(pid)
+
+            for pid in self.player_manager.expired_parked(config.RESUME_GRACE, now):
+                print(f"[TIMEOUT] Removing parked player {pid}")
+                self.player_manager.cleanup_player(pid)
+
+    def remove_from_world(self, pid):
+        """Tell everyone a player has gone and take it out of interest and input queues. Needs the lock."""
+        try:
+            msg = {"type": "player_disconnect", "player_id": pid}
+            for p in self.player_manager.clients.values():
+                p.send_reliable(self.sock, msg)
+        except Exception as e:
+            print(f"[ERROR] Failed to broadcast disconnect: {e}")
+        if self.interest is not None:
+            self.interest.remove(("player", pid))
+        if self.inputs is not None:
+            self.inputs.remove(pid)
+
+    def collect_autosave(self):
+        """Snapshot the players that need saving; the DB writes happen in write_autosave."""
+        rows = []
+        with self.lock:
+            for pid, player in self.player_manager.clients.items():
+                if not getattr(player, "needs_save", False):
+                    continue
+
+                username = getattr(player, "username", None) or self.player_manager.get_username_from_pid(pid)
+                x = getattr(player, "x", None)
+                y = getattr(player, "y", None)
+                direction = getattr(player, "direction", None)
+                current_map = getattr(player, "current_map", None)
+                z_index = getattr(player, "z_index", 0)
+
+                if None in (x, y, direction, current_map):
+                    print(f"[AUTOSAVE] Skipping player {pid} (incomplete data)")
+                    continue
+
+                rows.append((pid, username, x, y, direction, current_map, z_index, player))
+                player.needs_save = False
+        return rows
+
+    def write_autosave(self, rows):
+        """Write collected rows to the DB without holding the lock, then notify each player."""
+        for pid, username, x, y, direction, current_map, z_index, player in rows:
+            auth_db.save_player_state(pid, username, x, y, direction, current_map, z_index)
+
+            try:
+                msg = {"type": "save_confirm", "message": "Your game has been saved."}
+                with self.lock:
+                    player.send_reliable(self.sock, msg)
+                print(f"[AUTOSAVE] Saved player {pid}")
+            except Exception as e:
+                print(f"[ERROR] Failed to notify player {pid}: {e}")
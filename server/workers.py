@@ -0,0 +1,262 @@
+# server/workers.py
+# Multi-process receive for the game port (Linux). Worker processes bind
+# config.PORT with SO_REUSEPORT next to the simulation process, and the
+# kernel spreads clients over the sockets by address hash, so one client
+# always lands on the same worker. A worker runs the ingress checks,
+# verifies session MACs, decodes and coalesces moves, then forwards each
+# batch to the simulation process over a pipe as one msgpack list:
+#
+#     [[kind, pid, host, port, msg], ...]
+#
+# INPUT is a verified session message from pid, TOKEN a message carrying a
+# login token (join etc.), which the simulation checks against the DB as
+# before, and STATS a worker's drop counters.
+#
+# The simulation process keeps its own socket in the group: it sends
+# everything and handles its share of the incoming traffic itself.
+# Sessions are mirrored to the workers as they are issued and dropped.
+import atexit
+import multiprocessing
+import os
+import select
+import signal
+import socket
+import threading
+import time
+from multiprocessing.connection import wait
+
+import msgpack
+
+import config
+from server.inbox import coalesce
+from server.ingress import IngressFilter
+from shared import schema
+from shared import session as frames
+
+INPUT, TOKEN, STATS = 0, 1, 2
+MAX_BATCH = 256        # datagrams read before a batch is forwarded
+STATS_INTERVAL = 1.0
+
+
+def supported():
+    return hasattr(socket, "SO_REUSEPORT")
+
+
+def reuseport_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+# ---------------- Worker Process ----------------
+class Worker:
+    """One receive process: its socket, a mirror of the session table and the batch being built."""
+
+    def __init__(self, sock, output, control, max_batch=MAX_BATCH):
+        self.sock = sock
+        self.output = output
+        self.control = control
+        self.max_batch = max_batch
+        self.ingress = IngressFilter(config.MAX_PACKET_SIZE, config.PACKET_RATE, config.PACKET_BURST)
+        self.sessions = {}   # session id -> (key, pid, addr, expires_at)
+        self.expired = schema.pack({"type": "session_expired"})
+        self.batch = []
+        self.last_move = {}  # pid -> index of its move at the end of the batch
+        self.received = 0   # datagrams read
+        self.forwarded = 0  # entries sent on, after coalescing
+        self.parent = os.getppid()
+
+    def run(self):
+        self.sock.setblocking(False)
+        next_stats = time.monotonic() + STATS_INTERVAL
+        while os.getppid() == self.parent:  # other workers hold our pipes too: no EOF if it is killed
+            readable, _, _ = select.select([self.sock, self.control], [], [], STATS_INTERVAL)
+            if self.control in readable and not self.apply_control():
+                return
+            if self.sock in readable:
+                self.receive()
+            now = time.monotonic()
+            if now >= next_stats:
+                next_stats = now + STATS_INTERVAL
+                self.batch.append([STATS, None, None, None, self.stats()])
+            self.forward()
+
+    def apply_control(self):
+        """Session updates from the simulation process; False once it has gone away."""
+        try:
+            while self.control.poll():
+                event = self.control.recv()
+                if event[0] == "issue":
+                    _, sid, key, pid, addr, expires_at = event
+                    self.sessions[sid] = (key, pid, tuple(addr), expires_at)
+                elif event[0] == "drop":
+                    self.sessions.pop(event[1], None)
+                else:
+                    return False
+        except (EOFError, OSError):
+            return False
+        return True
+
+    def receive(self):
+        """Read until the socket is empty or the batch is full."""
+        now = time.monotonic()
+        while len(self.batch) < self.max_batch:
+            try:
+                data, addr = self.sock.recvfrom(config.BUFFER_SIZE)
+            except BlockingIOError:
+                return
+            except OSError:
+                continue  # ICMP error from a client that left
+            self.received += 1
+            payload = self.ingress.accept(data, addr, now)
+            if payload is None:
+                continue
+            if frames.is_frame(payload):
+                self.receive_frame(payload, addr)
+                continue
+            msg = self.ingress.unpack(payload)
+            if msg is not None:
+                self.batch.append([TOKEN, None, addr[0], addr[1], msg])
+                self.forwarded += 1
+
+    def receive_frame(self, data, addr):
+        """Same checks as MessageHandler.handle_session_frame, against the mirrored table."""
+        sid, mac, payload = frames.parse(data)
+        sess = self.sessions.get(sid)
+        if sess is None:
+            self.ingress.dropped["session"] += 1  # unproven: no answer, or we'd be a reflector
+            return
+        key, pid, sess_addr, expires_at = sess
+        if not frames.verify(sid, key, mac, payload):
+            return
+        if time.time() >= expires_at or tuple(addr) != sess_addr:
+            self.sock.sendto(self.expired, addr)
+            return
+
+        msg = self.ingress.unpack(payload)
+        if msg is None or msg.get("type") == "join":
+            return
+        if msg.get("type") == "move" and "rel" not in msg:
+            index = self.last_move.get(pid)
+            if index is not None:
+                self.batch[index][4] = coalesce(self.batch[index][4], msg)
+                return
+            self.last_move[pid] = len(self.batch)
+        else:
+            # Anything else from pid keeps its place; later moves start a new entry
+            self.last_move.pop(pid, None)
+        self.batch.append([INPUT, pid, addr[0], addr[1], msg])
+        self.forwarded += 1
+
+    def forward(self):
+        if not self.batch:
+            return
+        self.output.send_bytes(msgpack.packb(self.batch, use_bin_type=True))
+        self.batch.clear()
+        self.last_move.clear()
+
+    def stats(self):
+        return dict(self.ingress.stats(), received=self.received, forwarded=self.forwarded,
+                    sessions=len(self.sessions))
+
+
+def run_worker(host, port, output, control):
+    # Default SIGTERM even if the parent installed a handler (SDL does, when
+    # pygame is imported); Ctrl-C is the parent's to handle
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    Worker(reuseport_socket(host, port), output, control).run()
+
+
+# ---------------- Simulation Side ----------------
+class WorkerPool:
+    """
+    Starts the receive workers and feeds their batches to the handler.
+    Start it before any thread, and before the simulation process binds its
+    own socket (with reuseport_socket).
+    """
+
+    def __init__(self, count, host, port):
+        self.count = count
+        self.host = host
+        self.port = port
+        self.processes = []
+        self.inputs = []    # pipe ends batches arrive on
+        self.index = {}     # pipe end -> worker index
+        self.controls = []  # pipe ends session updates go out on
+        self.control_lock = threading.Lock()
+        self.worker_stats = {}  # worker index -> its last STATS entry
+        self.stopping = False
+
+    def start(self, sessions):
+        # fork: the workers need none of the simulation's state, only the config
+        ctx = multiprocessing.get_context("fork")
+        for i in range(self.count):
+            batches_in, batches_out = ctx.Pipe(duplex=False)
+            control_in, control_out = ctx.Pipe(duplex=False)
+            proc = ctx.Process(target=run_worker, args=(self.host, self.port, batches_out, control_in),
+                               name=f"ingress-{i}", daemon=True)
+            proc.start()
+            batches_out.close()
+            control_in.close()
+            self.processes.append(proc)
+            self.inputs.append(batches_in)
+            self.index[batches_in] = i
+            self.controls.append(control_out)
+
+        atexit.register(self.stop)  # runs before multiprocessing's own cleanup
+        sessions.listeners.append(self.on_session)
+        for sess in list(sessions.sessions.values()):
+            self.on_session("issue", sess)
+        print(f"[SERVER] {self.count} ingress workers on port {self.port}")
+
+    def on_session(self, event, sess):
+        if event == "issue":
+            update = ("issue", sess.id, sess.key, sess.pid, tuple(sess.addr), sess.expires_at)
+        else:
+            update = ("drop", sess.id)
+        with self.control_lock:
+            for conn in self.controls:
+                conn.send(update)
+
+    def receive(self, conn, on_input, on_token):
+        """
+        Hand one forwarded batch to on_input(pid, msg, addr) / on_token(msg, addr).
+        Returns False once the worker behind conn has exited.
+        """
+        try:
+            batch = msgpack.unpackb(conn.recv_bytes(), raw=False)
+        except (EOFError, OSError):
+            self.inputs.remove(conn)
+            if not self.stopping:
+                print(f"[ERROR] Ingress worker {self.index[conn]} exited; the kernel moves its clients to the other sockets")
+            return False
+        for kind, pid, host, port, msg in batch:
+            if kind == INPUT:
+                on_input(pid, msg, (host, port))
+            elif kind == TOKEN:
+                on_token(msg, (host, port))
+            else:
+                self.worker_stats[self.index[conn]] = msg
+        return True
+
+    def run(self, on_input, on_token):
+        """Threaded core: receive batches from every worker as they come."""
+        while self.inputs:
+            for conn in wait(self.inputs, timeout=1.0):
+                self.receive(conn, on_input, on_token)
+
+    def stop(self):
+        self.stopping = True
+        with self.control_lock:
+            for conn in self.controls:
+                try:
+                    conn.send(("stop",))
+                except OSError:
+                    pass
+        for proc in self.processes:
+            proc.join(timeout=1.0)
+
+    def stats(self):
+        return dict(self.worker_stats)
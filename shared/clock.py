@@ -0,0 +1,63 @@
+# shared/clock.py
+# NTP-style estimate of the server clock, kept by the client.
+#
+# Each ping/pong (and the join/assign_id exchange) gives four timestamps:
+# t0 client send, t1 server receive, t2 server send, t3 client receive.
+#     rtt    = (t3 - t0) - (t2 - t1)
+#     offset = ((t1 - t0) + (t2 - t3)) / 2
+# The offset from the lowest-RTT sample in a small window is used, since
+# queueing delay is what makes a sample wrong. Client times are monotonic;
+# server times are the server's wall clock (UTC).
+import time
+from collections import deque
+
+
+class ClockSync:
+    def __init__(self, window=8):
+        self.samples = deque(maxlen=window)  # (rtt, offset)
+        self.offset = None   # server time - client monotonic time
+        self.rtt = None      # median round trip over the window
+        self.jitter = 0.0    # median |rtt - median rtt|
+
+        # Latest (tick, server time) pair, to timestamp snapshots by tick
+        self.anchor_tick = None
+        self.anchor_time = None
+        self.step = None
+
+    def add_sample(self, t0, t1, t2, t3=None):
+        t3 = time.monotonic() if t3 is None else t3
+        rtt = max(0.0, (t3 - t0) - (t2 - t1))
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        self.samples.append((rtt, offset))
+        self.offset = min(self.samples)[1]
+
+        # Median and median deviation: a reply that was retransmitted or stuck
+        # in a queue must not drag the estimates around
+        rtts = sorted(r for r, _ in self.samples)
+        self.rtt = rtts[len(rtts) // 2]
+        self.jitter = sorted(abs(r - self.rtt) for r in rtts)[len(rtts) // 2]
+
+    def synced(self):
+        return self.offset is not None
+
+    def now(self, local=None):
+        """Current server time; falls back to the local wall clock until the first sample."""
+        if self.offset is None:
+            return time.time()
+        local = time.monotonic() if local is None else local
+        return local + self.offset
+
+    def set_anchor(self, tick, server_time, step):
+        self.anchor_tick = tick
+        self.anchor_time = server_time
+        self.step = step
+
+    def tick_time(self, tick):
+        """Server time at which simulation tick `tick` ran, or None if unknown."""
+        if tick is None or self.anchor_tick is None:
+            return None
+        return self.anchor_time + (tick - self.anchor_tick) * self.step
+
+    def interpolation_delay(self, send_interval):
+        """How far behind the newest snapshot to render: two snapshot intervals plus jitter."""
+        return 2 * send_interval + 2 * self.jitter
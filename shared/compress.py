@@ -0,0 +1,156 @@
+# shared/compress.py
+# Optional deflate compression of server -> client datagrams with a preset
+# dictionary. Snapshots repeat the same msgpack skeletons, map ids and
+# entity layouts every tick, so priming deflate with recorded traffic
+# lets even a 200-byte packet compress.
+#
+# A compressed datagram is
+#     0xC4 | dictionary id (1 B) | raw deflate stream
+# 0xC4 would be a top-level msgpack bin, which no message ever is.
+# The client offers the dictionary ids it has in join ("compress"), the
+# server picks one in assign_id; 0 means no compression.
+#
+# Dictionaries live in shared/dictionaries/ and are never edited once
+# shipped: a new one gets a new id (see benchmarks/bench_compress.py).
+import heapq
+import os
+import zlib
+from collections import Counter
+
+MARKER = 0xC4
+DICTIONARY_DIR = os.path.join(os.path.dirname(__file__), "dictionaries")
+DICTIONARIES = {1: "snapshots_1.zdict"}  # id -> file, append only
+
+WBITS = -13         # raw deflate, 8 KiB window (covers the whole dictionary)
+MEM_LEVEL = 4       # smaller hash tables: cheaper to copy per packet
+DICTIONARY_SIZE = 8192
+
+_loaded = {}
+
+
+def load_dictionary(dict_id):
+    if dict_id not in _loaded:
+        with open(os.path.join(DICTIONARY_DIR, DICTIONARIES[dict_id]), "rb") as f:
+            _loaded[dict_id] = f.read()
+    return _loaded[dict_id]
+
+
+def available():
+    """Dictionary ids shipped with this build."""
+    return [i for i, name in DICTIONARIES.items() if os.path.exists(os.path.join(DICTIONARY_DIR, name))]
+
+
+def negotiate(offered):
+    """Pick the dictionary to use with a peer that offered `offered` (0: none)."""
+    if not isinstance(offered, list):
+        return 0
+    common = set(offered) & set(available())
+    return max(common) if common else 0
+
+
+def is_compressed(data):
+    return len(data) > 1 and data[0] == MARKER
+
+
+class Compressor:
+    """
+    Compresses datagrams with one dictionary. The primed deflate state is
+    built once and copied per packet, which is far cheaper than setting
+    the dictionary each time.
+    """
+
+    def __init__(self, dict_id, threshold=128, level=6):
+        self.dict_id = dict_id
+        self.threshold = threshold
+        self.base = zlib.compressobj(level, zlib.DEFLATED, WBITS, MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY,
+                                     load_dictionary(dict_id))
+        self.header = bytes((MARKER, dict_id))
+        self.packets = 0
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def __call__(self, data):
+        """data, deflated if it is big enough and that makes it smaller."""
+        self.packets += 1
+        self.bytes_in += len(data)
+        if len(data) >= self.threshold:
+            c = self.base.copy()
+            out = self.header + c.compress(data) + c.flush()
+            if len(out) < len(data):
+                self.compressed += 1
+                self.bytes_out += len(out)
+                return out
+        self.bytes_out += len(data)
+        return data
+
+    def stats(self):
+        return {
+            "packets": self.packets,
+            "compressed": self.compressed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+
+_decompressors = {}
+
+
+def decompress(data):
+    """Inverse of Compressor; returns None for a corrupt packet or unknown dictionary."""
+    dict_id = data[1]
+    base = _decompressors.get(dict_id)
+    if base is None:
+        if dict_id not in DICTIONARIES:
+            return None
+        try:
+            base = _decompressors[dict_id] = zlib.decompressobj(WBITS, load_dictionary(dict_id))
+        except OSError:
+            return None
+    d = base.copy()
+    try:
+        out = d.decompress(data[2:])
+    except zlib.error:
+        return None
+    return out if d.eof else None
+
+
+# ---------------- Dictionary Building ----------------
+def build_dictionary(samples, size=DICTIONARY_SIZE, gram=4, segment=16):
+    """
+    Preset dictionary from recorded datagrams. Greedy cover: repeatedly take
+    the segment whose not-yet-covered byte n-grams turn up in the most
+    packets. Most useful last, since deflate reaches the end of the
+    dictionary with the shortest distances.
+    """
+    frequency = Counter()
+    for data in samples:
+        frequency.update({data[i:i + gram] for i in range(len(data) - gram + 1)})
+
+    def score(piece):
+        return sum(frequency[piece[i:i + gram]] for i in range(len(piece) - gram + 1))
+
+    pieces = set()
+    for data in samples:
+        for start in range(0, max(1, len(data) - segment + 1), segment // 2):
+            piece = data[start:start + segment]
+            if len(piece) >= gram:
+                pieces.add(piece)
+    heap = [(-score(piece), piece) for piece in pieces]
+    heapq.heapify(heap)
+
+    chosen = []
+    used = 0
+    while heap and used < size:
+        _, piece = heapq.heappop(heap)
+        current = score(piece)
+        if heap and current < -heap[0][0]:
+            heapq.heappush(heap, (-current, piece))  # stale score, look again later
+            continue
+        if current == 0:
+            break
+        chosen.append(piece)
+        used += len(piece)
+        for i in range(len(piece) - gram + 1):
+            frequency[piece[i:i + gram]] = 0
+    return b"".join(reversed(chosen))[-size:]
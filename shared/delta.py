@@ -0,0 +1,58 @@
+# shared/delta.py
+# Entity-level delta encoding used by "update" snapshots on both ends.
+
+
+def diff_entities(base, current, memo=None):
+    """
+    Compare two {id: state dict} mappings.
+
+    Returns (changed, removed): changed holds one dict per new or modified
+    entity with its "id" plus only the fields that differ from base (all
+    fields for entities base lacks); removed lists ids that disappeared.
+
+    memo, if given, caches per-entity deltas by baseline state object, so
+    clients diffing against the same snapshot share the work and the result.
+    It is only valid while `current` holds the same states (one tick).
+    """
+    changed = []
+    for eid, state in current.items():
+        old = base.get(eid)
+        if old is None:
+            changed.append(state)
+            continue
+        if old is state:
+            continue
+
+        if memo is not None:
+            key = id(old)
+            if key in memo:
+                delta = memo[key]
+            else:
+                delta = memo[key] = _diff_state(eid, old, state)
+        else:
+            delta = _diff_state(eid, old, state)
+        if delta:
+            changed.append(delta)
+
+    removed = [eid for eid in base if eid not in current]
+    return changed, removed
+
+
+def _diff_state(eid, old, state):
+    delta = {k: v for k, v in state.items() if k not in old or old[k] != v}
+    if delta:
+        delta["id"] = eid
+    return delta
+
+
+def apply_delta(base, changed, removed):
+    """Rebuild a full {id: state dict} mapping from a baseline and a delta."""
+    state = dict(base)
+    for delta in changed:
+        eid = delta["id"]
+        full = dict(state.get(eid, ()))
+        full.update(delta)
+        state[eid] = full
+    for eid in removed:
+        state.pop(eid, None)
+    return state
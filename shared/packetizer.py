@@ -0,0 +1,137 @@
+# shared/packetizer.py
+# Splits large "update" snapshots into MTU-sized datagrams and puts them
+# back together on the client.
+#
+# Updates are split at entity boundaries, so every datagram is a complete
+# update on its own carrying the snapshot "seq" plus a "frag" header
+# [index, count]. A lost fragment only costs the entities it carried.
+import time
+
+from shared import schema
+
+# Array headers grow from 1 to 3 (or 5) bytes once a list gets long
+_HEADER_SLACK = 8
+
+
+def split_update(msg, version, max_size, pack_entity=schema.pack_entity):
+    """
+    Return the datagrams (bytes) for one update, each at most max_size where possible.
+    pack_entity(kind, entity, version) supplies the entity bytes (see schema.pack_update).
+    """
+    data = schema.pack_update(msg, version, pack_entity)
+    if len(data) <= max_size:
+        return [data]
+
+    header = {k: v for k, v in msg.items() if k not in ("players", "enemies", "removed_players", "removed_enemies")}
+    empty = dict(header, players=[], enemies=[], frag=[255, 255])
+
+    # Removals ride in the first fragment, so its header is measured with them (field names and all)
+    first = {
+        "removed_players": msg.get("removed_players", []),
+        "removed_enemies": msg.get("removed_enemies", []),
+    }
+    budget = max_size - len(schema.pack(empty, version)) - _HEADER_SLACK
+    first_budget = max_size - len(schema.pack(dict(empty, **first), version)) - _HEADER_SLACK
+
+    parts = []
+    current = {"players": [], "enemies": []}
+    used = 0
+    limit = first_budget
+    for kind in ("players", "enemies"):
+        for entity in msg.get(kind, []):
+            size = len(pack_entity(kind, entity, version))
+            if used + size > limit and (current["players"] or current["enemies"]):
+                parts.append(current)
+                current = {"players": [], "enemies": []}
+                used = 0
+                limit = budget
+            current[kind].append(entity)
+            used += size
+    parts.append(current)
+    parts[0].update(first)
+
+    count = len(parts)
+    return [
+        schema.pack_update(dict(header, frag=[index, count], **part), version, pack_entity)
+        for index, part in enumerate(parts)
+    ]
+
+
+def chunk_entities(players, enemies, version, max_size, pack_entity=schema.pack_entity):
+    """
+    Split entity lists into {"players": [...], "enemies": [...]} chunks whose
+    entities pack to at most max_size bytes, for messages that are not
+    fragmented (spawn batches on the reliable channel).
+    """
+    chunks = []
+    current = {"players": [], "enemies": []}
+    used = 0
+    for kind, entities in (("players", players), ("enemies", enemies)):
+        for entity in entities:
+            size = len(pack_entity(kind, entity, version))
+            if used + size > max_size and (current["players"] or current["enemies"]):
+                chunks.append(current)
+                current = {"players": [], "enemies": []}
+                used = 0
+            current[kind].append(entity)
+            used += size
+    if current["players"] or current["enemies"]:
+        chunks.append(current)
+    return chunks
+
+
+class Reassembler:
+    """
+    Collects fragments of one snapshot. A snapshot is released as soon as
+    every fragment arrived, or as a partial update once it times out or a
+    newer snapshot completes.
+    """
+
+    def __init__(self, timeout=0.25):
+        self.timeout = timeout
+        self.pending = {}  # seq -> {"parts": {index: msg}, "count": n, "first_seen": t}
+        self.released = None  # newest seq released; its late or duplicate fragments are dropped
+
+    def add(self, msg, now=None):
+        """Feed one received update; returns a list of ready (possibly partial) updates."""
+        frag = msg.get("frag")
+        if frag is None:
+            return [msg]
+
+        now = time.monotonic() if now is None else now
+        seq = msg.get("seq")
+        if self.released is not None and seq <= self.released:
+            return self.expire(now)
+        index, count = frag
+        entry = self.pending.setdefault(seq, {"parts": {}, "count": count, "first_seen": now})
+        entry["parts"][index] = msg
+
+        ready = []
+        if len(entry["parts"]) >= entry["count"]:
+            del self.pending[seq]
+            # Anything older than a complete snapshot is not worth waiting for
+            for old in sorted(s for s in self.pending if s < seq):
+                ready.append(self._merge(self.pending.pop(old), complete=False))
+            ready.append(self._merge(entry, complete=True))
+            self.released = seq
+
+        ready.extend(self.expire(now))
+        return ready
+
+    def expire(self, now=None):
+        now = time.monotonic() if now is None else now
+        ready = []
+        for seq in sorted(self.pending):
+            if now - self.pending[seq]["first_seen"] > self.timeout:
+                ready.append(self._merge(self.pending.pop(seq), complete=False))
+                self.released = seq if self.released is None else max(self.released, seq)
+        return ready
+
+    def _merge(self, entry, complete):
+        parts = [entry["parts"][i] for i in sorted(entry["parts"])]
+        merged = {k: v for k, v in parts[0].items() if k != "frag"}
+        for kind in ("players", "enemies", "removed_players", "removed_enemies"):
+            merged[kind] = [item for part in parts for item in part.get(kind, [])]
+        if not complete:
+            merged["partial"] = True
+        return merged
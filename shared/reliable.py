@@ -0,0 +1,111 @@
+# shared/reliable.py
+# Reliable, ordered delivery for the few control messages that must not be
+# lost (assign_id, map_switch, save_confirm, player_disconnect, session,
+# portal_enter), on the same UDP socket as the unreliable snapshots.
+#
+# Each reliable message carries "rel", its sequence number in one
+# direction. Receivers acknowledge with "rack" (highest in-order seq
+# received) and "rsack" (bit i set: seq rack + 2 + i was received too),
+# piggybacked on whatever they send next. Unacknowledged messages are
+# retransmitted after an RTT-based timeout with exponential backoff.
+import time
+
+INITIAL_RTO = 0.5
+MIN_RTO = 0.05
+MAX_RTO = 3.0
+WINDOW = 32  # receive buffer beyond the next expected seq (bits in rsack)
+
+
+class ReliableChannel:
+    def __init__(self, conn=None, first_expected=0, first_seq=0):
+        self.conn = conn            # id of the peer's connection this channel belongs to
+
+        # Send side
+        self.next_seq = first_seq
+        self.pending = {}           # seq -> [msg, first_sent, last_sent, retries]
+        self.srtt = None
+        self.rttvar = 0.0
+        self.rto = INITIAL_RTO
+        self.retransmits = 0
+
+        # Receive side
+        self.expected = first_expected
+        self.buffer = {}            # out-of-order seq -> msg
+
+    # ---------------- Sending ----------------
+    def wrap(self, msg, now=None):
+        """Number msg and keep it until acked; returns the dict to send."""
+        now = time.monotonic() if now is None else now
+        msg = dict(msg, rel=self.next_seq)
+        self.pending[self.next_seq] = [msg, now, now, 0]
+        self.next_seq += 1
+        return msg
+
+    def first_unacked(self):
+        return min(self.pending) if self.pending else self.next_seq
+
+    def on_ack(self, rack, rsack=0, now=None):
+        if rack is None:
+            return
+        now = time.monotonic() if now is None else now
+        rsack = rsack or 0
+
+        sample = None
+        for seq in [s for s in self.pending if s <= rack or (s > rack + 1 and rsack >> (s - rack - 2) & 1)]:
+            _, first_sent, _, retries = self.pending.pop(seq)
+            # Karn: retransmitted messages give ambiguous samples
+            if retries == 0:
+                rtt = now - first_sent
+                sample = rtt if sample is None else min(sample, rtt)
+        if sample is not None:
+            self._update_rto(sample)
+
+    def _update_rto(self, sample):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+        self.rto = min(MAX_RTO, max(MIN_RTO, self.srtt + 4 * self.rttvar))
+
+    def due(self, now=None):
+        """Messages whose retransmit timer expired; call regularly and send them again."""
+        now = time.monotonic() if now is None else now
+        resend = []
+        for seq in sorted(self.pending):
+            entry = self.pending[seq]
+            if now - entry[2] >= min(MAX_RTO, self.rto * (2 ** entry[3])):
+                entry[2] = now
+                entry[3] += 1
+                self.retransmits += 1
+                resend.append(entry[0])
+        return resend
+
+    # ---------------- Receiving ----------------
+    def receive(self, msg):
+        """Feed one received reliable message; returns the messages now deliverable in order."""
+        seq = msg["rel"]
+        if seq < self.expected or seq in self.buffer or seq > self.expected + WINDOW:
+            return []  # duplicate, or too far ahead (the sender will retry)
+
+        self.buffer[seq] = msg
+        ready = []
+        while self.expected in self.buffer:
+            ready.append(self.buffer.pop(self.expected))
+            self.expected += 1
+        return ready
+
+    def ack_fields(self):
+        mask = 0
+        for seq in self.buffer:
+            mask |= 1 << (seq - self.expected - 1)
+        return {"rack": self.expected - 1, "rsack": mask}
+
+    def stats(self):
+        return {
+            "pending": len(self.pending),
+            "retransmits": self.retransmits,
+            "srtt": self.srtt,
+            "rto": self.rto,
+        }
@@ -0,0 +1,367 @@
+# shared/schema.py
+# Compact wire schema shared by server/ and client/network/.
+#
+# A schema message is a msgpack array instead of a dict:
+#     [type_id, mask, value, value, ...]
+# mask has bit i set when field i of that message type is present, and the
+# values follow in field order. Entities inside updates use the same
+# [mask, values...] layout, so delta snapshots only pay for the fields they
+# carry. Positions are fixed-point ints, map names and directions are
+# interned to small ints, and the six action booleans share one bitfield.
+#
+# Both sides negotiate the version at join ("schema" in join/assign_id).
+# Version 0 means plain msgpack dicts; unpack() accepts either form.
+import msgpack
+
+SCHEMA_VERSION = 1
+
+POSITION_SCALE = 8  # 1/8 pixel precision
+
+# Interned tables: append only, never reorder (ids are on the wire)
+MAP_NAMES = (
+    "Test_01",
+    "grasslands_01",
+    "forest_01",
+    "Harbor_01",
+    "deep_cave",
+    "home_interior_01",
+    "DefaultMap",
+)
+DIRECTIONS = ("down", "up", "left", "right")
+ACTION_FLAGS = ("moving", "attacking", "running", "jumping", "long_attacking", "charging_attack")
+
+MAP_IDS = {name: i for i, name in enumerate(MAP_NAMES)}
+DIRECTION_IDS = {name: i for i, name in enumerate(DIRECTIONS)}
+
+# Field kinds
+RAW, POS, MAP, DIRECTION, FLAGS, PLAYERS, ENEMIES = range(7)
+
+PLAYER_FIELDS = (
+    ("id", RAW),
+    ("name", RAW),
+    ("x", POS),
+    ("y", POS),
+    ("prev_x", POS),
+    ("prev_y", POS),
+    ("target_x", POS),
+    ("target_y", POS),
+    ("direction", DIRECTION),
+    ("flags", FLAGS),
+    ("frame_w", RAW),
+    ("frame_h", RAW),
+    ("current_map", MAP),
+    ("z_index", RAW),
+    ("timestamp", RAW),
+)
+
+ENEMY_FIELDS = (
+    ("id", RAW),
+    ("type", RAW),
+    ("x", POS),
+    ("y", POS),
+    ("direction", DIRECTION),
+    ("flags", FLAGS),
+    ("current_map", MAP),
+    ("rows", RAW),
+    ("columns", RAW),
+    ("hp", RAW),
+    ("speed", RAW),
+    ("frame_speed", RAW),
+    ("directions", RAW),
+    ("z_index", RAW),
+    ("c_h_padding", RAW),
+    ("c_v_padding", RAW),
+)
+
+# type name -> (type id, fields). Id 3 is unused: snapshot acks ride on "move".
+MESSAGES = {
+    "move": (1, (
+        ("token", RAW),
+        ("x", POS),
+        ("y", POS),
+        ("direction", DIRECTION),
+        ("flags", FLAGS),
+        ("current_map", MAP),
+        ("z_index", RAW),
+        ("ack", RAW),
+        ("rack", RAW),
+        ("rsack", RAW),
+        ("rcv", RAW),
+        ("vx", POS),
+        ("vy", POS),
+        ("ack_delay", RAW),
+    )),
+    "update": (2, (
+        ("seq", RAW),
+        ("base", RAW),
+        ("world_time", RAW),  # reserved: no longer sent (clients read the synced clock); kept so later bits stay put
+        ("players", PLAYERS),
+        ("enemies", ENEMIES),
+        ("removed_players", RAW),
+        ("removed_enemies", RAW),
+        ("frag", RAW),
+        ("tick", RAW),
+        ("rack", RAW),
+        ("rsack", RAW),
+    )),
+    "portal_enter": (4, (
+        ("token", RAW),
+        ("target_map", MAP),
+        ("spawn_x", POS),
+        ("spawn_y", POS),
+        ("rel", RAW),
+    )),
+    "map_switch": (5, (
+        ("map", MAP),
+        ("x", POS),
+        ("y", POS),
+        ("rel", RAW),
+        ("rack", RAW),
+        ("rsack", RAW),
+    )),
+    "player_disconnect": (6, (
+        ("player_id", RAW),
+        ("rel", RAW),
+        ("rack", RAW),
+        ("rsack", RAW),
+    )),
+    "spawn": (7, (
+        ("rel", RAW),
+        ("players", PLAYERS),
+        ("enemies", ENEMIES),
+        ("rack", RAW),
+        ("rsack", RAW),
+    )),
+    "despawn": (8, (
+        ("rel", RAW),
+        ("players", RAW),
+        ("enemies", RAW),
+        ("rack", RAW),
+        ("rsack", RAW),
+    )),
+    "ping": (9, (
+        ("t0", RAW),
+    )),
+    "pong": (10, (
+        ("t0", RAW),
+        ("t1", RAW),
+        ("t2", RAW),
+        ("tick", RAW),
+        ("tick_time", RAW),
+        ("step", RAW),
+    )),
+}
+
+# ---------------- Field Codecs ----------------
+def _encode_pos(v):
+    return v if v is None else int(round(v * POSITION_SCALE))
+
+
+def _decode_pos(v):
+    return v if v is None else v / POSITION_SCALE
+
+
+def _encode_map(v):
+    return MAP_IDS.get(v, v)
+
+
+def _decode_map(v):
+    return MAP_NAMES[v] if isinstance(v, int) else v
+
+
+def _encode_direction(v):
+    return DIRECTION_IDS.get(v, v)
+
+
+def _decode_direction(v):
+    return DIRECTIONS[v] if isinstance(v, int) else v
+
+
+_FLAG_BITS = tuple((name, 1 << (i + 6), 1 << i) for i, name in enumerate(ACTION_FLAGS))
+
+
+def _encode_flags(msg):
+    """Low 6 bits hold the values, the next 6 which flags are present."""
+    bits = 0
+    for name, present, on in _FLAG_BITS:
+        if name in msg:
+            bits |= present | on if msg[name] else present
+    return bits
+
+
+def _decode_flags(bits, out):
+    for name, present, on in _FLAG_BITS:
+        if bits & present:
+            out[name] = bool(bits & on)
+
+
+def _encode_record(compiled, msg):
+    mask = 0
+    values = [0]
+    for bit, name, codec in compiled:
+        if codec is FLAGS:
+            value = _encode_flags(msg)
+            if not value:
+                continue
+        elif name not in msg:
+            continue
+        elif codec is None:
+            value = msg[name]
+        else:
+            value = codec(msg[name])
+        mask |= bit
+        values.append(value)
+    values[0] = mask
+    return values
+
+
+def _decode_record(compiled, record, out):
+    mask = record[0]
+    i = 1
+    for bit, name, codec in compiled:
+        if not mask & bit:
+            continue
+        value = record[i]
+        i += 1
+        if codec is None:
+            out[name] = value
+        elif codec is FLAGS:
+            _decode_flags(value, out)
+        else:
+            out[name] = codec(value)
+    return out
+
+
+def _compile(fields, codecs):
+    """(bit, name, codec) per field; codec is None for raw values and FLAGS for the bitfield."""
+    return tuple(
+        (1 << i, name, FLAGS if kind == FLAGS else codecs[kind])
+        for i, (name, kind) in enumerate(fields)
+    )
+
+
+def _encode_players(v):
+    return [_encode_record(_PLAYER_ENC, e) for e in v]
+
+
+def _encode_enemies(v):
+    return [_encode_record(_ENEMY_ENC, e) for e in v]
+
+
+def _decode_players(v):
+    return [_decode_record(_PLAYER_DEC, e, {}) for e in v]
+
+
+def _decode_enemies(v):
+    return [_decode_record(_ENEMY_DEC, e, {}) for e in v]
+
+
+ENCODERS = {RAW: None, POS: _encode_pos, MAP: _encode_map, DIRECTION: _encode_direction,
+            PLAYERS: _encode_players, ENEMIES: _encode_enemies}
+DECODERS = {RAW: None, POS: _decode_pos, MAP: _decode_map, DIRECTION: _decode_direction,
+            PLAYERS: _decode_players, ENEMIES: _decode_enemies}
+
+_PLAYER_ENC = _compile(PLAYER_FIELDS, ENCODERS)
+_PLAYER_DEC = _compile(PLAYER_FIELDS, DECODERS)
+_ENEMY_ENC = _compile(ENEMY_FIELDS, ENCODERS)
+_ENEMY_DEC = _compile(ENEMY_FIELDS, DECODERS)
+_MESSAGE_ENC = {name: (type_id, _compile(fields, ENCODERS)) for name, (type_id, fields) in MESSAGES.items()}
+_MESSAGE_DEC = {type_id: (name, _compile(fields, DECODERS)) for name, (type_id, fields) in MESSAGES.items()}
+
+
+# ---------------- Messages ----------------
+def negotiate(offered):
+    """Pick the schema version to use with a peer that offered `offered`."""
+    if not isinstance(offered, int) or offered < 0:
+        return 0
+    return min(offered, SCHEMA_VERSION)
+
+
+def encode(msg):
+    """Encode a message dict as a compact list (dicts of unknown types pass through)."""
+    entry = _MESSAGE_ENC.get(msg.get("type"))
+    if entry is None:
+        return msg
+    type_id, compiled = entry
+    return [type_id, *_encode_record(compiled, msg)]
+
+
+def decode(obj):
+    """Inverse of encode(); plain dicts are returned unchanged."""
+    if not isinstance(obj, list):
+        return obj
+    name, compiled = _MESSAGE_DEC[obj[0]]
+    return _decode_record(compiled, obj[1:], {"type": name})
+
+
+def encode_entity(kind, entity):
+    """Compact form of one "players" or "enemies" entry."""
+    return _encode_record(_PLAYER_ENC if kind == "players" else _ENEMY_ENC, entity)
+
+
+def pack_entity(kind, entity, version=0):
+    """Packed bytes of one "players" or "enemies" entry."""
+    if version >= 1:
+        entity = encode_entity(kind, entity)
+    return msgpack.packb(entity, use_bin_type=True)
+
+
+def _array_header(n):
+    if n < 16:
+        return bytes((0x90 | n,))
+    if n < 0x10000:
+        return b"\xdc" + n.to_bytes(2, "big")
+    return b"\xdd" + n.to_bytes(4, "big")
+
+
+def _map_header(n):
+    if n < 16:
+        return bytes((0x80 | n,))
+    if n < 0x10000:
+        return b"\xde" + n.to_bytes(2, "big")
+    return b"\xdf" + n.to_bytes(4, "big")
+
+
+def _pack_entities(kind, entities, version, pack_entity):
+    return _array_header(len(entities)) + b"".join(pack_entity(kind, e, version) for e in entities)
+
+
+def pack_update(msg, version=0, pack_entity=pack_entity):
+    """
+    Same bytes as pack(msg, version) for an "update", but the entity lists
+    are spliced in from pack_entity(kind, entity, version). Passing a cache
+    there lets many clients share one serialization per entity.
+    """
+    out = []
+    if version >= 1:
+        type_id, compiled = _MESSAGE_ENC["update"]
+        mask = 0
+        for bit, name, codec in compiled:
+            if name in msg:
+                mask |= bit
+                if codec is _encode_players:
+                    out.append(_pack_entities("players", msg[name], version, pack_entity))
+                elif codec is _encode_enemies:
+                    out.append(_pack_entities("enemies", msg[name], version, pack_entity))
+                else:
+                    out.append(msgpack.packb(msg[name] if codec is None else codec(msg[name]), use_bin_type=True))
+        head = _array_header(len(out) + 2) + msgpack.packb(type_id) + msgpack.packb(mask)
+        return head + b"".join(out)
+
+    for key, value in msg.items():
+        out.append(msgpack.packb(key, use_bin_type=True))
+        if key in ("players", "enemies"):
+            out.append(_pack_entities(key, value, version, pack_entity))
+        else:
+            out.append(msgpack.packb(value, use_bin_type=True))
+    return _map_header(len(msg)) + b"".join(out)
+
+
+def pack(msg, version=0):
+    if version >= 1:
+        msg = encode(msg)
+    return msgpack.packb(msg, use_bin_type=True)
+
+
+def unpack(data):
+    return decode(msgpack.unpackb(data, raw=False))
@@ -0,0 +1,50 @@
+# shared/session.py
+# Session frames: after join, packets carry a short session id and a
+# truncated MAC instead of the full login token.
+#
+#     0xC1 | session id (4 bytes, big endian) | MAC (8 bytes) | msgpack payload
+#
+# 0xC1 is the one byte msgpack never emits, so a session frame can be told
+# apart from a plain msgpack packet by its first byte. The MAC is
+# HMAC-SHA256(session key, id + payload) cut to 8 bytes.
+import hashlib
+import hmac
+import secrets
+
+FRAME_MARKER = 0xC1
+ID_SIZE = 4
+MAC_SIZE = 8
+KEY_SIZE = 16
+HEADER_SIZE = 1 + ID_SIZE + MAC_SIZE
+
+
+def new_session_id():
+    return secrets.randbits(ID_SIZE * 8)
+
+
+def new_session_key():
+    return secrets.token_bytes(KEY_SIZE)
+
+
+def _mac(key, sid_bytes, payload):
+    return hmac.new(key, sid_bytes + payload, hashlib.sha256).digest()[:MAC_SIZE]
+
+
+def is_frame(data):
+    return len(data) >= HEADER_SIZE and data[0] == FRAME_MARKER
+
+
+def seal(session_id, key, payload):
+    """Wrap a packed message in a session frame."""
+    sid_bytes = session_id.to_bytes(ID_SIZE, "big")
+    return bytes((FRAME_MARKER,)) + sid_bytes + _mac(key, sid_bytes, payload) + payload
+
+
+def parse(data):
+    """Split a session frame into (session id, mac, payload). Call is_frame() first."""
+    sid_bytes = data[1:1 + ID_SIZE]
+    return int.from_bytes(sid_bytes, "big"), data[1 + ID_SIZE:HEADER_SIZE], data[HEADER_SIZE:]
+
+
+def verify(session_id, key, mac, payload):
+    return hmac.compare_digest(mac, _mac(key, session_id.to_bytes(ID_SIZE, "big"), payload))
@@ -0,0 +1,134 @@
+# shared/tile_grid.py
+# Per-map lookup grid for collision, elevation, opaque and portal tiles,
+# used by the client and server GameMaps alike.
+#
+# One cell per tile, in flat arrays indexed ty * width + tx, so a query
+# only looks at the handful of tiles under a rect instead of scanning every
+# collider on the map. Collision and opaque tiles are kept per z_index.
+# Rects are anything that unpacks to (x, y, width, height): pygame.Rect,
+# server.rect.Rect or a tuple, with pygame's rules (ints, edges touching
+# don't overlap). Where several tiles match, the first in row-major order
+# wins, same as scanning the tile lists in layer order did.
+from array import array
+
+NO_ELEVATION = -(2 ** 31)  # an elevation cell with no tile
+
+
+class TileGrid:
+    def __init__(self, width, height, tile_w, tile_h=None):
+        self.width = width
+        self.height = height
+        self.tile_w = tile_w
+        self.tile_h = tile_h or tile_w
+        self.size = width * height
+        self.collision = {}  # z_index -> bytearray, 1 where a collider is
+        self.opaque = {}     # z_index -> bytearray
+        self.elevation = array("i", [NO_ELEVATION]) * self.size
+        self.portal_index = array("H", [0]) * self.size  # 1 + index into portals, 0 for none
+        self.portals = []
+
+    # ---------------- Building ----------------
+    def layer(self, layers, z):
+        cells = layers.get(z)
+        if cells is None:
+            cells = layers[z] = bytearray(self.size)
+        return cells
+
+    def add_collider(self, tx, ty, z=0):
+        self.layer(self.collision, z)[ty * self.width + tx] = 1
+
+    def add_opaque(self, tx, ty, z=0):
+        self.layer(self.opaque, z)[ty * self.width + tx] = 1
+
+    def add_elevation(self, tx, ty, z):
+        """z None marks no elevation, like a tile without a z_index property."""
+        i = ty * self.width + tx
+        if z is not None and self.elevation[i] == NO_ELEVATION:
+            self.elevation[i] = z
+
+    def add_portal(self, tx, ty, portal):
+        i = ty * self.width + tx
+        if not self.portal_index[i]:
+            self.portals.append(portal)
+            self.portal_index[i] = len(self.portals)
+
+    # ---------------- Lookups ----------------
+    def span(self, rect):
+        """Tile ranges (columns, rows) a rect overlaps, clipped to the map; None if none."""
+        x, y, w, h = rect
+        if w <= 0 or h <= 0:
+            return None
+        tx0 = max(int(x // self.tile_w), 0)
+        tx1 = min(int((x + w - 1) // self.tile_w), self.width - 1)
+        ty0 = max(int(y // self.tile_h), 0)
+        ty1 = min(int((y + h - 1) // self.tile_h), self.height - 1)
+        if tx0 > tx1 or ty0 > ty1:
+            return None
+        return tx0, tx1 + 1, ty0, ty1 + 1
+
+    def cell(self, x, y):
+        """Flat index of the tile under a point, or None off the map."""
+        tx = int(x // self.tile_w)
+        ty = int(y // self.tile_h)
+        if 0 <= tx < self.width and 0 <= ty < self.height:
+            return ty * self.width + tx
+        return None
+
+    def any_in(self, cells, rect):
+        span = self.span(rect)
+        if cells is None or span is None:
+            return False
+        tx0, tx1, ty0, ty1 = span
+        width = self.width
+        for ty in range(ty0, ty1):
+            row = ty * width
+            if any(cells[row + tx0:row + tx1]):
+                return True
+        return False
+
+    def collides(self, rect, z=0):
+        """True if the rect overlaps a collider on layer z."""
+        return self.any_in(self.collision.get(z), rect)
+
+    def opaque_at(self, rect, z=0):
+        """True if the rect overlaps an opaque (fade-out) tile on layer z."""
+        return self.any_in(self.opaque.get(z), rect)
+
+    def collision_at(self, x, y):
+        """True if a collider of any z_index covers the point."""
+        i = self.cell(x, y)
+        return i is not None and any(cells[i] for cells in self.collision.values())
+
+    def elevation_at(self, x, y):
+        """z_index of the elevation tile under a point, or None."""
+        i = self.cell(x, y)
+        if i is None or self.elevation[i] == NO_ELEVATION:
+            return None
+        return self.elevation[i]
+
+    def elevation_in(self, rect):
+        """z_index of the first elevation tile the rect overlaps, or None."""
+        span = self.span(rect)
+        if span is None:
+            return None
+        tx0, tx1, ty0, ty1 = span
+        for ty in range(ty0, ty1):
+            row = ty * self.width
+            for i in range(row + tx0, row + tx1):
+                z = self.elevation[i]
+                if z != NO_ELEVATION:
+                    return z
+        return None
+
+    def portal_at(self, rect):
+        """First portal the rect overlaps, or None."""
+        span = self.span(rect)
+        if span is None:
+            return None
+        tx0, tx1, ty0, ty1 = span
+        for ty in range(ty0, ty1):
+            row = ty * self.width
+            for i in range(row + tx0, row + tx1):
+                if self.portal_index[i]:
+                    return self.portals[self.portal_index[i] - 1]
+        return None
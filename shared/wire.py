@@ -0,0 +1,34 @@
+# shared/wire.py
+# Header on every client -> server datagram, so the server can throw junk
+# away before decoding anything:
+#
+#     "Ad" | protocol version (1 byte) | session frame or msgpack message
+#
+# Bump PROTOCOL_VERSION when the framing below the header changes in a way
+# old servers or clients cannot read.
+MAGIC = b"Ad"
+PROTOCOL_VERSION = 1
+HEADER = MAGIC + bytes((PROTOCOL_VERSION,))
+HEADER_SIZE = len(HEADER)
+
+# Every message is a msgpack map (plain dicts) or array (compact schema)
+# small enough for a fix- or 16-bit header; anything else is not worth decoding
+MESSAGE_LEAD_BYTES = frozenset(range(0x80, 0xA0)) | {0xDC, 0xDE}
+
+# Limits for msgpack coming from clients: nothing they send legitimately
+# comes close (the longest string is the login token)
+UNPACK_LIMITS = {
+    "max_str_len": 256,
+    "max_bin_len": 64,
+    "max_array_len": 64,
+    "max_map_len": 32,
+    "max_ext_len": 0,
+}
+
+
+def add_header(data):
+    return HEADER + data
+
+
+def has_header(data):
+    return data.startswith(HEADER)
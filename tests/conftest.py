@@ -0,0 +1,43 @@
+# tests/conftest.py
+import threading
+
+import pytest
+
+from server import auth_db
+from server.inbox import InputQueue
+from server.message_handler import MessageHandler
+from server.player_manager import PlayerManager
+from shared import schema
+
+
+class FakeSocket:
+    """Records what the server sends instead of putting it on the wire."""
+
+    def __init__(self):
+        self.sent = []  # (message dict, addr)
+
+    def sendto(self, data, addr):
+        self.sent.append((schema.unpack(data), addr))
+
+    def types(self):
+        return [msg["type"] for msg, _ in self.sent]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(auth_db, "DB_FILE", str(tmp_path / "auth.db"))
+    auth_db.init_db()
+    return auth_db
+
+
+@pytest.fixture
+def token(db):
+    db.create_user("alice", "pw")
+    db.create_character("alice", "Alice", "mage")
+    return db.get_token("alice")
+
+
+@pytest.fixture
+def handler(db, monkeypatch):
+    monkeypatch.setattr("config.token_cache", {})
+    return MessageHandler(FakeSocket(), PlayerManager(), threading.Lock(), inputs=InputQueue())
@@ -0,0 +1,80 @@
+# tests/test_enemy_engine.py
+import contextlib
+import io
+import random
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import config
+from server.enemy import Enemy
+from server.enemy_engine import EnemyArrays
+from server.map_registry import maps
+from server.network import Network
+
+TYPES = [("green-slime", 1, 11, 10, 7, 2), ("bull", 8, 6, 40, 20, 20)]
+STEPS = 60
+
+
+class Player:
+    def __init__(self, pid, current_map, x, y):
+        self.id = pid
+        self.current_map = current_map
+        self.x = x
+        self.y = y
+
+
+def world(count, players, seed):
+    """The same enemies and players every call for a given seed, spread over every map."""
+    rng = random.Random(seed)
+    names = maps.names()
+    enemies, clients = {}, {}
+    for eid in range(1, count + 1):
+        name = names[eid % len(names)]
+        game_map = maps.get(name)
+        width, height = game_map.map_width * game_map.tile_size, game_map.map_height * game_map.tile_size
+        enemy_type, rows, columns, speed, v_pad, h_pad = TYPES[eid % len(TYPES)]
+        enemies[eid] = Enemy(eid, rng.uniform(0, width), rng.uniform(0, height), rows, columns,
+                             enemy_type, name, 0.1, speed, v_pad, h_pad)
+    for pid in range(1, players + 1):
+        name = names[pid % len(names)]
+        game_map = maps.get(name)
+        clients[pid] = Player(pid, name, rng.uniform(0, game_map.map_width * game_map.tile_size),
+                              rng.uniform(0, game_map.map_height * game_map.tile_size))
+    return enemies, clients
+
+
+def state(net, e):
+    """What clients see of an enemy, plus who it is chasing and where it is heading."""
+    return net.enemy_state(e), (e.target_x, e.target_y), e.waypoint
+
+
+@pytest.mark.parametrize("pathing", ["direct", "flow"])
+def test_numpy_engine_matches_enemy_update(pathing, monkeypatch):
+    monkeypatch.setattr(config, "ENEMY_PATHING", pathing)
+    with contextlib.redirect_stdout(io.StringIO()):
+        scalar, scalar_clients = world(300, 12, seed=5)
+        batched, batch_clients = world(300, 12, seed=5)
+    engine = EnemyArrays(batched)
+    net = Network(threading.Lock())
+    start = {eid: (e.x, e.y) for eid, e in batched.items()}
+
+    rng_a, rng_b = random.Random(6), random.Random(6)
+    for step in range(STEPS):
+        # Players wander, so enemies re-target and flow fields change goal
+        for clients, rng in ((scalar_clients, rng_a), (batch_clients, rng_b)):
+            for p in clients.values():
+                p.x += rng.uniform(-6, 6)
+                p.y += rng.uniform(-6, 6)
+
+        for e in scalar.values():
+            e.update(config.SIM_RATE, scalar_clients)
+        engine.update(config.SIM_RATE, batch_clients)
+        engine.write_targets()
+
+        for eid, e in scalar.items():
+            assert state(net, e) == state(net, batched[eid]), (step, eid)
+
+    assert sum((e.x, e.y) != start[eid] for eid, e in batched.items()) > len(batched) // 2
@@ -0,0 +1,31 @@
+# tests/test_inbox.py
+import pytest
+
+from server.inbox import InputQueue, valid_input
+
+ADDR = ("127.0.0.1", 40000)
+
+
+@pytest.mark.parametrize("msg", [
+    {"type": "move", "y": 10.0},
+    {"type": "move", "x": "10", "y": 10.0},
+    {"type": "move", "x": True, "y": 10.0},
+    {"type": "move", "x": 10.0, "y": 10.0, "vx": "fast"},
+    {"type": "move", "x": 10.0, "y": 10.0, "ack_delay": 1.5},
+    {"type": "portal_enter"},
+    {"type": "portal_enter", "target_map": "forest_01", "spawn_x": None},
+    {"type": "chat", "x": 1, "y": 2},
+])
+def test_malformed_inputs_are_not_queued(msg):
+    inputs = InputQueue()
+    assert not valid_input(msg)
+    assert inputs.push(1, msg, ADDR) is False
+    assert inputs.drain() == []
+    assert inputs.stats()[1]["invalid"] == 1
+
+
+def test_well_formed_inputs_are_queued():
+    inputs = InputQueue()
+    assert inputs.push(1, {"type": "move", "x": 10, "y": 10.5, "vx": None, "moving": True, "ack": None}, ADDR)
+    assert inputs.push(1, {"type": "portal_enter", "target_map": "forest_01", "spawn_x": 1.0, "spawn_y": 2}, ADDR)
+    assert [msg["type"] for msg, _ in inputs.drain()[0][1]] == ["move", "portal_enter"]
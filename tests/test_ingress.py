@@ -0,0 +1,79 @@
+# tests/test_ingress.py
+import msgpack
+import pytest
+
+from server.ingress import IngressFilter
+from shared import schema, wire
+from shared import session as frames
+
+ADDR = ("127.0.0.1", 40000)
+
+
+def datagram(msg, version=0):
+    return wire.add_header(schema.pack(msg, version))
+
+
+def session_frame(reply, msg):
+    return wire.add_header(frames.seal(reply["session_id"], reply["session_key"], schema.pack(msg)))
+
+
+@pytest.mark.parametrize("msg", [
+    {"token": "abc", "x": 1.0, "y": 2.0},
+    {"type": 3, "token": "abc"},
+    {"type": "shout", "token": "abc"},
+    {"type": "join"},
+    {"type": "join", "token": 42},
+    {"type": "move", "token": "abc", "x": 1.0, "y": 2.0, "rack": "all"},
+    {"type": "move", "token": "abc", "x": 1.0, "y": 2.0, "rsack": [1]},
+    {"type": "ack", "token": "abc", "seq": 7},
+    {"type": "save", "token": "abc", "x": 1.0, "y": 2.0, "current_map": "forest_01"},
+    {"type": "save", "token": "abc", "x": 1.0, "y": 2.0, "direction": 3, "current_map": "forest_01"},
+    {"type": "ping", "t0": "now"},
+    {"type": "resume", "ticket": b"t" * 16, "conn": "x"},
+])
+def test_malformed_messages_are_dropped_and_counted(msg):
+    ingress = IngressFilter(1200, 100, 100)
+    assert ingress.unpack(msgpack.packb(msg, use_bin_type=True)) is None
+    assert ingress.dropped == {"invalid": 1}
+
+
+@pytest.mark.parametrize("msg", [
+    {"type": "join", "token": "abc", "schema": 1, "compress": [1], "conn": 5, "jid": 1,
+     "rseq": 0, "rexpect": 0, "t0": 12.5},
+    {"type": "resume", "ticket": b"t" * 16, "conn": 5, "jid": 2},
+    {"type": "move", "token": "abc", "x": 1.0, "y": 2, "vx": None, "ack": None, "rack": -1, "rsack": 0},
+    {"type": "portal_enter", "target_map": "forest_01", "spawn_x": 1.0, "spawn_y": 2.0, "rel": 0},
+    {"type": "rel_ack", "rack": 3, "rsack": 0},
+    {"type": "ping", "t0": 3.5},
+    {"type": "save", "x": 1.0, "y": 2.0, "direction": "up", "current_map": "forest_01", "z_index": 0},
+])
+def test_well_formed_messages_pass(msg):
+    ingress = IngressFilter(1200, 100, 100)
+    for version in (0, schema.SCHEMA_VERSION):
+        assert ingress.unpack(schema.pack(msg, version)) is not None
+    assert not ingress.dropped
+
+
+def test_malformed_token_messages_do_not_reach_the_handlers(handler, token):
+    handler.handle_datagram(datagram({"token": token, "x": 1.0}), ADDR)
+    handler.handle_datagram(datagram({"type": "join", "token": token, "rseq": "0"}), ADDR)
+    assert handler.player_manager.clients == {}
+    assert handler.sock.sent == []
+    assert handler.ingress.dropped["invalid"] == 2
+
+
+def test_malformed_session_messages_do_not_reach_the_handlers(handler, token):
+    handler.handle_datagram(datagram({"type": "join", "token": token, "schema": 0, "conn": 1, "jid": 1}), ADDR)
+    [(reply, _)] = handler.sock.sent
+    [player] = handler.player_manager.clients.values()
+
+    for msg in ({"type": "rel_ack", "rack": "x"},
+                {"type": "save", "x": 1.0, "y": 2.0},
+                {"type": "move", "x": 1.0},
+                {"type": "portal_enter", "target_map": None, "rel": 0}):
+        handler.handle_datagram(session_frame(reply, msg), ADDR)
+    handler.apply_inputs()
+
+    assert handler.ingress.dropped["invalid"] == 4
+    assert player.channel.expected == 0
+    assert handler.inputs.drain() == []
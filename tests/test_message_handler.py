@@ -0,0 +1,127 @@
+# tests/test_message_handler.py
+import pytest
+
+from shared import schema
+
+ADDR = ("127.0.0.1", 40000)
+
+
+def join(token, **fields):
+    return dict({
+        "type": "join", "token": token, "schema": schema.SCHEMA_VERSION,
+        "conn": 7, "jid": 1, "rseq": 0, "rexpect": 0, "t0": 1.0,
+    }, **fields)
+
+
+def move(token, **fields):
+    return dict({"type": "move", "token": token, "x": 120.0, "y": 80.0, "direction": "down"}, **fields)
+
+
+def assigned(handler):
+    return [msg for msg, _ in handler.sock.sent if msg["type"] == "assign_id"]
+
+
+def test_move_before_join_does_not_start_a_connection(handler, token):
+    handler.handle_message(move(token), ADDR)
+    assert handler.player_manager.clients == {}
+    assert handler.sock.types() == ["session_expired"]
+
+    handler.handle_message(join(token), ADDR)
+    [reply] = assigned(handler)
+    assert reply["schema"] == schema.SCHEMA_VERSION
+    assert reply["rel"] == 0
+
+    # The join's channel and session stand; a retransmitted join is not answered again
+    player = handler.player_manager.clients[reply["player_id"]]
+    session_id, ticket = reply["session_id"], reply["resume"]
+    handler.handle_message(join(token), ADDR)
+    assert len(assigned(handler)) == 1
+    assert player.channel.conn == 7
+    assert handler.player_manager.sessions.get(session_id) is not None
+    assert player.resume_ticket == ticket
+
+
+def test_move_after_join_with_token_is_applied(handler, token):
+    handler.handle_message(join(token), ADDR)
+    handler.handle_message(move(token), ADDR)
+    handler.apply_inputs()
+    [player] = handler.player_manager.clients.values()
+    assert (player.target_x, player.target_y) == (120.0, 80.0)
+
+
+def test_schema_is_negotiated_from_the_join(handler, token):
+    handler.handle_message(join(token), ADDR)
+    [player] = handler.player_manager.clients.values()
+    assert player.schema == schema.SCHEMA_VERSION
+
+    # A second connection's join without an offer keeps the agreed version
+    offer = join(token, conn=8, jid=2)
+    del offer["schema"]
+    handler.handle_message(offer, ADDR)
+    assert player.schema == schema.SCHEMA_VERSION
+    assert [msg["schema"] for msg in assigned(handler)][-1] == schema.SCHEMA_VERSION
+
+
+def test_a_failing_input_is_dropped_without_stopping_the_rest(handler, token):
+    handler.handle_message(join(token), ADDR)
+    [(pid, player)] = handler.player_manager.clients.items()
+    # Queued directly, as if it had got past the checks: applying it raises
+    handler.inputs.inboxes[pid] = [({"type": "move"}, ADDR), (move(token, x=64.0), ADDR)]
+    handler.apply_inputs()
+    assert player.target_x == 64.0
+    assert handler.inputs.stats()[pid]["invalid"] == 1
+
+
+def test_malformed_move_is_not_queued(handler, token):
+    handler.handle_message(join(token), ADDR)
+    [(pid, player)] = handler.player_manager.clients.items()
+    handler.handle_session_message(pid, {"type": "move", "y": 1.0}, ADDR)
+    handler.handle_session_message(pid, {"type": "move", "x": "a", "y": 1.0}, ADDR)
+    handler.apply_inputs()
+    assert handler.inputs.stats()[pid]["invalid"] == 2
+
+
+def test_refused_resume_leaves_the_player_parked_where_it_was(handler, token):
+    handler.handle_message(join(token), ADDR)
+    [reply] = assigned(handler)
+    pid, ticket = reply["player_id"], reply["resume"]
+    handler.player_manager.park(pid)
+
+    other = ("10.0.0.2", 50000)
+    handler.handle_message({"type": "resume", "ticket": ticket, "conn": 99, "jid": 2}, other)
+    assert handler.sock.types()[-1] == "resume_failed"
+    assert pid in handler.player_manager.parked
+    assert handler.player_manager.parked[pid][0].addr == ADDR
+
+    handler.handle_message({"type": "resume", "ticket": ticket, "conn": 7, "jid": 2}, other)
+    assert handler.sock.types()[-1] == "session"
+    assert handler.player_manager.clients[pid].addr == other
+
+
+def test_unknown_session_ids_get_no_answer(handler):
+    from shared import session as frames, wire
+    data = wire.add_header(frames.seal(frames.new_session_id(), frames.new_session_key(),
+                                       schema.pack({"type": "ping", "t0": 1.0})))
+    handler.handle_datagram(data, ADDR)
+    assert handler.sock.sent == []
+    assert handler.ingress.dropped["session"] == 1
+
+
+def test_new_connection_for_a_known_player_does_not_query_the_db(handler, token, monkeypatch):
+    handler.handle_message(join(token), ADDR)
+    from server import auth_db
+    for name in ("get_char_name", "get_class_type", "load_player_state", "get_username_from_token"):
+        monkeypatch.setattr(auth_db, name, lambda *a: pytest.fail("DB queried on the join path"))
+    handler.handle_message(join(token, conn=8, jid=2), ADDR)
+    reply = assigned(handler)[-1]
+    assert (reply["player_data"]["name"], reply["player_data"]["class_type"]) == ("Alice", "mage")
+
+
+def test_saves_go_through_offload(handler, token):
+    jobs = []
+    handler.offload = lambda fn, *args: jobs.append((fn.__name__, args))
+    handler.handle_message(join(token), ADDR)
+    [(pid, player)] = handler.player_manager.clients.items()
+    handler.handle_session_message(pid, {"type": "save", "x": 1.0, "y": 2.0, "direction": "up",
+                                         "current_map": "forest_01"}, ADDR)
+    assert jobs == [("save_player_state", (pid, "alice", 1.0, 2.0, "up", "forest_01", 0))]
@@ -0,0 +1,77 @@
+# tests/test_network.py
+import threading
+
+import pytest
+
+from server.network import Network
+from server.player import Player
+from shared import schema
+from shared.packetizer import split_update
+
+
+class Enemy:
+    def __init__(self, eid, x, y):
+        self.id = eid
+        self.x = x
+        self.y = y
+        self.direction = "left"
+        self.moving = True
+        self.current_map = "Test_01"
+
+
+@pytest.mark.parametrize("version", [0, schema.SCHEMA_VERSION])
+def test_prioritize_sizes_entities_as_they_are_sent(version):
+    net = Network(threading.Lock())
+    viewer = Player(1, "Viewer", x=0, y=0)
+    viewer.schema = version
+    viewer.rate.budget = 64  # too small for everything: forces the byte accounting
+    others = {pid: Player(pid, f"Player{pid}", x=pid * 10, y=0) for pid in range(2, 12)}
+    net.clients = {1: viewer, **others}
+    net.enemies = {eid: Enemy(eid, eid * 5, 5) for eid in range(1, 11)}
+    players = [net.player_state(p) for p in others.values()]
+    enemies = [net.enemy_state(e) for e in net.enemies.values()]
+
+    seen = []
+    select = viewer.priority.select
+    viewer.priority.select = lambda candidates, budget, elapsed: seen.extend(candidates) or select(
+        candidates, budget, elapsed)
+    net.prioritize(viewer, players, enemies, {}, now=1.0)
+
+    sizes = {key: size for key, _, size in seen}
+    for kind, field, entries in (("player", "players", players), ("enemy", "enemies", enemies)):
+        for entry in entries:
+            assert sizes[(kind, entry["id"])] == len(schema.pack_entity(field, entry, version))
+
+    # Every entity was packed once, while prioritizing; sending reuses those bytes
+    cache = net.encode_cache
+    packed = cache.misses
+    update = {"type": "update", "seq": 1, "base": None, "tick": 1, "players": players, "enemies": enemies,
+              "removed_players": [], "removed_enemies": []}
+    split_update(update, version, 1200, cache)
+    assert cache.misses == packed == len(players) + len(enemies)
+
+
+def test_negative_ack_resets_the_baseline_once():
+    net = Network(threading.Lock())
+    viewer = Player(1, "Viewer", x=0, y=0)
+    viewer.addr = ("127.0.0.1", 40000)
+    viewer.current_map = "Test_01"
+    net.clients = {1: viewer}
+    net.enemies = {}
+    net.interest.update(("player", 1), viewer.current_map, viewer.x, viewer.y)
+
+    def snapshot(now):
+        [update] = [msg for _, _, msg in net.collect_updates(now) if msg["type"] == "update"]
+        return update
+
+    first = snapshot(1.0)
+    viewer.note_ack(first["seq"])
+    assert snapshot(2.0)["base"] == first["seq"]
+
+    viewer.note_ack(-1)  # the client lost its baseline
+    full = snapshot(3.0)
+    assert full["base"] is None
+    assert viewer.last_ack is None  # consumed, not applied again next tick
+
+    viewer.note_ack(full["seq"])
+    assert snapshot(4.0)["base"] == full["seq"]
@@ -0,0 +1,103 @@
+# tests/test_packetizer.py
+import random
+
+import pytest
+
+from shared import schema
+from shared.packetizer import Reassembler, chunk_entities, split_update
+
+
+def update(seq, players=120, enemies=80):
+    return {
+        "type": "update", "seq": seq, "base": None, "tick": seq,
+        "players": [{"id": i, "x": i * 3.5, "y": 7.0, "direction": "down", "current_map": "Test_01"}
+                    for i in range(players)],
+        "enemies": [{"id": i, "x": 2.0, "y": i * 1.5, "moving": True} for i in range(enemies)],
+        "removed_players": [900, 901],
+        "removed_enemies": [902],
+    }
+
+
+def fragments(msg, version=schema.SCHEMA_VERSION, max_size=1200):
+    return [schema.unpack(data) for data in split_update(msg, version, max_size)]
+
+
+def entities(msg):
+    return {kind: sorted(e["id"] for e in msg[kind]) for kind in ("players", "enemies")}
+
+
+@pytest.mark.parametrize("version", [0, schema.SCHEMA_VERSION])
+def test_split_update_fits_each_datagram(version):
+    msg = update(7)
+    datagrams = split_update(msg, version, 1200)
+    assert len(datagrams) > 1
+    assert all(len(data) <= 1200 for data in datagrams)
+    parts = [schema.unpack(data) for data in datagrams]
+    assert [p["frag"] for p in parts] == [[i, len(parts)] for i in range(len(parts))]
+    assert all(p["seq"] == 7 for p in parts)
+
+
+def test_small_update_is_not_fragmented():
+    [data] = split_update(update(1, players=2, enemies=2), schema.SCHEMA_VERSION, 1200)
+    assert "frag" not in schema.unpack(data)
+
+
+def test_fragments_reassemble_in_any_order_with_duplicates():
+    msg = update(3)
+    parts = fragments(msg)
+    received = parts + parts[:2]
+    random.Random(1).shuffle(received)
+
+    reassembler = Reassembler(0.25)
+    ready = [out for part in received for out in reassembler.add(part, now=0.0)]
+    ready += reassembler.expire(now=1.0)
+    [whole] = ready
+    assert "partial" not in whole
+    expected = fragments(msg, max_size=1 << 20)[0]  # the same update in one piece, as decoded
+    assert entities(whole) == entities(expected)
+    assert sorted(whole["removed_players"]) == [900, 901]
+    assert reassembler.pending == {}
+
+
+def test_lost_fragment_releases_a_partial_after_the_timeout():
+    parts = fragments(update(4))
+    lost = parts.pop(1)
+    reassembler = Reassembler(0.25)
+    assert [out for part in parts for out in reassembler.add(part, now=0.0)] == []
+    [partial] = reassembler.expire(now=0.3)
+    assert partial["partial"] is True
+    everything = entities(fragments(update(4), max_size=1 << 20)[0])
+    assert entities(partial) != everything
+    assert partial["removed_players"] == [900, 901]  # removals ride in the first fragment
+
+    # The lost fragment turning up late does not bring the snapshot back
+    assert reassembler.add(lost, now=0.4) == []
+    assert reassembler.expire(now=2.0) == []
+
+
+def test_newer_complete_snapshot_flushes_older_ones():
+    old, new = fragments(update(5)), fragments(update(6))
+    reassembler = Reassembler(10.0)
+    assert reassembler.add(old[0], now=0.0) == []
+    ready = [out for part in new for out in reassembler.add(part, now=0.1)]
+    assert [(m["seq"], m.get("partial", False)) for m in ready] == [(5, True), (6, False)]
+    # Stragglers of either snapshot are dropped
+    assert reassembler.add(old[1], now=0.2) == []
+    assert reassembler.add(new[0], now=0.2) == []
+    assert reassembler.pending == {}
+
+
+def test_unfragmented_updates_pass_straight_through():
+    msg = schema.unpack(split_update(update(8, 1, 1), 0, 1200)[0])
+    assert Reassembler().add(msg) == [msg]
+
+
+def test_chunk_entities_respects_the_size_limit():
+    msg = update(9)
+    chunks = chunk_entities(msg["players"], msg["enemies"], schema.SCHEMA_VERSION, 400)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        size = sum(len(schema.pack_entity(kind, e, schema.SCHEMA_VERSION)) for kind in ("players", "enemies")
+                   for e in chunk[kind])
+        assert size <= 400
+    assert [e["id"] for c in chunks for e in c["players"]] == [e["id"] for e in msg["players"]]
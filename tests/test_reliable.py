@@ -0,0 +1,107 @@
+# tests/test_reliable.py
+import random
+
+from shared import schema
+from shared.reliable import INITIAL_RTO, MAX_RTO, WINDOW, ReliableChannel
+
+
+def deliver(receiver, msgs):
+    return [m["n"] for msg in msgs for m in receiver.receive(msg)]
+
+
+def test_in_order_delivery_with_reordering_and_duplicates():
+    sender, receiver = ReliableChannel(), ReliableChannel()
+    msgs = [sender.wrap({"type": "map_switch", "n": i}, now=0.0) for i in range(5)]
+    assert deliver(receiver, [msgs[0], msgs[2], msgs[0], msgs[4]]) == [0]
+    assert receiver.ack_fields() == {"rack": 0, "rsack": 0b101}  # 2 and 4 held back
+    assert deliver(receiver, [msgs[1], msgs[2]]) == [1, 2]
+    assert deliver(receiver, [msgs[3]]) == [3, 4]
+    assert deliver(receiver, msgs) == []  # all duplicates now
+    assert receiver.ack_fields() == {"rack": 4, "rsack": 0}
+
+
+def test_messages_beyond_the_window_are_dropped():
+    receiver = ReliableChannel()
+    assert receiver.receive({"rel": WINDOW + 1}) == []
+    assert receiver.buffer == {}
+    assert receiver.receive({"rel": WINDOW}) == []
+    assert list(receiver.buffer) == [WINDOW]
+
+
+def test_rack_and_rsack_clear_exactly_what_was_received():
+    sender = ReliableChannel()
+    for i in range(6):
+        sender.wrap({"type": "spawn", "n": i}, now=0.0)
+    sender.on_ack(1, 0b101, now=0.1)  # 0, 1 in order; 3 and 5 out of order (bit i: rack + 2 + i)
+    assert sorted(sender.pending) == [2, 4]
+    sender.on_ack(None, now=0.2)
+    assert sorted(sender.pending) == [2, 4]
+
+
+def test_unacked_messages_are_retransmitted_with_backoff():
+    sender = ReliableChannel()
+    sender.wrap({"type": "session"}, now=0.0)
+    assert sender.due(now=INITIAL_RTO / 2) == []
+    assert [m["rel"] for m in sender.due(now=INITIAL_RTO)] == [0]
+    assert sender.due(now=INITIAL_RTO * 2) == []  # backed off to 2 * rto
+    assert len(sender.due(now=INITIAL_RTO * 3)) == 1
+    assert sender.retransmits == 2
+    assert sender.due(now=100.0) and sender.due(now=100.0 + MAX_RTO)  # capped at MAX_RTO
+
+    sender.on_ack(0, now=101.0)
+    assert sender.pending == {}
+    assert sender.srtt is None  # Karn: no sample from a retransmitted message
+
+
+def test_rtt_samples_set_the_timeout():
+    sender = ReliableChannel()
+    sender.wrap({"type": "session"}, now=0.0)
+    sender.on_ack(0, now=0.1)
+    assert sender.srtt == 0.1
+    assert sender.rto == 0.1 + 4 * 0.05
+
+
+def test_lossy_link_delivers_everything_once_in_order():
+    rng = random.Random(3)
+    a, b = ReliableChannel(), ReliableChannel()
+    to_send = list(range(200))
+    received = []
+    in_flight = []  # (arrival time, to b?, msg)
+
+    def transmit(to_b, msg, now):
+        # 20% loss, 10% duplicated, 20-120 ms of delay, which reorders too
+        for _ in range(0 if rng.random() < 0.2 else 2 if rng.random() < 0.1 else 1):
+            in_flight.append((now + rng.uniform(0.02, 0.12), to_b, msg))
+
+    now = 0.0
+    while (to_send or a.pending) and now < 120:
+        now += 0.01
+        if to_send and len(a.pending) < WINDOW // 2:
+            transmit(True, a.wrap({"type": "spawn", "n": to_send.pop(0)}, now), now)
+        for msg in a.due(now):
+            transmit(True, msg, now)
+
+        arrived = sorted((f for f in in_flight if f[0] <= now), key=lambda f: f[0])
+        in_flight = [f for f in in_flight if f[0] > now]
+        for _, to_b, msg in arrived:
+            if to_b:
+                received += [m["n"] for m in b.receive(msg)]
+                transmit(False, b.ack_fields(), now)
+            else:
+                a.on_ack(msg["rack"], msg["rsack"], now)
+
+    assert received == list(range(200))
+    assert a.pending == {} and a.retransmits > 0
+
+
+def test_sequence_numbers_keep_counting_past_32_bits():
+    # Sequence numbers never wrap; they stay plain ints through the wire format
+    start = 2 ** 32 - 2
+    sender, receiver = ReliableChannel(first_seq=start), ReliableChannel(first_expected=start)
+    sent = [sender.wrap({"type": "map_switch", "map": "forest_01", "x": 1.0, "y": 2.0}, now=0.0) for _ in range(4)]
+    wire = [schema.unpack(schema.pack(msg, schema.SCHEMA_VERSION)) for msg in reversed(sent)]
+    ready = [m["rel"] for msg in wire for m in receiver.receive(msg)]
+    assert ready == [start, start + 1, start + 2, start + 3]
+    ack = schema.unpack(schema.pack(dict(receiver.ack_fields(), type="rel_ack")))
+    sender.on_ack(ack["rack"], ack["rsack"], now=0.1)
+    assert sender.pending == {} and ack["rack"] == 2 ** 32 + 1
@@ -0,0 +1,363 @@
+# tools/netem.py
+# UDP relay that makes a bad link out of a good one, for trying the game
+# protocol on lossy, slow or jittery networks without root or tc/netem.
+# Point the client at the relay instead of the server:
+#
+#   python -m tools.netem --server 127.0.0.1:50880 --listen 127.0.0.1:50881 --delay 60 --jitter 15 --loss 0.02
+#   python -m tools.netem --server 127.0.0.1:50880 --profile wifi
+#   python -m tools.netem --server 127.0.0.1:50880 --up loss=0.05 --down delay=120,rate=20000
+#   python -m tools.netem --server 127.0.0.1:50880 --profile my_profile.json
+#
+# Each client address gets its own upstream socket, so the server still
+# sees one address per client. Both directions are impaired separately:
+# "up" is client -> server, "down" server -> client.
+#
+# Per direction, in the order a packet meets them:
+#   loss       probability a packet is dropped (Bernoulli), or, with
+#   burst      > 1, the mean length of loss bursts (Gilbert-Elliott) at
+#              the same average loss rate
+#   rate       bandwidth cap in bytes/s (0: none); packets wait for the link,
+#   queue      and are tail-dropped past this many bytes waiting
+#   delay      one-way latency in ms, plus
+#   jitter     a uniform +-jitter ms on each packet (which reorders some)
+#   reorder    probability a packet skips the delay and overtakes the queue
+#   duplicate  probability a packet is sent twice
+#
+# A profile is a list of phases, each lasting `duration` seconds with its
+# own "up"/"down" settings; the relay steps through them and loops. See
+# PROFILES, or give a JSON file with the same layout.
+#
+# From a test:
+#
+#   with Relay(server_addr, up=Link(loss=0.1), down=Link(delay=80)) as relay:
+#       client.connect(*relay.addr, token)   # client.network.client.Client
+#       ...
+#       relay.stats()
+import argparse
+import heapq
+import itertools
+import json
+import random
+import select
+import socket
+import threading
+import time
+
+BUFFER_SIZE = 65535
+IDLE_TIMEOUT = 60.0   # seconds before an idle client's upstream socket is closed
+
+
+# ---------------- Link Model ----------------
+class Link:
+    """Impairment settings for one direction. Times in ms, rate in bytes/s."""
+
+    FIELDS = ("delay", "jitter", "loss", "burst", "duplicate", "reorder", "rate", "queue")
+
+    def __init__(self, delay=0.0, jitter=0.0, loss=0.0, burst=1.0, duplicate=0.0, reorder=0.0,
+                 rate=0, queue=64 * 1024):
+        self.delay = delay
+        self.jitter = jitter
+        self.loss = loss
+        self.burst = burst
+        self.duplicate = duplicate
+        self.reorder = reorder
+        self.rate = rate
+        self.queue = queue
+
+    @classmethod
+    def parse(cls, spec, base=None):
+        """Link from "delay=50,loss=0.01"; unset fields come from base."""
+        settings = dict(base.settings()) if base is not None else {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = item.partition("=")
+            if key not in cls.FIELDS:
+                raise ValueError(f"unknown link setting: {key}")
+            settings[key] = float(value)
+        return cls(**settings)
+
+    def settings(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self):
+        return "Link(" + ", ".join(f"{k}={v:g}" for k, v in self.settings().items()) + ")"
+
+
+class Channel:
+    """One direction through the relay: a Link plus the state it needs (link busy time, loss state)."""
+
+    def __init__(self, link, rng):
+        self.link = link
+        self.rng = rng
+        self.busy_until = 0.0
+        self.bad = False  # Gilbert-Elliott: in a loss burst
+        self.metrics = {
+            "packets": 0, "bytes": 0, "lost": 0, "queue_drops": 0,
+            "duplicated": 0, "reordered": 0, "delivered": 0,
+        }
+
+    def lost(self):
+        link = self.link
+        if link.loss <= 0:
+            return False
+        if link.burst <= 1:
+            return self.rng.random() < link.loss
+        # Two-state chain with mean burst length `burst` and the same overall loss rate
+        leave = 1.0 / link.burst
+        enter = min(1.0, link.loss * leave / max(1e-9, 1.0 - link.loss))
+        self.bad = self.rng.random() >= leave if self.bad else self.rng.random() < enter
+        return self.bad
+
+    def schedule(self, size, now):
+        """Times the copies of a packet arriving now come out of the link; empty if it is dropped."""
+        self.metrics["packets"] += 1
+        self.metrics["bytes"] += size
+        if self.lost():
+            self.metrics["lost"] += 1
+            return []
+
+        link = self.link
+        sent = now
+        if link.rate > 0:
+            start = max(now, self.busy_until)
+            if (start - now) * link.rate > link.queue:
+                self.metrics["queue_drops"] += 1
+                return []
+            self.busy_until = sent = start + size / link.rate
+
+        copies = 2 if self.rng.random() < link.duplicate else 1
+        self.metrics["duplicated"] += copies - 1
+        times = []
+        for _ in range(copies):
+            if self.rng.random() < link.reorder:
+                self.metrics["reordered"] += 1
+                times.append(sent)
+                continue
+            delay = link.delay + self.rng.uniform(-link.jitter, link.jitter)
+            times.append(sent + max(0.0, delay) / 1000.0)
+        return times
+
+
+# ---------------- Profiles ----------------
+# name -> phases; each phase {"duration": s, "up": {...}, "down": {...}}
+PROFILES = {
+    "lan": [{"duration": 0, "up": {"delay": 1}, "down": {"delay": 1}}],
+    "wifi": [
+        {"duration": 8, "up": {"delay": 15, "jitter": 10, "loss": 0.01}, "down": {"delay": 15, "jitter": 10, "loss": 0.01}},
+        {"duration": 2, "up": {"delay": 60, "jitter": 40, "loss": 0.08, "burst": 3},
+         "down": {"delay": 60, "jitter": 40, "loss": 0.08, "burst": 3}},
+    ],
+    "mobile": [
+        {"duration": 10, "up": {"delay": 60, "jitter": 25, "loss": 0.02, "rate": 40000},
+         "down": {"delay": 60, "jitter": 25, "loss": 0.02, "rate": 120000}},
+        {"duration": 3, "up": {"delay": 200, "jitter": 80, "loss": 0.1, "burst": 4, "rate": 10000},
+         "down": {"delay": 200, "jitter": 80, "loss": 0.1, "burst": 4, "rate": 20000}},
+    ],
+    "lossy": [{"duration": 0, "up": {"delay": 30, "loss": 0.1}, "down": {"delay": 30, "loss": 0.1}}],
+    "congested": [{"duration": 0, "up": {"delay": 40, "jitter": 5},
+                   "down": {"delay": 40, "jitter": 5, "rate": 8000, "queue": 16000}}],
+    "reorder": [{"duration": 0, "up": {"delay": 50, "reorder": 0.2, "duplicate": 0.05},
+                 "down": {"delay": 50, "reorder": 0.2, "duplicate": 0.05}}],
+}
+
+
+def load_profile(name):
+    """Phases of a built-in profile, or of a JSON file with the same layout."""
+    if name in PROFILES:
+        phases = PROFILES[name]
+    else:
+        with open(name) as f:
+            phases = json.load(f)
+    return [(float(p.get("duration", 0)), Link(**p.get("up", {})), Link(**p.get("down", {}))) for p in phases]
+
+
+# ---------------- Relay ----------------
+class Relay:
+    """
+    The relay: one listening socket for the clients, one upstream socket per
+    client, and a timer heap of packets in flight. Runs on its own thread.
+    """
+
+    def __init__(self, server_addr, listen_addr=("127.0.0.1", 0), up=None, down=None, profile=None, seed=None):
+        self.server_addr = server_addr
+        self.rng = random.Random(seed)
+        self.up = Channel(up or Link(), self.rng)
+        self.down = Channel(down or Link(), self.rng)
+        self.phases = load_profile(profile) if isinstance(profile, str) else profile
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.listener.bind(listen_addr)
+        self.listener.setblocking(False)
+        self.addr = self.listener.getsockname()
+        self.upstream = {}     # client addr -> [socket, last used]
+        self.clients = {}      # upstream socket -> client addr
+        self.in_flight = []    # heap of (due, n, socket, data, addr)
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+    # ---------------- Control ----------------
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="netem", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+        for sock, _ in self.upstream.values():
+            sock.close()
+        self.listener.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def set_links(self, up=None, down=None):
+        """Change the impairment while running (packets in flight keep their times)."""
+        with self.lock:
+            if up is not None:
+                self.up.link = up
+            if down is not None:
+                self.down.link = down
+
+    def stats(self):
+        with self.lock:
+            return {
+                "up": dict(self.up.metrics),
+                "down": dict(self.down.metrics),
+                "clients": len(self.upstream),
+                "in_flight": len(self.in_flight),
+            }
+
+    # ---------------- Loop ----------------
+    def run(self):
+        phase_index, phase_end = 0, None
+        if self.phases:
+            phase_end = self.apply_phase(0, time.monotonic())
+
+        while self.running:
+            now = time.monotonic()
+            if phase_end is not None and now >= phase_end:
+                phase_index = (phase_index + 1) % len(self.phases)
+                phase_end = self.apply_phase(phase_index, now)
+
+            self.release(now)
+            timeout = 0.05
+            if self.in_flight:
+                timeout = max(0.0, min(timeout, self.in_flight[0][0] - now))
+            sockets = [self.listener] + list(self.clients)
+            readable, _, _ = select.select(sockets, [], [], timeout)
+            now = time.monotonic()
+            for sock in readable:
+                self.receive(sock, now)
+            self.expire_idle(now)
+
+    def apply_phase(self, index, now):
+        duration, up, down = self.phases[index]
+        self.set_links(up, down)
+        # A single phase, or one with no duration, holds forever
+        return now + duration if duration > 0 and len(self.phases) > 1 else None
+
+    def receive(self, sock, now):
+        while True:
+            try:
+                data, addr = sock.recvfrom(BUFFER_SIZE)
+            except (BlockingIOError, ConnectionError):
+                return
+            except OSError:
+                return
+            if sock is self.listener:
+                upstream = self.upstream_for(addr, now)
+                self.enqueue(self.up, upstream, data, self.server_addr, now)
+            else:
+                client = self.clients.get(sock)
+                if client is None:
+                    return
+                self.upstream[client][1] = now
+                self.enqueue(self.down, self.listener, data, client, now)
+
+    def upstream_for(self, client, now):
+        entry = self.upstream.get(client)
+        if entry is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind((self.addr[0], 0))
+            sock.setblocking(False)
+            entry = self.upstream[client] = [sock, now]
+            self.clients[sock] = client
+        entry[1] = now
+        return entry[0]
+
+    def enqueue(self, channel, sock, data, addr, now):
+        with self.lock:
+            for due in channel.schedule(len(data), now):
+                heapq.heappush(self.in_flight, (due, next(self.counter), sock, data, addr))
+
+    def release(self, now):
+        """Send every packet whose time has come."""
+        while True:
+            with self.lock:
+                if not self.in_flight or self.in_flight[0][0] > now:
+                    return
+                _, _, sock, data, addr = heapq.heappop(self.in_flight)
+                channel = self.up if addr == self.server_addr else self.down
+                channel.metrics["delivered"] += 1
+            try:
+                sock.sendto(data, addr)
+            except OSError:
+                pass  # the far end is gone; a real link would not tell either
+
+    def expire_idle(self, now):
+        for client, (sock, last) in list(self.upstream.items()):
+            if now - last > IDLE_TIMEOUT:
+                del self.upstream[client]
+                del self.clients[sock]
+                sock.close()
+
+
+# ---------------- Command Line ----------------
+def parse_addr(text):
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UDP relay with latency, jitter, loss, duplication, "
+                                                 "reordering and bandwidth caps per direction")
+    parser.add_argument("--server", required=True, type=parse_addr, help="server host:port to relay to")
+    parser.add_argument("--listen", default="127.0.0.1:0", type=parse_addr,
+                        help="host:port clients connect to (default: any free port)")
+    parser.add_argument("--profile", help=f"scripted phases: {', '.join(PROFILES)} or a JSON file")
+    for name in Link.FIELDS:
+        parser.add_argument(f"--{name}", type=float, help=f"{name}, both directions")
+    parser.add_argument("--up", default="", help="client -> server overrides, e.g. delay=80,loss=0.05")
+    parser.add_argument("--down", default="", help="server -> client overrides")
+    parser.add_argument("--seed", type=int, help="random seed, for repeatable runs")
+    parser.add_argument("--stats", type=float, default=5.0, help="seconds between stats lines (0: none)")
+    args = parser.parse_args(argv)
+
+    both = Link(**{name: getattr(args, name) for name in Link.FIELDS if getattr(args, name) is not None})
+    up, down = Link.parse(args.up, both), Link.parse(args.down, both)
+    relay = Relay(args.server, args.listen, up, down, args.profile, args.seed).start()
+
+    print(f"[INFO] Relaying {relay.addr[0]}:{relay.addr[1]} -> {args.server[0]}:{args.server[1]}")
+    if args.profile:
+        print(f"[INFO] Profile {args.profile}: {len(relay.phases)} phase(s)")
+    else:
+        print(f"[INFO] up   {up}\n[INFO] down {down}")
+    try:
+        while True:
+            time.sleep(args.stats or 3600)
+            if args.stats:
+                print(f"[INFO] {relay.stats()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        relay.stop()
+
+
+if __name__ == "__main__":
+    main()